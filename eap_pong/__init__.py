@@ -0,0 +1,5 @@
+"""Shared numeric core for the EAP-gel Pong models."""
+
+from .arena import Arena
+
+__all__ = ["Arena"]
@@ -0,0 +1,493 @@
+"""Streaming aggregation of many runs into mergeable quantile sketches.
+
+Each run is reduced to one value per time bin and region for three
+metrics -- hit rate at the end of the bin, mean current and mean paddle
+error ``|paddle_y - ball_y|`` while the ball is in the region -- and those
+values go into a t-digest per (metric, bin, region).  Runs are added as they
+finish and then dropped, so medians and percentile bands across 100,000
+runs take the same few megabytes as across ten.  Partial aggregates built
+on different workers or nodes merge into one::
+
+    python -m eap_pong.aggregate add runs/*.npz --out part-a.npz
+    python -m eap_pong.aggregate simulate --model 2 --games 50000 --first-game 50000 --out part-b.npz
+    python -m eap_pong.aggregate merge part-a.npz part-b.npz --out all.npz
+    python -m eap_pong.aggregate bands all.npz --quantiles 0.05,0.5,0.95 --csv bands.csv
+
+From Python, ``Aggregate.add_run(load_run(path), log)`` adds a saved run
+(paddle error needs its ``.eaplog``), and ``EnsembleAggregator`` is an
+``Ensemble.run`` callback that adds every game of a headless ensemble.
+
+All t-digests of an aggregate live in flat centroid arrays and are
+compressed together with one sort, so adding a run costs a few array
+appends whatever the number of bins and regions.
+"""
+
+import argparse
+import csv
+import json
+import os
+import time
+
+import numpy as np
+
+METRICS = ("hit_rate", "current", "paddle_error")
+QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+
+
+# ---------------- Sketches ----------------
+class DigestGrid:
+    """One t-digest per cell of a grid, stored as flat centroid arrays.
+
+    Centroids (``cell``, ``mean``, ``weight``) are kept sorted by cell and
+    mean.  New values wait in a buffer until it holds ``buffer_size``
+    values; compression then merges neighbouring centroids of a cell whose
+    quantiles fall in the same unit of the t-digest scale
+    ``k(q) = compression / (2 pi) * asin(2q - 1)``, which keeps at most about
+    ``compression / 2`` centroids per cell, small ones at the tails.  Exact
+    counts, sums, minima and maxima are kept alongside.
+    """
+
+    def __init__(self, n_cells, compression=200, buffer_size=1 << 20):
+        if compression < 10:
+            raise ValueError(f"compression must be at least 10, got {compression}")
+        self.n_cells = int(n_cells)
+        self.compression = float(compression)
+        self.buffer_size = int(buffer_size)
+        self.cell = np.zeros(0, dtype=np.int64)
+        self.mean = np.zeros(0)
+        self.weight = np.zeros(0)
+        self.count = np.zeros(self.n_cells)
+        self.total = np.zeros(self.n_cells)
+        self.min = np.full(self.n_cells, np.inf)
+        self.max = np.full(self.n_cells, -np.inf)
+        self._pending, self._pending_n = [], 0
+
+    def add(self, cells, values, weights=None):
+        """Add ``values`` to the digests of ``cells`` (NaNs are skipped)."""
+        cells = np.asarray(cells, dtype=np.int64).ravel()
+        values = np.asarray(values, dtype=float).ravel()
+        weights = np.ones_like(values) if weights is None else np.asarray(weights, dtype=float).ravel()
+        ok = np.isfinite(values) & (weights > 0)
+        if not ok.all():
+            cells, values, weights = cells[ok], values[ok], weights[ok]
+        if not cells.size:
+            return
+        if cells.min() < 0 or cells.max() >= self.n_cells:
+            raise ValueError(f"cells must lie in 0 .. {self.n_cells - 1}")
+        self.count += np.bincount(cells, weights, self.n_cells)
+        self.total += np.bincount(cells, weights * values, self.n_cells)
+        np.minimum.at(self.min, cells, values)
+        np.maximum.at(self.max, cells, values)
+        self._pending.append((cells, values, weights))
+        self._pending_n += cells.size
+        if self._pending_n >= self.buffer_size:
+            self.compress()
+
+    def compress(self):
+        """Fold the buffered values into the centroids."""
+        if not self._pending:
+            return
+        cell = np.concatenate([self.cell] + [p[0] for p in self._pending])
+        mean = np.concatenate([self.mean] + [p[1] for p in self._pending])
+        weight = np.concatenate([self.weight] + [p[2] for p in self._pending])
+        self._pending, self._pending_n = [], 0
+        if not cell.size:
+            return
+        # By mean, then stably by cell (twice as fast as lexsort)
+        order = np.argsort(mean)
+        order = order[np.argsort(cell[order], kind="stable")]
+        cell, mean, weight = cell[order], mean[order], weight[order]
+
+        # Quantile of each centroid's midpoint within its cell
+        cell_total = np.bincount(cell, weight, self.n_cells)
+        cell_start = np.concatenate(([0.0], np.cumsum(cell_total)[:-1]))
+        q = (np.cumsum(weight) - weight / 2 - cell_start[cell]) / cell_total[cell]
+        k = np.floor(self.compression / (2 * np.pi) * np.arcsin(np.clip(2 * q - 1, -1, 1)))
+        starts = np.flatnonzero(np.concatenate(([True], (cell[1:] != cell[:-1]) | (k[1:] != k[:-1]))))
+        self.weight = np.add.reduceat(weight, starts)
+        self.mean = np.add.reduceat(weight * mean, starts) / self.weight
+        self.cell = cell[starts]
+
+    def merge(self, other):
+        """Add all values of another grid of the same shape and compression."""
+        if other.n_cells != self.n_cells or other.compression != self.compression:
+            raise ValueError(f"cannot merge a grid of {other.n_cells} cells (compression {other.compression:g}) "
+                             f"into one of {self.n_cells} (compression {self.compression:g})")
+        other.compress()
+        self.count += other.count
+        self.total += other.total
+        np.minimum(self.min, other.min, out=self.min)
+        np.maximum(self.max, other.max, out=self.max)
+        self._pending.append((other.cell, other.mean, other.weight))
+        self._pending_n += other.cell.size
+        self.compress()
+        return self
+
+    def quantiles(self, qs):
+        """Estimated quantiles ``qs`` of every cell, shape (n_cells, len(qs)); NaN for empty cells."""
+        self.compress()
+        qs = np.atleast_1d(np.asarray(qs, dtype=float))
+        if ((qs < 0) | (qs > 1)).any():
+            raise ValueError("quantiles must lie in [0, 1]")
+        out = np.full((self.n_cells, qs.size), np.nan)
+        used = np.flatnonzero(self.count > 0)
+        if not used.size:
+            return out
+        # Interpolate between centroid midpoints, with the exact minimum and
+        # maximum at q = 0 and 1; cell c occupies positions 2c .. 2c + 1
+        cell_start = np.concatenate(([0.0], np.cumsum(np.bincount(self.cell, self.weight, self.n_cells))[:-1]))
+        mid = (np.cumsum(self.weight) - self.weight / 2 - cell_start[self.cell]) / self.count[self.cell]
+        pos = np.concatenate((2.0 * self.cell + mid, 2.0 * used, 2.0 * used + 1))
+        val = np.concatenate((self.mean, self.min[used], self.max[used]))
+        order = np.argsort(pos, kind="stable")
+        out[used] = np.interp(2.0 * used[:, None] + qs, pos[order], val[order])
+        return out
+
+    def means(self):
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(self.count > 0, self.total / self.count, np.nan)
+
+    @property
+    def nbytes(self):
+        pending = sum(c.nbytes + v.nbytes + w.nbytes for c, v, w in self._pending)
+        return (self.cell.nbytes + self.mean.nbytes + self.weight.nbytes + pending
+                + self.count.nbytes + self.total.nbytes + self.min.nbytes + self.max.nbytes)
+
+    def to_arrays(self, prefix):
+        self.compress()
+        return {f"{prefix}_{name}": getattr(self, name)
+                for name in ("cell", "mean", "weight", "count", "total", "min", "max")}
+
+    @classmethod
+    def from_arrays(cls, arrays, prefix, n_cells, compression):
+        grid = cls(n_cells, compression)
+        for name in ("cell", "mean", "weight", "count", "total", "min", "max"):
+            setattr(grid, name, arrays[f"{prefix}_{name}"])
+        return grid
+
+
+# ---------------- Per-run reduction ----------------
+def _bin_means(bins, regions, values, n_bins, n_regions):
+    """Mean of ``values`` per (bin, region), and where there were any."""
+    keep = (bins >= 0) & (bins < n_bins)
+    flat = bins[keep] * n_regions + regions[keep]
+    n = np.bincount(flat, minlength=n_bins * n_regions)
+    s = np.bincount(flat, values[keep], n_bins * n_regions)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return (s / n).reshape(n_bins, n_regions), (n > 0).reshape(n_bins, n_regions)
+
+
+class Aggregate:
+    """Quantile sketches of hit rate, current and paddle error per time bin
+    and region, over any number of runs.
+
+    Bin ``b`` covers ``b * bin_width <= t < (b + 1) * bin_width`` seconds of
+    simulated time; later samples are ignored.  Each run adds at most one
+    value per (metric, bin, region), so a cell's ``count`` is the number of
+    runs that reached it.
+    """
+
+    def __init__(self, region_names, bin_width=10.0, n_bins=60, compression=200):
+        if bin_width <= 0 or n_bins < 1:
+            raise ValueError(f"need bin_width > 0 and n_bins >= 1, got {bin_width} and {n_bins}")
+        self.region_names = list(region_names)
+        self.bin_width = float(bin_width)
+        self.n_bins = int(n_bins)
+        self.compression = float(compression)
+        self.runs = 0
+        n_cells = self.n_bins * len(self.region_names)
+        self.grids = {m: DigestGrid(n_cells, compression) for m in METRICS}
+
+    @property
+    def n_regions(self):
+        return len(self.region_names)
+
+    def bin_edges(self):
+        return np.arange(self.n_bins + 1) * self.bin_width
+
+    def bin_of(self, t):
+        return np.floor(np.asarray(t, dtype=float) / self.bin_width).astype(np.int64)
+
+    def add_values(self, metric, values, mask=None):
+        """Add one run's ``(n_bins, n_regions)`` values of ``metric`` where ``mask`` is true."""
+        values = np.asarray(values, dtype=float)
+        cells = np.arange(values.size).reshape(values.shape)
+        if mask is not None:
+            cells, values = cells[mask], values[mask]
+        self.grids[metric].add(cells, values)
+
+    def add_bin(self, metric, b, values, mask=None):
+        """Add values of bin ``b`` for many runs at once, shape (runs, n_regions)."""
+        values = np.asarray(values, dtype=float)
+        cells = np.broadcast_to(b * self.n_regions + np.arange(self.n_regions), values.shape)
+        if mask is not None:
+            cells, values = cells[mask], values[mask]
+        self.grids[metric].add(cells, values)
+
+    def add_run(self, run, log=None):
+        """Add a run file's contents (``runfile.load_run``).
+
+        ``log`` is its ``LogReader(...).read()``: when given, currents come
+        from its per-tick rows and paddle error is added too.
+        """
+        if list(run["region_names"]) != self.region_names:
+            raise ValueError(f"run regions {run['region_names']} differ from the aggregate's {self.region_names}")
+        N, cols = self.n_regions, np.arange(self.n_regions)
+        source = log if log is not None else run
+        t, currents = np.asarray(source["time"], dtype=float), np.asarray(source["currents"], dtype=float)
+        if t.size:
+            bins = np.repeat(self.bin_of(t), N)
+            means, seen = _bin_means(bins, np.tile(cols, t.size), currents.ravel(), self.n_bins, N)
+            self.add_values("current", means, seen)
+        if log is not None and log["time"].size:
+            error = np.abs(log["paddle_y"] - log["ball_y"])
+            means, seen = _bin_means(self.bin_of(log["time"]), log["active"], error, self.n_bins, N)
+            self.add_values("paddle_error", means, seen)
+
+        # Hit rate at the end of each bin the run reached
+        end = float(t.max()) if t.size else 0.0
+        for times in run["region_time"].values():
+            if len(times):
+                end = max(end, float(np.max(times)))
+        stop = np.minimum(self.bin_edges()[1:], end)
+        rates, seen = np.full((self.n_bins, N), np.nan), np.zeros((self.n_bins, N), dtype=bool)
+        for i, name in enumerate(self.region_names):
+            times, history = np.asarray(run["region_time"][name]), np.asarray(run["region_history"][name])
+            if not times.size:
+                continue
+            last = np.searchsorted(times, stop, side="right") - 1
+            seen[:, i] = (last >= 0) & (self.bin_edges()[:-1] <= end)
+            rates[seen[:, i], i] = history[last[seen[:, i]]]
+        self.add_values("hit_rate", rates, seen)
+        self.runs += 1
+        return self
+
+    def merge(self, other):
+        """Add a partial aggregate built elsewhere with the same layout."""
+        layout = (self.region_names, self.bin_width, self.n_bins, self.compression)
+        if (other.region_names, other.bin_width, other.n_bins, other.compression) != layout:
+            raise ValueError("aggregates differ in regions, bins or compression and cannot be merged")
+        for m in METRICS:
+            self.grids[m].merge(other.grids[m])
+        self.runs += other.runs
+        return self
+
+    def bands(self, quantiles=QUANTILES):
+        """``{metric: {"count", "mean", "quantiles"}}``; counts and means are
+        (n_bins, n_regions), quantiles (n_bins, n_regions, len(quantiles))."""
+        shape = (self.n_bins, self.n_regions)
+        return {m: {"count": g.count.reshape(shape), "mean": g.means().reshape(shape),
+                    "quantiles": g.quantiles(quantiles).reshape(shape + (-1,))}
+                for m, g in self.grids.items()}
+
+    @property
+    def nbytes(self):
+        return sum(g.nbytes for g in self.grids.values())
+
+    def save(self, path):
+        arrays = {"meta": np.asarray(json.dumps({
+            "region_names": self.region_names, "bin_width": self.bin_width, "n_bins": self.n_bins,
+            "compression": self.compression, "runs": self.runs}))}
+        for m, g in self.grids.items():
+            arrays.update(g.to_arrays(m))
+        with open(path, "wb") as f:
+            np.savez_compressed(f, **arrays)
+        return path
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            meta = json.loads(str(data["meta"]))
+            agg = cls(meta["region_names"], meta["bin_width"], meta["n_bins"], meta["compression"])
+            agg.runs = meta["runs"]
+            n_cells = agg.n_bins * agg.n_regions
+            agg.grids = {m: DigestGrid.from_arrays(data, m, n_cells, agg.compression) for m in METRICS}
+        return agg
+
+    def write_csv(self, path, quantiles=QUANTILES):
+        """One row per (metric, bin, region) with runs, mean and the quantiles."""
+        bands, edges = self.bands(quantiles), self.bin_edges()
+        with open(path, "w", newline="") as f:
+            w = csv.writer(f)
+            w.writerow(["metric", "t_start", "t_end", "region", "runs", "mean"] + [f"q{q:g}" for q in quantiles])
+            for m in METRICS:
+                b = bands[m]
+                for i in range(self.n_bins):
+                    for j, name in enumerate(self.region_names):
+                        if b["count"][i, j]:
+                            w.writerow([m, f"{edges[i]:g}", f"{edges[i + 1]:g}", name, int(b["count"][i, j]),
+                                        f"{b['mean'][i, j]:.6g}"] + [f"{v:.6g}" for v in b["quantiles"][i, j]])
+        return path
+
+
+# ---------------- Headless ensembles ----------------
+class EnsembleAggregator:
+    """``Ensemble.run`` callback adding every game of the ensemble as a run.
+
+    Per-game sums for the current bin are all it keeps; at each bin
+    boundary they go into the aggregate.  Call ``finish(ens)`` after the run
+    to add the last, partly covered bin.
+    """
+
+    def __init__(self, aggregate):
+        self.agg = aggregate
+        self.bin = None
+
+    def __call__(self, ens):
+        b = int(ens.t // self.agg.bin_width)
+        if self.bin is None:
+            self._reset(ens, b)
+        elif b != self.bin:
+            self._flush()
+            self._reset(ens, b)
+        rows = np.arange(ens.n_games)
+        self.current_sum += ens.currents
+        self.samples += 1
+        self.error_sum[rows, ens.active] += np.abs(ens.paddle_y - ens.y)
+        self.error_n[rows, ens.active] += 1
+        np.copyto(self.hits, ens.region_hits)
+        np.copyto(self.trials, ens.region_trials)
+        return False
+
+    def _reset(self, ens, b):
+        G, N = ens.currents.shape
+        self.bin = b
+        self.samples = 0
+        self.current_sum = np.zeros((G, N))
+        self.error_sum, self.error_n = np.zeros((G, N)), np.zeros((G, N))
+        self.hits, self.trials = np.zeros((G, N)), np.zeros((G, N))
+
+    def _flush(self):
+        agg, b = self.agg, self.bin
+        if not (0 <= b < agg.n_bins) or not self.samples:
+            return
+        with np.errstate(divide="ignore", invalid="ignore"):
+            agg.add_bin("current", b, self.current_sum / self.samples)
+            agg.add_bin("paddle_error", b, self.error_sum / self.error_n, self.error_n > 0)
+            agg.add_bin("hit_rate", b, self.hits / self.trials, self.trials > 0)
+
+    def finish(self, ens):
+        """Add the last bin and count the ensemble's games as runs."""
+        if self.bin is not None:
+            self._flush()
+        self.agg.runs += ens.n_games
+        self.bin = None
+        return self.agg
+
+
+def simulate(agg, model, n_games, steps, mode="correct", seed=0, first_game=0, batch=1000, params=None,
+             progress=None):
+    """Run games ``first_game .. first_game + n_games - 1`` headless in
+    batches of ``batch`` and add each to ``agg``."""
+    from .engine import Ensemble
+    for start in range(first_game, first_game + n_games, batch):
+        size = min(batch, first_game + n_games - start)
+        ens = Ensemble(model, n_games=size, params=params, mode=mode, seed=seed, first_game=start)
+        collect = EnsembleAggregator(agg)
+        ens.run(steps, callback=collect)
+        collect.finish(ens)
+        if progress:
+            progress(start + size - first_game)
+    return agg
+
+
+# ---------------- Command line ----------------
+def _layout_arguments(p):
+    p.add_argument("--bin-width", type=float, default=10.0, help="seconds of simulated time per bin")
+    p.add_argument("--bins", type=int, default=60)
+    p.add_argument("--compression", type=float, default=200, help="t-digest compression (accuracy vs. size)")
+    p.add_argument("--into", default=None, help="add to this existing aggregate instead of starting empty")
+    p.add_argument("--out", default="aggregate.npz")
+
+
+def _start(args, region_names):
+    if args.into:
+        agg = Aggregate.load(args.into)
+        if agg.region_names != list(region_names):
+            raise ValueError(f"'{args.into}' has regions {agg.region_names}, not {list(region_names)}")
+        return agg
+    return Aggregate(region_names, args.bin_width, args.bins, args.compression)
+
+
+def _print_bands(agg, quantiles):
+    bands = agg.bands(quantiles)
+    print(f"{agg.runs} runs, {agg.n_bins} bins of {agg.bin_width:g} s, regions {agg.region_names}, "
+          f"{agg.nbytes / 1e6:.2f} MB of sketches")
+    for m in METRICS:
+        counts = bands[m]["count"].sum(axis=1)
+        if not counts.any():
+            continue
+        i = int(np.flatnonzero(counts)[-1])
+        edges = agg.bin_edges()
+        print(f"{m} at {edges[i]:g}-{edges[i + 1]:g} s:")
+        for j, name in enumerate(agg.region_names):
+            q = ", ".join(f"q{p:g} {v:.4g}" for p, v in zip(quantiles, bands[m]["quantiles"][i, j]))
+            print(f"  {name}: {int(bands[m]['count'][i, j])} runs, {q}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Streaming quantile aggregation across runs.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("add", help="add run files (.npz, with their .eaplog when present)")
+    p.add_argument("runs", nargs="+")
+    p.add_argument("--no-logs", action="store_true", help="ignore .eaplog files next to the runs")
+    _layout_arguments(p)
+    p = sub.add_parser("simulate", help="add the games of headless ensembles")
+    p.add_argument("--model", type=int, default=2, choices=(1, 2, 3))
+    p.add_argument("--mode", default="correct")
+    p.add_argument("--games", type=int, default=1000)
+    p.add_argument("--steps", type=int, default=36000)
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--first-game", type=int, default=0, help="first game ID (to split games over workers)")
+    p.add_argument("--batch", type=int, default=1000, help="games per ensemble")
+    _layout_arguments(p)
+    p = sub.add_parser("merge", help="merge partial aggregates")
+    p.add_argument("parts", nargs="+")
+    p.add_argument("--out", default="aggregate.npz")
+    p = sub.add_parser("bands", help="percentile bands of an aggregate")
+    p.add_argument("path")
+    p.add_argument("--quantiles", default=",".join(f"{q:g}" for q in QUANTILES))
+    p.add_argument("--csv", default=None, help="write every (metric, bin, region) row as CSV")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    if args.command == "add":
+        from .binlog import LogReader
+        from .runfile import load_run
+        agg = None
+        for path in args.runs:
+            run = load_run(path)
+            agg = agg or _start(args, run["region_names"])
+            log_path = os.path.splitext(path)[0] + ".eaplog"
+            log = None
+            if not args.no_logs and os.path.exists(log_path):
+                with LogReader(log_path) as reader:
+                    log = reader.read()
+            agg.add_run(run, log)
+        agg.save(args.out)
+    elif args.command == "simulate":
+        from .arena import Arena
+        agg = _start(args, Arena().names)
+        simulate(agg, args.model, args.games, args.steps, args.mode, args.seed, args.first_game, args.batch,
+                 progress=lambda n: print(f"  {n}/{args.games} games"))
+        agg.save(args.out)
+    elif args.command == "merge":
+        agg = Aggregate.load(args.parts[0])
+        for path in args.parts[1:]:
+            agg.merge(Aggregate.load(path))
+        agg.save(args.out)
+    else:
+        agg = Aggregate.load(args.path)
+        quantiles = [float(q) for q in args.quantiles.split(",")]
+        _print_bands(agg, quantiles)
+        if args.csv:
+            agg.write_csv(args.csv, quantiles)
+            print(f"Bands saved to '{args.csv}'")
+        return
+    print(f"{agg.runs} runs aggregated in {time.perf_counter() - start:.1f} s "
+          f"({agg.nbytes / 1e6:.2f} MB of sketches)")
+    print(f"Aggregate saved to '{args.out}'")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""Arena geometry and sensor-region layout.
+
+The original scripts hard-code three rows (A/B/C) of 300 px each.  ``Arena``
+describes the same playing field with any number of rows (and optionally
+one sensor per cell), finds the region of a ball position by arithmetic
+instead of ``if`` chains, and precomputes the least-squares parabola fit
+used by the Model 2 paddle decision.
+"""
+
+import string
+
+import numpy as np
+
+
+class Arena:
+    """Grid of sensor regions covering the playing field.
+
+    Rows are numbered from the top (row 0 is region "A"), columns from the
+    left.  By default every row is one sensor and the columns are only
+    drawn; with ``cell_sensors=True`` every cell is its own sensor and the
+    decision averages the cells of each row.
+    """
+
+    def __init__(self, n_rows=3, n_cols=2, width=600, height=900,
+                 cell_sensors=False, decision_samples=200):
+        self.n_rows = int(n_rows)
+        self.n_cols = int(n_cols)
+        self.x_min, self.x_max = -width / 2, width / 2
+        self.y_min, self.y_max = -height / 2, height / 2
+        self.row_height = height / self.n_rows
+        self.col_width = width / self.n_cols
+        self.cell_sensors = cell_sensors
+        self.decision_samples = decision_samples
+
+        self.n_regions = self.n_rows * self.n_cols if cell_sensors else self.n_rows
+        self.names = self._make_names()
+
+        self.x_edges = [self.x_min + i * self.col_width for i in range(self.n_cols + 1)]
+        self.y_edges = [self.y_max - i * self.row_height for i in range(self.n_rows + 1)]
+        self.row_centers = np.array([self.y_max - (i + 0.5) * self.row_height
+                                     for i in range(self.n_rows)])
+
+        # Least-squares fit of a*x^2 + b*x + c through the row currents,
+        # sampled at x = -1 (top row) ... +1 (bottom row).
+        x_positions = np.linspace(-1.0, 1.0, self.n_rows)
+        vander = np.stack([x_positions ** 2, x_positions, np.ones(self.n_rows)], axis=1)
+        fit = np.linalg.pinv(vander)
+        if cell_sensors:
+            row_mean = np.repeat(np.eye(self.n_rows), self.n_cols, axis=1) / self.n_cols
+            fit = fit @ row_mean
+        self.fit_matrix = fit
+        # x = -1 maps to the centre of the top row.
+        self.decision_scale = self.y_max - self.row_height / 2
+
+    def _make_names(self):
+        if self.n_rows <= 26:
+            rows = list(string.ascii_uppercase[:self.n_rows])
+        else:
+            rows = [f"R{i}" for i in range(self.n_rows)]
+        if not self.cell_sensors:
+            return rows
+        return [f"{r}{c + 1}" for r in rows for c in range(self.n_cols)]
+
+    # ---------------- REGION LOOKUP ----------------
+    def row_index(self, y):
+        """Row containing ``y``; a ball exactly on a boundary belongs to the lower row."""
+        row = np.floor((self.y_max - np.asarray(y)) / self.row_height).astype(int)
+        return np.clip(row, 0, self.n_rows - 1)
+
+    def col_index(self, x):
+        col = np.floor((np.asarray(x) - self.x_min) / self.col_width).astype(int)
+        return np.clip(col, 0, self.n_cols - 1)
+
+    def region_index(self, x, y):
+        """Sensor index for a position; works on scalars and arrays."""
+        if self.cell_sensors:
+            return self.row_index(y) * self.n_cols + self.col_index(x)
+        return self.row_index(y)
+
+    def region_row(self, index):
+        """Row of a sensor index; works on scalars and arrays."""
+        index = np.asarray(index)
+        return index // self.n_cols if self.cell_sensors else index
+
+    def region_name(self, x, y):
+        return self.names[int(self.region_index(x, y))]
+
+    def cell_origin(self, x, y):
+        """Top-left corner of the cell containing the position (for highlighting)."""
+        row, col = int(self.row_index(y)), int(self.col_index(x))
+        return self.x_min + col * self.col_width, self.y_max - row * self.row_height
+
+    def boundaries(self):
+        """``{name: {"center", "min", "max"}}`` in the layout of Model 1's REGION_BOUNDARIES."""
+        bounds = {}
+        for i, name in enumerate(self.names):
+            row = self.region_row(i)
+            center = float(self.row_centers[row])
+            bounds[name] = {"center": center,
+                            "min": center - self.row_height / 2,
+                            "max": center + self.row_height / 2}
+        return bounds
+
+    # ---------------- PADDLE DECISION ----------------
+    def fit_parabola(self, norm_currents):
+        """(a, b, c) of the least-squares parabola; ``norm_currents`` is (..., n_regions)."""
+        coeffs = np.asarray(norm_currents) @ self.fit_matrix.T
+        return coeffs[..., 0], coeffs[..., 1], coeffs[..., 2]
+
+    def decide(self, norm_currents):
+        """Paddle y from normalized currents.
+
+        Equivalent to evaluating the fitted parabola on ``decision_samples``
+        points in [-1, 1] and taking the argmax, but in constant time: a
+        concave parabola peaks at the sample nearest its vertex, anything
+        else peaks at an end point.  Ties go to the lower sample (towards
+        the top), as ``argmax`` does, also for a vertex halfway between two
+        samples.
+        """
+        a, b, _ = self.fit_parabola(norm_currents)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            vertex = np.clip(-b / (2 * a), -1.0, 1.0)
+        step = 2.0 / (self.decision_samples - 1)
+        # nearest sample, rounding halves down
+        snapped = np.ceil((vertex + 1.0) / step - 0.5) * step - 1.0
+        x_peak = np.where(a < 0, snapped, np.where(b > 0, 1.0, -1.0))
+        return -np.clip(x_peak, -1.0, 1.0) * self.decision_scale
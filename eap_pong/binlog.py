@@ -0,0 +1,290 @@
+"""Compact binary log of a run: time, currents, ball, paddle and active region.
+
+Layout of a ``.eaplog`` file::
+
+    b"EAPLOG1\\n" | uint32 header length | JSON header (run meta, columns, codecs)
+    block*      : uint32 payload length | uint32 rows | float64 first t | float64 last t | zlib payload
+    index       : (offset, rows, first t, last t) per block
+    footer      : uint64 index offset | b"EAPIDX1\\n"
+
+Rows are buffered into blocks of ``block_rows``.  Inside a block each column
+is stored either as fixed-point integers (``round(value * scale)``) with
+delta encoding in the narrowest integer type that fits, or, with
+``precision="float32"``, as float32 with its bytes shuffled into planes.
+The block is then zlib-compressed.  Time is always fixed-point in
+microseconds.  Reading a time range seeks straight to the blocks that
+overlap it and decodes only those.  A file whose writer died before
+writing the index is still readable: the block headers are scanned
+instead::
+
+    python -m eap_pong.binlog record --model 2 --steps 200000 --out run.eaplog
+    python -m eap_pong.binlog info run.eaplog
+    python -m eap_pong.binlog slice run.eaplog --start 60 --end 90 --csv slice.csv
+"""
+
+import argparse
+import json
+import os
+import struct
+import zlib
+
+import numpy as np
+
+MAGIC = b"EAPLOG1\n"
+INDEX_MAGIC = b"EAPIDX1\n"
+BLOCK_HEADER = struct.Struct("<IIdd")
+FOOTER = struct.Struct("<Q8s")
+INDEX_DTYPE = np.dtype([("offset", "<u8"), ("rows", "<u4"), ("t_first", "<f8"), ("t_last", "<f8")])
+
+# Fixed-point resolution: microseconds, 1e-5 mA, 1e-4 px
+SCALES = {"time": 1e6, "current": 1e5, "position": 1e4, "index": 1}
+_INT_TYPES = ((np.int8, b"b"), (np.int16, b"h"), (np.int32, b"i"), (np.int64, b"q"))
+_CODES = {code: dtype for dtype, code in _INT_TYPES}
+
+
+def _columns(region_names, precision):
+    if precision not in ("fixed", "float32"):
+        raise ValueError(f"precision must be 'fixed' or 'float32', not {precision!r}")
+    real = ({"codec": "f32"} if precision == "float32" else None)
+    cols = [{"name": "time", "codec": "delta", "scale": SCALES["time"]}]
+    cols += [dict(real or {"codec": "delta", "scale": SCALES["current"]}, name=f"current_{r}")
+             for r in region_names]
+    cols += [dict(real or {"codec": "delta", "scale": SCALES["position"]}, name=n)
+             for n in ("ball_x", "ball_y", "paddle_y")]
+    cols.append({"name": "active", "codec": "delta", "scale": SCALES["index"]})
+    return cols
+
+
+def _encode_column(values, spec):
+    if spec["codec"] == "f32":
+        return b"f" + values.astype("<f4").view(np.uint8).reshape(-1, 4).T.tobytes()
+    if not np.isfinite(values).all():
+        raise ValueError(f"column {spec['name']!r} has non-finite values; use precision='float32'")
+    q = np.round(values * spec["scale"]).astype(np.int64)
+    d = np.diff(q, prepend=np.int64(0))
+    lo, hi = (d.min(), d.max()) if d.size else (0, 0)
+    for dtype, code in _INT_TYPES:
+        info = np.iinfo(dtype)
+        if info.min <= lo and hi <= info.max:
+            return code + d.astype("<" + np.dtype(dtype).str[1:]).tobytes()
+
+
+def _decode_column(data, rows, spec):
+    code, body = data[:1], data[1:]
+    if code == b"f":
+        return np.frombuffer(body, np.uint8).reshape(4, rows).T.copy().view("<f4").ravel().astype(float)
+    d = np.frombuffer(body, "<" + np.dtype(_CODES[code]).str[1:], rows).astype(np.int64)
+    return np.cumsum(d) / spec["scale"]
+
+
+# ---------------- Writer ----------------
+class LogWriter:
+    """Appends rows to a ``.eaplog`` file, one compressed block every ``block_rows`` rows."""
+
+    def __init__(self, path, region_names, meta=None, block_rows=4096, precision="fixed", level=6):
+        self.path = path
+        self.region_names = list(region_names)
+        self.columns = _columns(self.region_names, precision)
+        self.block_rows = block_rows
+        self.level = level
+        self.buf = np.zeros((block_rows, len(self.columns)))
+        self.n = 0
+        self.index = []
+        header = json.dumps({"region_names": self.region_names, "columns": self.columns,
+                             "block_rows": block_rows, "precision": precision, "meta": meta or {}}).encode()
+        self.f = open(path, "wb")
+        self.f.write(MAGIC + struct.pack("<I", len(header)) + header)
+
+    def append(self, t, currents, ball_x, ball_y, paddle_y, active):
+        row = self.buf[self.n]
+        row[0] = t
+        row[1:-4] = currents
+        row[-4:] = ball_x, ball_y, paddle_y, active
+        self.n += 1
+        if self.n == self.block_rows:
+            self.flush()
+
+    def append_rows(self, t, currents, ball_x, ball_y, paddle_y, active):
+        """Append many rows at once (``currents`` is rows x regions)."""
+        rows = np.column_stack([t, currents, ball_x, ball_y, paddle_y, active])
+        while rows.shape[0]:
+            k = min(self.block_rows - self.n, rows.shape[0])
+            self.buf[self.n:self.n + k] = rows[:k]
+            self.n += k
+            rows = rows[k:]
+            if self.n == self.block_rows:
+                self.flush()
+
+    def flush(self):
+        if self.n == 0:
+            return
+        block = self.buf[:self.n]
+        parts = [_encode_column(block[:, j], spec) for j, spec in enumerate(self.columns)]
+        payload = zlib.compress(b"".join(struct.pack("<I", len(p)) + p for p in parts), self.level)
+        offset = self.f.tell()
+        self.f.write(BLOCK_HEADER.pack(len(payload), self.n, block[0, 0], block[-1, 0]) + payload)
+        self.index.append((offset, self.n, block[0, 0], block[-1, 0]))
+        self.n = 0
+
+    def close(self):
+        if self.f.closed:
+            return
+        self.flush()
+        offset = self.f.tell()
+        self.f.write(np.array(self.index, dtype=INDEX_DTYPE).tobytes())
+        self.f.write(FOOTER.pack(offset, INDEX_MAGIC))
+        self.f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# ---------------- Reader ----------------
+class LogReader:
+    """Random access to a ``.eaplog`` file by time range."""
+
+    def __init__(self, path):
+        self.path = path
+        self.f = open(path, "rb")
+        if self.f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path!r} is not an eaplog file")
+        (length,) = struct.unpack("<I", self.f.read(4))
+        header = json.loads(self.f.read(length))
+        self.data_start = self.f.tell()
+        self.region_names = header["region_names"]
+        self.columns = header["columns"]
+        self.precision = header["precision"]
+        self.meta = header["meta"]
+        self.index = self._read_index()
+
+    def _read_index(self):
+        size = os.fstat(self.f.fileno()).st_size
+        if size >= self.data_start + FOOTER.size:
+            self.f.seek(size - FOOTER.size)
+            offset, magic = FOOTER.unpack(self.f.read(FOOTER.size))
+            if magic == INDEX_MAGIC:
+                self.f.seek(offset)
+                return np.frombuffer(self.f.read(size - FOOTER.size - offset), INDEX_DTYPE)
+        # No index (writer did not close): walk the block headers
+        entries, pos = [], self.data_start
+        while pos + BLOCK_HEADER.size <= size:
+            self.f.seek(pos)
+            length, rows, t_first, t_last = BLOCK_HEADER.unpack(self.f.read(BLOCK_HEADER.size))
+            if pos + BLOCK_HEADER.size + length > size:
+                break
+            entries.append((pos, rows, t_first, t_last))
+            pos += BLOCK_HEADER.size + length
+        return np.array(entries, dtype=INDEX_DTYPE)
+
+    def __len__(self):
+        return int(self.index["rows"].sum())
+
+    @property
+    def t_range(self):
+        return (float(self.index["t_first"][0]), float(self.index["t_last"][-1])) if len(self.index) else (0.0, 0.0)
+
+    def _decode_block(self, entry):
+        self.f.seek(int(entry["offset"]))
+        length, rows, _, _ = BLOCK_HEADER.unpack(self.f.read(BLOCK_HEADER.size))
+        payload = zlib.decompress(self.f.read(length))
+        out, pos = np.empty((rows, len(self.columns))), 0
+        for j, spec in enumerate(self.columns):
+            (n,) = struct.unpack_from("<I", payload, pos)
+            out[:, j] = _decode_column(payload[pos + 4:pos + 4 + n], rows, spec)
+            pos += 4 + n
+        return out
+
+    def read(self, start=None, end=None):
+        """Rows with ``start <= time <= end``, decoding only the blocks that overlap.
+
+        Returns a dict with time, currents (rows x regions), ball_x, ball_y,
+        paddle_y and active (int).
+        """
+        lo = -np.inf if start is None else start
+        hi = np.inf if end is None else end
+        blocks = np.flatnonzero((self.index["t_last"] >= lo) & (self.index["t_first"] <= hi))
+        self.blocks_read = blocks.size
+        rows = (np.concatenate([self._decode_block(self.index[b]) for b in blocks]) if blocks.size
+                else np.empty((0, len(self.columns))))
+        rows = rows[(rows[:, 0] >= lo) & (rows[:, 0] <= hi)]
+        return {"time": rows[:, 0], "currents": rows[:, 1:-4], "ball_x": rows[:, -4],
+                "ball_y": rows[:, -3], "paddle_y": rows[:, -2], "active": rows[:, -1].astype(np.int64)}
+
+    def close(self):
+        self.f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# ---------------- Headless recording ----------------
+class EnsembleLogger:
+    """``Ensemble.run`` callback that logs one game every step."""
+
+    def __init__(self, writer, game=0):
+        self.writer, self.game = writer, game
+
+    def __call__(self, ens):
+        g = self.game
+        self.writer.append(ens.t, ens.currents[g], ens.x[g], ens.y[g], ens.paddle_y[g], ens.active[g])
+
+
+def _write_csv(data, region_names, path):
+    header = ["time"] + [f"current_{r}" for r in region_names] + ["ball_x", "ball_y", "paddle_y", "active"]
+    table = np.column_stack([data["time"], data["currents"], data["ball_x"], data["ball_y"],
+                             data["paddle_y"], data["active"]])
+    np.savetxt(path, table, delimiter=",", header=",".join(header), comments="", fmt="%.6g")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compact binary run logs.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("record", help="log one headless game")
+    p.add_argument("--model", type=int, default=2, choices=(1, 2, 3))
+    p.add_argument("--mode", default="correct")
+    p.add_argument("--steps", type=int, default=36000)
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--precision", default="fixed", choices=("fixed", "float32"))
+    p.add_argument("--block-rows", type=int, default=4096)
+    p.add_argument("--out", default="run.eaplog")
+    p = sub.add_parser("info", help="header, size and block layout")
+    p.add_argument("path")
+    p = sub.add_parser("slice", help="decode a time range")
+    p.add_argument("path")
+    p.add_argument("--start", type=float, default=None)
+    p.add_argument("--end", type=float, default=None)
+    p.add_argument("--csv", default=None, help="write the slice as CSV")
+    args = parser.parse_args(argv)
+
+    if args.command == "record":
+        from .engine import Ensemble
+        ens = Ensemble(args.model, n_games=1, mode=args.mode, seed=args.seed)
+        meta = {"model": args.model, "mode": args.mode, "seed": args.seed, "dt": ens.dt}
+        with LogWriter(args.out, ens.arena.names, meta, args.block_rows, args.precision) as log:
+            ens.run(args.steps, callback=EnsembleLogger(log))
+        print(f"{args.steps} rows written to '{args.out}' ({os.path.getsize(args.out) / 1e6:.2f} MB)")
+    elif args.command == "info":
+        with LogReader(args.path) as log:
+            size = os.path.getsize(args.path)
+            raw = len(log) * len(log.columns) * 8
+            t0, t1 = log.t_range
+            print(f"{args.path}: {len(log)} rows in {len(log.index)} blocks, t = {t0:.3f} .. {t1:.3f} s")
+            print(f"precision {log.precision}, {size / 1e6:.2f} MB ({raw / max(size, 1):.1f}x smaller than float64)")
+            print(f"regions {log.region_names}, meta {json.dumps(log.meta)}")
+    elif args.command == "slice":
+        with LogReader(args.path) as log:
+            data = log.read(args.start, args.end)
+            print(f"{data['time'].size} rows from {log.blocks_read} of {len(log.index)} blocks")
+            if args.csv:
+                _write_csv(data, log.region_names, args.csv)
+                print(f"Slice saved to '{args.csv}'")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,274 @@
+"""Batched learning-curve fits over many hit-rate histories.
+
+Every series (hit rate against time, e.g. one region of one run) is fitted
+with the same curve by a Levenberg-Marquardt loop that runs on all series at
+once.  Series are padded into an ``(S, L)`` array with a mask.  Each
+iteration evaluates the residuals and Jacobians of all series together,
+solves the ``S`` small normal-equation systems with one batched
+``np.linalg.solve``, and keeps per-series damping.  Curves, with the rate
+fitted as ``log k`` so it stays positive:
+
+- ``exponential``: ``y = a - (a - b) * exp(-k t)``
+- ``sigmoid``: ``y = b + (a - b) / (1 + exp(-k (t - t0)))``
+
+``a`` is the asymptote, ``b`` the starting level and ``k`` the learning
+rate.  Each fit also reports standard errors, RMSE, R² and whether it
+converged::
+
+    python -m eap_pong.curvefit runs/*.npz --curve sigmoid --out fits.csv
+    python -m eap_pong.curvefit --simulate 2 --games 2000 --steps 72000 --out fits.csv
+"""
+
+import argparse
+import csv
+import os
+import time
+
+import numpy as np
+
+CURVES = ("exponential", "sigmoid")
+PARAMS = {"exponential": ("a", "b", "k"), "sigmoid": ("a", "b", "k", "t0")}
+
+
+# ---------------- Series ----------------
+def pad_series(series):
+    """List of ``(t, y)`` pairs -> padded ``T``, ``Y`` and mask ``M`` of shape (S, L)."""
+    lengths = np.array([len(t) for t, _ in series], dtype=np.int64)
+    S, L = len(series), int(lengths.max()) if len(series) else 0
+    T, Y, M = np.zeros((S, L)), np.zeros((S, L)), np.zeros((S, L), dtype=bool)
+    if S and L:
+        rows = np.repeat(np.arange(S), lengths)
+        cols = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        T[rows, cols] = np.concatenate([np.asarray(t, dtype=float) for t, _ in series])
+        Y[rows, cols] = np.concatenate([np.asarray(y, dtype=float) for _, y in series])
+        M[rows, cols] = True
+    return T, Y, M
+
+
+def series_from_runs(paths):
+    """Per-region hit-rate histories of saved run files: (labels, series)."""
+    from .runfile import load_run
+    labels, series = [], []
+    for path in paths:
+        run = load_run(path)
+        stem = os.path.splitext(os.path.basename(path))[0]
+        for r in run["region_names"]:
+            labels.append((stem, r))
+            series.append((run["region_time"][r], run["region_history"][r]))
+    return labels, series
+
+
+def series_from_ensemble(ens):
+    """Per-game, per-region histories of an ``Ensemble`` run with ``record_history=True``."""
+    labels, series = [], []
+    for g, hist in enumerate(ens.history):
+        if not hist:
+            continue
+        t = np.array([h[0] for h in hist])
+        rates = np.array([h[1] for h in hist])
+        for i, r in enumerate(ens.arena.names):
+            ok = ~np.isnan(rates[:, i])
+            labels.append((f"game{g}", r))
+            series.append((t[ok], rates[ok, i]))
+    return labels, series
+
+
+# ---------------- Curves ----------------
+def _exponential(theta, T):
+    a, b, k = theta[:, 0:1], theta[:, 1:2], np.exp(theta[:, 2:3])
+    e = np.exp(-k * T)
+    f = a - (a - b) * e
+    J = np.stack([1 - e, e, (a - b) * e * T * k], axis=-1)
+    return f, J
+
+
+def _sigmoid(theta, T):
+    a, b, k, t0 = theta[:, 0:1], theta[:, 1:2], np.exp(theta[:, 2:3]), theta[:, 3:4]
+    u = T - t0
+    s = 1 / (1 + np.exp(np.clip(-k * u, -500, 500)))
+    ds = s * (1 - s)
+    f = b + (a - b) * s
+    J = np.stack([s, 1 - s, (a - b) * ds * u * k, -(a - b) * ds * k], axis=-1)
+    return f, J
+
+
+_MODELS = {"exponential": _exponential, "sigmoid": _sigmoid}
+
+
+def _initial(curve, T, Y, M, n):
+    if T.shape[1] == 0:
+        # no series has any points: nothing to fit
+        return np.zeros((T.shape[0], len(PARAMS[curve])))
+    idx = np.arange(T.shape[0])
+    last = np.maximum(n - 1, 0)
+    t_first, t_last = T[:, 0], T[idx, last]
+    span = np.maximum(t_last - t_first, 1e-9)
+    tail = M & (T >= t_first[:, None] + 0.5 * span[:, None])
+    a = np.where(tail.any(axis=1), (Y * tail).sum(axis=1) / np.maximum(tail.sum(axis=1), 1), Y[idx, last])
+    b = Y[:, 0]
+    if curve == "exponential":
+        return np.column_stack([a, b, np.log(3.0 / np.maximum(t_last, 1e-9))])
+    return np.column_stack([a, b, np.log(8.0 / span), t_first + 0.5 * span])
+
+
+# ---------------- Fitting ----------------
+def _solve(A, g):
+    """Batched ``A x = g``.  If LAPACK finds a system singular, its row is
+    solved with ``pinv`` instead and flagged."""
+    singular = np.zeros(len(A), dtype=bool)
+    try:
+        return np.linalg.solve(A, g[..., None])[..., 0], singular
+    except np.linalg.LinAlgError:
+        x = np.empty_like(g)
+        for i in range(len(A)):
+            try:
+                x[i] = np.linalg.solve(A[i], g[i])
+            except np.linalg.LinAlgError:
+                x[i] = np.linalg.pinv(A[i]) @ g[i]
+                singular[i] = True
+        return x, singular
+
+
+def fit_curves(series, curve="sigmoid", max_iter=200, tol=1e-10):
+    """Fit ``curve`` to every ``(t, y)`` series at once.
+
+    Returns a dict of per-series arrays: the curve parameters (``k`` as a
+    rate, not its log), their standard errors (``se_<name>``), ``n``,
+    ``rmse``, ``r2``, ``converged`` and ``iterations``.  Series with fewer
+    points than parameters + 1 get NaN.
+    """
+    if curve not in _MODELS:
+        raise ValueError(f"curve must be one of {CURVES}, not {curve!r}")
+    model, names = _MODELS[curve], PARAMS[curve]
+    T, Y, M = pad_series(series)
+    S, P = T.shape[0], len(names)
+    n = M.sum(axis=1)
+    fittable = n > P
+    theta = _initial(curve, T, Y, M, n)
+    theta[~fittable] = 0.0
+
+    with np.errstate(over="ignore", invalid="ignore"):
+        f, J = model(theta, T)
+    r = np.where(M, Y - f, 0.0)
+    cost = (r ** 2).sum(axis=1)
+    lam = np.full(S, 1e-3)
+    # A start that already fits exactly (a constant history) cannot improve
+    converged = fittable & (cost <= 1e-24)
+    active = fittable & ~converged
+    iterations = np.zeros(S, dtype=np.int64)
+    eye = np.eye(P)
+    for _ in range(max_iter):
+        # Only series still iterating take part, so stragglers cost little
+        idx = np.flatnonzero(active)
+        if idx.size == 0:
+            break
+        Ti, Yi, Mi, th, c, la = T[idx], Y[idx], M[idx], theta[idx], cost[idx], lam[idx]
+        Jm = np.where(Mi[..., None], J[idx], 0.0)
+        JT = Jm.transpose(0, 2, 1)
+        with np.errstate(over="ignore", invalid="ignore"):
+            A = JT @ Jm
+            g = (JT @ r[idx][..., None])[..., 0]
+        # Rows that went non-finite drop out; the others get a damping floor,
+        # so a parameter with an all-zero Jacobian column cannot make the
+        # batch singular
+        bad = ~(np.isfinite(A).all(axis=(1, 2)) & np.isfinite(g).all(axis=1))
+        A[bad], g[bad] = eye, 0.0
+        diag = np.diagonal(A, axis1=1, axis2=2)
+        floor = 1e-9 * diag.max(axis=1, keepdims=True) + 1e-12
+        damp = la[:, None, None] * eye * (diag + floor)[:, :, None]
+        delta, singular = _solve(A + damp, g)
+        cand = th + delta
+        with np.errstate(over="ignore", invalid="ignore"):
+            f2, J2 = model(cand, Ti)
+        r2 = np.where(Mi, Yi - f2, 0.0)
+        cost2 = (r2 ** 2).sum(axis=1)
+        better = np.isfinite(cost2) & (cost2 < c) & ~bad
+
+        done = better & ~singular & ((c - cost2 <= tol * np.maximum(c, 1e-300)) | (cost2 <= 1e-24))
+        stuck = ~better & (la > 1e12)
+        b_idx = idx[better]
+        theta[b_idx], r[b_idx], J[b_idx], cost[b_idx] = cand[better], r2[better], J2[better], cost2[better]
+        lam[idx] = np.where(better, np.maximum(la * 0.3, 1e-12), la * 4.0)
+        iterations[idx] += 1
+        converged[idx[done]] = True
+        active[idx[done | stuck | bad | singular]] = False
+
+    # Quality and standard errors (covariance s^2 (J^T J)^-1 at the solution)
+    Jm = np.where(M[..., None], J, 0.0)
+    A = Jm.transpose(0, 2, 1) @ Jm
+    ok = fittable & np.isfinite(A).all(axis=(1, 2))
+    cov = np.full_like(A, np.nan)
+    cov[ok] = np.linalg.pinv(A[ok])
+    dof = np.maximum(n - P, 1)
+    se = np.sqrt(np.abs(np.diagonal(cov, axis1=1, axis2=2)) * (cost / dof)[:, None])
+    mean = (Y * M).sum(axis=1) / np.maximum(n, 1)
+    sst = (np.where(M, Y - mean[:, None], 0.0) ** 2).sum(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        r2_score = np.where(sst > 0, 1 - cost / sst, np.where(cost <= 1e-24, 1.0, np.nan))
+
+    out = {}
+    for j, name in enumerate(names):
+        value, err = theta[:, j].copy(), se[:, j]
+        if name == "k":
+            with np.errstate(over="ignore"):
+                value = np.exp(value)
+            err = value * err  # delta method from log k
+        out[name] = np.where(fittable, value, np.nan)
+        out[f"se_{name}"] = np.where(fittable, err, np.nan)
+    out["n"] = n
+    out["rmse"] = np.where(fittable, np.sqrt(cost / np.maximum(n, 1)), np.nan)
+    out["r2"] = np.where(fittable, r2_score, np.nan)
+    out["converged"] = converged
+    out["iterations"] = iterations
+    return out
+
+
+def write_fits(path, labels, fits, curve):
+    names = PARAMS[curve]
+    columns = list(names) + [f"se_{p}" for p in names] + ["n", "rmse", "r2", "converged", "iterations"]
+    with open(path, "w", newline="") as f:
+        w = csv.writer(f)
+        w.writerow(["run", "region", "curve"] + columns)
+        for i, (run, region) in enumerate(labels):
+            w.writerow([run, region, curve] + [fits[c][i].item() for c in columns])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Batched learning-curve fits of hit-rate histories.")
+    parser.add_argument("runs", nargs="*", help="run files (.npz)")
+    parser.add_argument("--curve", default="sigmoid", choices=CURVES)
+    parser.add_argument("--simulate", type=int, default=None, choices=(1, 2, 3), metavar="MODEL",
+                        help="fit histories of a fresh headless ensemble instead of run files")
+    parser.add_argument("--mode", default="correct")
+    parser.add_argument("--games", type=int, default=1000)
+    parser.add_argument("--steps", type=int, default=72000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-iter", type=int, default=200)
+    parser.add_argument("--out", default="fits.csv")
+    args = parser.parse_args(argv)
+
+    if args.simulate is not None:
+        from .engine import Ensemble
+        ens = Ensemble(args.simulate, n_games=args.games, mode=args.mode, seed=args.seed, record_history=True)
+        ens.run(args.steps)
+        labels, series = series_from_ensemble(ens)
+    elif args.runs:
+        labels, series = series_from_runs(args.runs)
+    else:
+        parser.error("give run files or --simulate MODEL")
+
+    start = time.perf_counter()
+    fits = fit_curves(series, args.curve, args.max_iter)
+    elapsed = time.perf_counter() - start
+    ok = ~np.isnan(fits["rmse"])
+    print(f"{ok.sum()} of {len(series)} series fitted ({args.curve}) in {elapsed:.2f} s; "
+          f"{int(fits['converged'].sum())} converged")
+    if ok.any():
+        print(f"median RMSE {np.median(fits['rmse'][ok]):.4f}, median R² {np.nanmedian(fits['r2'][ok]):.3f}, "
+              f"median asymptote {np.median(fits['a'][ok]):.3f}, median k {np.median(fits['k'][ok]):.4g}")
+    write_fits(args.out, labels, fits, args.curve)
+    print(f"Fits saved to '{args.out}'")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,325 @@
+"""Gaussian-process emulator of hit rate over a model's parameter space.
+
+The emulator is trained on cached simulation results: design points with
+the mean hit rate of ``replicates`` games each, and the variance of that
+mean.  It returns a prediction with a standard deviation in well under a
+millisecond.  New simulations are requested only where the predictive
+standard deviation is highest.  Each round scores a Sobol candidate set
+and picks a batch by "kriging believer": the chosen point is added at its
+predicted mean so the next pick goes elsewhere.
+
+The GP uses NumPy only.  Inputs are scaled to the unit cube, and the
+kernel is a squared exponential with one length scale per parameter.  The
+known simulation noise of each point plus a fitted nugget goes on the
+diagonal.  Hyperparameters maximize the log marginal likelihood (Adam on
+its analytic gradient)::
+
+    python -m eap_pong.emulator build --model 3 --cache emu3.npz --initial 64 --rounds 6 --batch 16
+    python -m eap_pong.emulator predict --cache emu3.npz RETENTION_FACTOR=0.7 NOISE_FACTOR=1.5
+
+From a notebook::
+
+    emu = Emulator.load("emu3.npz")
+    mean, sd = emu.predict({"RETENTION_FACTOR": 0.7, "NOISE_FACTOR": 1.5})
+"""
+
+import argparse
+import json
+import time
+
+import numpy as np
+
+from .engine import Ensemble, default_params
+from .sensitivity import PARAMETER_RANGES, sobol_sequence
+
+# Variance given to a design point where no replicate game had a trial: its
+# hit rate is unknown, so it must not pull the fit (rates vary by at most 0.25)
+UNINFORMED_VARIANCE = 1.0
+
+
+# ---------------- Gaussian process ----------------
+class GaussianProcess:
+    """GP regression on the unit cube with ARD squared-exponential kernel."""
+
+    def __init__(self, dim):
+        self.log_ls = np.full(dim, np.log(0.3))
+        self.log_sf2 = 0.0
+        self.log_sn2 = np.log(1e-3)
+
+    def _kernel(self, A, B):
+        d = (A[:, None, :] - B[None, :, :]) / np.exp(self.log_ls)
+        return np.exp(self.log_sf2 - 0.5 * (d ** 2).sum(axis=-1))
+
+    def fit(self, X, y, noise=None, iters=300, lr=0.05):
+        """Fit hyperparameters and condition on ``(X, y)``; ``noise`` is the known variance per point."""
+        self.X = np.asarray(X, dtype=float)
+        y = np.asarray(y, dtype=float)
+        self.y_mean, self.y_std = y.mean(), y.std() or 1.0
+        self.z = (y - self.y_mean) / self.y_std
+        self.noise = (np.zeros(len(y)) if noise is None else np.asarray(noise, dtype=float)) / self.y_std ** 2
+
+        theta = np.concatenate([self.log_ls, [self.log_sf2, self.log_sn2]])
+        m, v = np.zeros_like(theta), np.zeros_like(theta)
+        lo = np.r_[np.full(len(self.log_ls), np.log(0.02)), np.log(1e-2), np.log(1e-8)]
+        hi = np.r_[np.full(len(self.log_ls), np.log(20.0)), np.log(1e2), np.log(1.0)]
+        for i in range(1, iters + 1):
+            _, grad = self._lml(theta)
+            m = 0.9 * m + 0.1 * grad
+            v = 0.999 * v + 0.001 * grad ** 2
+            theta = np.clip(theta + lr * (m / (1 - 0.9 ** i)) / (np.sqrt(v / (1 - 0.999 ** i)) + 1e-8), lo, hi)
+        self._set(theta)
+        self._condition()
+        return self
+
+    def _set(self, theta):
+        self.log_ls, self.log_sf2, self.log_sn2 = theta[:-2], theta[-2], theta[-1]
+
+    def _lml(self, theta):
+        """Log marginal likelihood and its gradient in log hyperparameters."""
+        self._set(theta)
+        X, n = self.X, len(self.X)
+        diff2 = ((X[:, None, :] - X[None, :, :]) / np.exp(self.log_ls)) ** 2
+        K = np.exp(self.log_sf2 - 0.5 * diff2.sum(axis=-1))
+        S = K + np.diag(self.noise + np.exp(self.log_sn2) + 1e-10)
+        L = np.linalg.cholesky(S)
+        alpha = np.linalg.solve(L.T, np.linalg.solve(L, self.z))
+        Sinv = np.linalg.solve(L.T, np.linalg.solve(L, np.eye(n)))
+        W = np.outer(alpha, alpha) - Sinv
+        lml = -0.5 * self.z @ alpha - np.log(np.diag(L)).sum() - 0.5 * n * np.log(2 * np.pi)
+        grad_ls = 0.5 * np.einsum("ij,ijd->d", W * K, diff2)
+        grad_sf2 = 0.5 * (W * K).sum()
+        grad_sn2 = 0.5 * np.trace(W) * np.exp(self.log_sn2)
+        return lml, np.r_[grad_ls, grad_sf2, grad_sn2]
+
+    def _condition(self):
+        K = self._kernel(self.X, self.X) + np.diag(self.noise + np.exp(self.log_sn2) + 1e-10)
+        self.L = np.linalg.cholesky(K)
+        self.alpha = np.linalg.solve(self.L.T, np.linalg.solve(self.L, self.z))
+
+    def predict(self, Xs):
+        """Predictive mean and standard deviation of the latent function at ``Xs``."""
+        Ks = self._kernel(np.atleast_2d(Xs), self.X)
+        mean = Ks @ self.alpha
+        v = np.linalg.solve(self.L, Ks.T)
+        var = np.maximum(np.exp(self.log_sf2) - (v ** 2).sum(axis=0), 0.0)
+        return self.y_mean + self.y_std * mean, self.y_std * np.sqrt(var)
+
+    def loo(self):
+        """Leave-one-out predictive means and standard deviations (closed form)."""
+        Kinv = np.linalg.solve(self.L.T, np.linalg.solve(self.L, np.eye(len(self.X))))
+        d = np.diag(Kinv)
+        return self.y_mean + self.y_std * (self.z - self.alpha / d), self.y_std * np.sqrt(1 / d)
+
+
+# ---------------- Emulator ----------------
+class Emulator:
+    """Hit-rate emulator for one model and mode over ``ranges``, with its simulation cache."""
+
+    def __init__(self, model, ranges=None, mode="correct", steps=20000, replicates=8, seed=0):
+        self.model, self.mode, self.steps, self.replicates, self.seed = model, mode, steps, replicates, seed
+        self.ranges = dict(ranges or PARAMETER_RANGES[model])
+        self.names = list(self.ranges)
+        self.lows = np.array([lo for lo, _ in self.ranges.values()])
+        self.highs = np.array([hi for _, hi in self.ranges.values()])
+        defaults = default_params(model)
+        self.defaults = np.array([np.clip(defaults.get(n, (lo + hi) / 2), lo, hi)
+                                  for n, (lo, hi) in self.ranges.items()])
+        self.U = np.zeros((0, len(self.names)))
+        self.y = np.zeros(0)
+        self.noise = np.zeros(0)
+        self.sim_seconds = 0.0
+        self.gp = None
+
+    # ---------------- Simulation ----------------
+    def simulate(self, unit):
+        """Run the simulator at unit-cube points and add them to the cache.
+
+        Returns each point's mean hit rate (NaN where no game had a trial).
+        """
+        unit = np.atleast_2d(unit)
+        values = self.lows + unit * (self.highs - self.lows)
+        R = self.replicates
+        params = {n: np.repeat(values[:, i], R) for i, n in enumerate(self.names)}
+        start = time.perf_counter()
+        ens = Ensemble(self.model, n_games=len(unit) * R, params=params, mode=self.mode,
+                       seed=self.seed + len(self.y))
+        ens.run(self.steps)
+        self.sim_seconds += time.perf_counter() - start
+        rates = ens.summary()["hit_rate"].reshape(len(unit), R)
+        # Games without a single trial carry no information about the hit rate
+        ok = ~np.isnan(rates)
+        k = np.maximum(ok.sum(axis=1), 1)
+        mean = np.where(ok, rates, 0.0).sum(axis=1) / k
+        var = np.maximum((np.where(ok, rates - mean[:, None], 0.0) ** 2).sum(axis=1) / np.maximum(k - 1, 1) / k,
+                         1e-6)
+        # ...and a point where none had one is kept, so it is not proposed
+        # again, at the mean of the informed points with a huge variance
+        blind = ~ok.any(axis=1)
+        informed = np.r_[self.y[self.noise < UNINFORMED_VARIANCE], mean[~blind]]
+        mean[blind] = informed.mean() if informed.size else 0.5
+        var[blind] = UNINFORMED_VARIANCE
+        self.U = np.vstack([self.U, unit])
+        self.y = np.r_[self.y, mean]
+        self.noise = np.r_[self.noise, var]
+        return np.where(blind, np.nan, mean)
+
+    def fit(self, iters=300):
+        self.gp = GaussianProcess(len(self.names)).fit(self.U, self.y, self.noise, iters)
+        return self
+
+    # ---------------- Prediction ----------------
+    def to_unit(self, params):
+        """Dict (missing names take the model default) or array of values -> unit-cube rows."""
+        if isinstance(params, dict):
+            unknown = set(params) - set(self.names)
+            if unknown:
+                raise ValueError(f"unknown parameters {sorted(unknown)}; the emulator covers {self.names}")
+            cols = []
+            for i, n in enumerate(self.names):
+                cols.append(np.atleast_1d(np.asarray(params.get(n, self.defaults[i]), dtype=float)))
+            values = np.column_stack(np.broadcast_arrays(*cols))
+        else:
+            values = np.atleast_2d(np.asarray(params, dtype=float))
+        return (values - self.lows) / (self.highs - self.lows)
+
+    def predict(self, params):
+        """Predicted hit rate and its standard deviation (arrays when params are arrays)."""
+        mean, sd = self.gp.predict(self.to_unit(params))
+        mean = np.clip(mean, 0.0, 1.0)
+        return (mean[0], sd[0]) if mean.size == 1 else (mean, sd)
+
+    # ---------------- Adaptive sampling ----------------
+    def propose(self, batch=8, candidates=4096):
+        """Next ``batch`` unit-cube points where the emulator is least certain."""
+        cand = sobol_sequence(candidates, len(self.names), skip=1 + len(self.y) * 7)
+        gp = self.gp
+        X, z, noise = gp.X, gp.z * gp.y_std + gp.y_mean, gp.noise * gp.y_std ** 2
+        chosen = []
+        for _ in range(batch):
+            _, sd = gp.predict(cand)
+            j = int(np.argmax(sd))
+            chosen.append(cand[j])
+            # Kriging believer: pretend the prediction was observed, then condition again
+            mean_j, _ = gp.predict(cand[j:j + 1])
+            X, z, noise = np.vstack([X, cand[j]]), np.r_[z, mean_j], np.r_[noise, 1e-6]
+            gp = _conditioned(self.gp, X, z, noise)
+            cand = np.delete(cand, j, axis=0)
+        return np.array(chosen)
+
+    def build(self, initial=32, rounds=4, batch=8, log=print):
+        """Initial Sobol design, then ``rounds`` of uncertainty-driven batches."""
+        if len(self.y) == 0:
+            self.simulate(sobol_sequence(initial, len(self.names)))
+        self.fit()
+        log(self._status("initial"))
+        for r in range(rounds):
+            self.simulate(self.propose(batch))
+            self.fit()
+            log(self._status(f"round {r + 1}"))
+        return self
+
+    def _status(self, label):
+        loo_mean, loo_sd = self.gp.loo()
+        rmse = np.sqrt(np.mean((loo_mean - self.y) ** 2))
+        _, sd = self.gp.predict(sobol_sequence(512, len(self.names), skip=12345))
+        return (f"{label}: {len(self.y)} points, LOO RMSE {rmse:.4f}, "
+                f"max sd {sd.max():.4f}, mean sd {sd.mean():.4f}, simulation {self.sim_seconds:.1f} s")
+
+    # ---------------- Cache ----------------
+    def save(self, path):
+        config = {"model": self.model, "mode": self.mode, "steps": self.steps, "replicates": self.replicates,
+                  "seed": self.seed, "ranges": self.ranges, "sim_seconds": self.sim_seconds}
+        with open(path, "wb") as f:
+            np.savez(f, U=self.U, y=self.y, noise=self.noise, config=np.asarray(json.dumps(config)),
+                     hyper=np.r_[self.gp.log_ls, self.gp.log_sf2, self.gp.log_sn2] if self.gp else np.zeros(0))
+        return path
+
+    @classmethod
+    def load(cls, path, refit=False):
+        """Emulator from a cache file, conditioned on its points (``refit`` re-tunes hyperparameters)."""
+        with np.load(path) as data:
+            config = json.loads(str(data["config"]))
+            emu = cls(config["model"], {k: tuple(v) for k, v in config["ranges"].items()}, config["mode"],
+                      config["steps"], config["replicates"], config["seed"])
+            emu.U, emu.y, emu.noise = data["U"], data["y"], data["noise"]
+            emu.sim_seconds = config["sim_seconds"]
+            hyper = data["hyper"]
+        if refit or hyper.size == 0:
+            return emu.fit()
+        gp = GaussianProcess(len(emu.names))
+        gp._set(hyper)
+        emu.gp = _conditioned(gp, emu.U, emu.y, emu.noise)
+        return emu
+
+
+def _conditioned(gp, X, y, noise):
+    """Copy of ``gp`` with the same hyperparameters conditioned on new data."""
+    new = GaussianProcess(len(gp.log_ls))
+    new._set(np.r_[gp.log_ls, gp.log_sf2, gp.log_sn2])
+    new.X = X
+    new.y_mean, new.y_std = getattr(gp, "y_mean", y.mean()), getattr(gp, "y_std", y.std() or 1.0)
+    new.z = (y - new.y_mean) / new.y_std
+    new.noise = noise / new.y_std ** 2
+    new._condition()
+    return new
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Gaussian-process emulator of hit rate.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("build", help="simulate, fit and refine adaptively (resumes from --cache)")
+    p.add_argument("--model", type=int, default=None, choices=(1, 2, 3), help="default 3")
+    p.add_argument("--mode", default=None, help="default correct")
+    p.add_argument("--param", action="append", default=[], metavar="NAME=LOW:HIGH",
+                   help="parameter range (default: the sensitivity ranges of the model)")
+    p.add_argument("--steps", type=int, default=None, help="default 20000")
+    p.add_argument("--replicates", type=int, default=None, help="games per design point (default 8)")
+    p.add_argument("--initial", type=int, default=32)
+    p.add_argument("--rounds", type=int, default=4)
+    p.add_argument("--batch", type=int, default=8)
+    p.add_argument("--seed", type=int, default=None, help="default 0")
+    p.add_argument("--cache", default="emulator.npz")
+    p = sub.add_parser("predict", help="instant prediction at a parameter point")
+    p.add_argument("--cache", default="emulator.npz")
+    p.add_argument("values", nargs="*", metavar="NAME=VALUE")
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        ranges = None
+        if args.param:
+            ranges = {}
+            for spec in args.param:
+                name, bounds = spec.split("=")
+                lo, hi = bounds.split(":")
+                ranges[name] = (float(lo), float(hi))
+        try:
+            emu = Emulator.load(args.cache)
+        except FileNotFoundError:
+            emu = Emulator(args.model or 3, ranges, args.mode or "correct", args.steps or 20000,
+                           args.replicates or 8, args.seed or 0)
+        else:
+            # A cache only extends the same experiment; options given must agree with it
+            asked = {"model": args.model, "mode": args.mode, "steps": args.steps,
+                     "replicates": args.replicates, "seed": args.seed, "ranges": ranges}
+            for name, value in asked.items():
+                if value is not None and value != getattr(emu, name):
+                    raise ValueError(f"'{args.cache}' was built with {name}={getattr(emu, name)!r}, "
+                                     f"not {value!r}; use another --cache")
+            print(f"Resuming from '{args.cache}' ({len(emu.y)} points)")
+        emu.build(args.initial, args.rounds, args.batch)
+        emu.save(args.cache)
+        print(f"Emulator saved to '{args.cache}'")
+    else:
+        emu = Emulator.load(args.cache)
+        params = {k: float(v) for k, v in (s.split("=") for s in args.values)}
+        start = time.perf_counter()
+        mean, sd = emu.predict(params)
+        elapsed = time.perf_counter() - start
+        shown = ", ".join(f"{n}={v:g}" for n, v in zip(emu.names, emu.lows + emu.to_unit(params)[0]
+                                                        * (emu.highs - emu.lows)))
+        print(f"Model {emu.model} ({emu.mode}) at {shown}")
+        print(f"hit rate {mean:.4f} ± {sd:.4f}  ({elapsed * 1e3:.2f} ms)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,808 @@
+"""Headless, batched engine for the three Pong models.
+
+``Ensemble`` advances ``n_games`` independent games in lock-step as NumPy
+arrays.  Each frame reproduces one pass of the main loop of the matching
+Thesis_Model script; the wall clock of the scripts is replaced by a
+simulated clock that advances ``dt`` seconds per frame, so runs do not
+depend on how fast the host or the display is.
+
+Every numeric parameter may be a scalar or one value per game, which lets
+a single ensemble evaluate many parameter points at once.
+
+With ``swept=True`` collisions are found at the exact crossing point along
+the ball's path instead of by testing the end position of each frame.
+
+A step covers ``frames_per_step`` frames.  Every frame inside it still has
+its own ball motion, noise draw and paddle decision, so outcomes do not
+depend on the step size; only the work done once per step (the ``run``
+callback, early stopping, telemetry) is spread over more frames.
+
+With ``precision="float32"`` ball, paddle, current and gel state are
+stored and updated in single precision, which halves the memory traffic
+per game.  Simulated clocks and the timers measured against them stay in
+float64.
+"""
+
+import numpy as np
+
+from .arena import Arena
+from .rng import CounterStreams
+
+# Simulated seconds per frame (the scripts run at roughly the Tk frame rate)
+FRAME_DT = 1 / 60
+
+MODES = ("correct", "scrambled_paddle", "scrambled_sensor")
+
+# Independent counter-based streams, one per stochastic source and game
+# (eap_pong.rng).  Game g with a given seed sees the same launches and
+# sensor noise whatever model or mode it runs, which is what the paired
+# comparisons in eap_pong.compare rely on, and whatever ensemble or shard
+# it runs in.  Per-frame draws are generated FRAME_BLOCK frames at a time.
+STREAMS = ("launch", "noise", "paddle", "response", "sensor")
+LAUNCH_BLOCK = 32
+FRAME_BLOCK = 64
+
+# ----------------- DEFAULT PARAMETERS (as in the scripts) -----------------
+MODEL_DEFAULTS = {
+    1: {
+        "stimulus_current": 6.0,
+        "gel_dt": 0.1,
+        "base_threshold": 60.0,
+        "min_threshold": 12.0,
+        "learning_rate": 0.08,
+        "current_decay": 0.95,
+        "max_response_duration": 1.0,
+        "max_refractory": 1.0,
+        "count_interval": 0.8,
+        "paddle_speed": 4.0,
+        "ball_speed": 3.0,
+    },
+    2: {
+        "SLOW_FACTOR": 1.0,
+        "NOISE_FACTOR": 1.0,
+        "NOISE_BASELINE": 0.3,
+        "ON_CURRENT": 2.0,
+        "paddle_update_dt": 0.1,
+    },
+    3: {
+        "SLOW_FACTOR": 2.0,
+        "NOISE_FACTOR": 0.5,
+        "NOISE_BASELINE": 0.32,
+        "RETENTION_FACTOR": 0.9,
+        "BASELINE": 0.32,
+        "AMPLITUDE": 7.32,
+        "TAU": 123.47,
+        "paddle_update_dt": 0.1,
+    },
+}
+
+MAX_SINE_AMPLITUDE = 0.35
+LOW_RANGE_C, UP_RANGE_C = -7.0, 7.6
+SCRAMBLED_TARGETS = np.array([-300.0, 0.0, 300.0])
+
+PRECISIONS = {"float64": np.float64, "float32": np.float32}
+# Parameters compared against the float64 clocks keep full precision
+CLOCK_PARAMS = ("paddle_update_dt", "count_interval", "TAU", "gel_dt", "max_response_duration",
+                "max_refractory")
+
+# Walls and the paddle only flip the signs of a Model 2/3 velocity, so once
+# _normalize_velocity has seen a launch it leaves that ball alone until the
+# next one.  Beyond this SLOW_FACTOR even a rescaled ball is below the
+# minimum speed and is rescaled again every frame.
+MAX_STEADY_SLOW_FACTOR = 500.0
+
+# Geometry shared by all three scripts
+WALL_Y = 435.0
+RIGHT_WALL_X = 285.0
+PADDLE_X_MIN, PADDLE_X_MAX = -290.0, -260.0
+PADDLE_HALF = 150.0
+PADDLE_LIMIT = 300.0
+
+
+def chain(*callbacks):
+    """One ``Ensemble.run`` callback calling each of ``callbacks`` (``None``
+    entries are skipped) every step; it is truthy if any of them is."""
+    callbacks = [cb for cb in callbacks if cb is not None]
+
+    def callback(ens):
+        stop = False
+        for cb in callbacks:
+            stop = bool(cb(ens)) or stop
+        return stop
+    return callback
+
+
+def default_params(model):
+    """Copy of the script defaults for ``model`` (1, 2 or 3)."""
+    return dict(MODEL_DEFAULTS[model])
+
+
+class Ensemble:
+    """``n_games`` independent games of one model advancing together.
+
+    State lives in arrays of shape ``(n_games,)`` for the ball and paddle and
+    ``(n_games, n_regions)`` for per-region quantities.  ``region_hits`` and
+    ``region_trials`` count paddle-plane outcomes by the region of the ball,
+    as in Models 2 and 3.  With ``record_history=True`` each miss appends
+    ``(t, rates)`` to ``history[g]``, mirroring ``region_history``/``region_time``.
+
+    A rally runs from one miss to the next (for Models 2 and 3: from one
+    launch to its miss).  With ``record_rallies=True``, ``rally_first_hit``
+    and ``rally_hits`` hold, per game and rally, whether the first arrival
+    at the paddle plane was a hit (-1 until it happens) and how many hits
+    the rally had; only the first ``misses[g]`` rallies of game ``g`` are
+    complete.
+
+    In ``scrambled_sensor`` mode sensor ``j`` of game ``g`` reads region
+    ``sensor_perm[g, j]``: the Model 2 decision sees the currents gathered
+    through the permutation, and Models 1 and 3 place the paddle as if the
+    ball (or responding gel) were in the region of the sensor that reports
+    it.  Every game draws its own permutation, re-drawn every
+    ``rescramble_every`` simulated seconds when that is given.
+
+    Random draws depend only on ``seed`` and the game ID, which is
+    ``first_game + g``: a shard built with ``first_game=k`` reproduces games
+    ``k, k+1, ...`` of a single large ensemble exactly.
+
+    ``swept=True`` resolves wall, paddle and back-plane crossings
+    continuously within a frame; a hit is a crossing of the paddle face
+    while the paddle covers the crossing point.  ``frames_per_step`` frames
+    make one step, each advanced exactly as with ``frames_per_step=1``;
+    ``steps`` counts steps and ``frames`` counts frames.
+
+    ``precision`` is ``"float64"`` (default) or ``"float32"`` for the
+    per-game state; ``t``, ``last_paddle_update``, ``region_last_update``,
+    ``region_elapsed``, ``region_first_on_time``, ``last_count_time`` and
+    the Model 1 timers ``response_duration`` and ``refractory_period`` are
+    float64 accumulators in either case (see eap_pong.precision for a
+    comparison of the two).
+
+    ``flight_cache`` (an ``eap_pong.flight.FlightCache`` of the same
+    precision and arena layout) serves Models 2 and 3 on cached launch
+    flights: until a ball first reaches the paddle plane, its region is
+    read from its flight's timeline rather than looked up.  Results are the
+    same as without the cache (with the cache's ``quantum``, launches are
+    rounded to it).  Not with ``swept=True``.
+    """
+
+    def __init__(self, model=2, n_games=1, params=None, mode="correct", arena=None,
+                 seed=None, dt=FRAME_DT, record_history=False, record_rallies=False,
+                 rescramble_every=None, first_game=0, swept=False, frames_per_step=1,
+                 precision="float64", flight_cache=None):
+        if model not in MODEL_DEFAULTS:
+            raise ValueError(f"unknown model {model!r}")
+        if mode not in MODES:
+            raise ValueError(f"unknown mode {mode!r}")
+        if precision not in PRECISIONS:
+            raise ValueError(f"precision must be one of {sorted(PRECISIONS)}, not {precision!r}")
+        self.precision = precision
+        self.dtype = PRECISIONS[precision]
+        self.model = model
+        self.mode = mode
+        self.n_games = int(n_games)
+        self.arena = arena or Arena()
+        self.dt = dt
+        if frames_per_step < 1:
+            raise ValueError(f"frames_per_step must be >= 1, got {frames_per_step}")
+        self.swept = swept
+        self.frames_per_step = int(frames_per_step)
+        self.rng = CounterStreams(seed, STREAMS)
+        self.seed_entropy = self.rng.entropy
+        self.first_game = int(first_game)
+        self._frame_blocks = {}
+        self.record_history = record_history
+        self.record_rallies = record_rallies
+
+        params = {**MODEL_DEFAULTS[model], **(params or {})}
+        unknown = set(params) - set(MODEL_DEFAULTS[model])
+        if unknown:
+            raise ValueError(f"unknown parameters for model {model}: {sorted(unknown)}")
+        self.params = params
+        self.p = {k: self._per_game(v, np.float64 if k in CLOCK_PARAMS else self.dtype)
+                  for k, v in params.items()}
+
+        G, N = self.n_games, self.arena.n_regions
+        self.steps = 0
+        self.frames = 0
+        self.t = 0.0
+        f = self.dtype
+        self.x = np.zeros(G, dtype=f)
+        self.y = np.zeros(G, dtype=f)
+        self.dx = np.zeros(G, dtype=f)
+        self.dy = np.zeros(G, dtype=f)
+        self.paddle_y = np.zeros(G, dtype=f)
+        self.score = np.zeros(G, dtype=np.int64)
+        self.misses = np.zeros(G, dtype=np.int64)
+        self.region_hits = np.zeros((G, N), dtype=np.int64)
+        self.region_trials = np.zeros((G, N), dtype=np.int64)
+        self.currents = np.zeros((G, N), dtype=f)
+        self.active = np.zeros(G, dtype=np.int64)
+        self.history = [[] for _ in range(G)] if record_history else None
+        self._rows = np.arange(G)
+        self._sensor_idx = np.arange(N)
+        self.launches = np.zeros(G, dtype=np.int64)
+        self._launch_blocks = []
+        # games whose velocity _normalize_velocity has not seen since their launch
+        self._unnormalized = np.zeros(0, dtype=np.int64)
+        self._steady_speed = model != 1 and not (self.p["SLOW_FACTOR"] > MAX_STEADY_SLOW_FACTOR).any()
+        if flight_cache is not None:
+            if model == 1 or swept:
+                raise ValueError("flight_cache replays the frame-end flights of Models 2 and 3; "
+                                 "it needs swept=False")
+            if not self._steady_speed:
+                raise ValueError(f"flight_cache needs SLOW_FACTOR <= {MAX_STEADY_SLOW_FACTOR}")
+            if flight_cache.dtype != self.dtype:
+                raise ValueError(f"flight_cache holds {np.dtype(flight_cache.dtype).name} flights, "
+                                 f"the ensemble runs at {precision}")
+            if _layout(flight_cache.arena) != _layout(self.arena):
+                raise ValueError("flight_cache was traced for a different arena layout")
+        self.flight_cache = flight_cache
+        # Per game: cache slot of the flight the ball is on (-1 when none),
+        # frame it was served at, its current entry of the flight's timeline
+        # with that entry's region, and the flight frames of the next entry
+        # and of the arrival at the paddle plane
+        self._flight_slot = np.full(G, -1, dtype=np.int64)
+        self._flight_start = np.zeros(G, dtype=np.int64)
+        self._flight_run = np.zeros(G, dtype=np.int64)
+        self._flight_region = np.zeros(G, dtype=np.int64)
+        self._flight_next = np.zeros(G, dtype=np.int64)
+        self._flight_arrival = np.zeros(G, dtype=np.int64)
+        self.rescramble_every = rescramble_every
+        self.sensor_perm = None
+        if mode == "scrambled_sensor":
+            self._scramble_sensors()
+        if record_rallies:
+            self.rally_first_hit = np.full((G, 64), -1, dtype=np.int8)
+            self.rally_hits = np.zeros((G, 64), dtype=np.int64)
+            self._rally_events = np.zeros(G, dtype=np.int64)
+
+        if model == 1:
+            self._init_model1()
+            self.dx[:] = 3.0
+            self.dy[:] = 3.0
+        else:
+            self.last_paddle_update = np.zeros(G)
+            self.region_was_on = np.zeros((G, N), dtype=bool)
+            if model == 2:
+                self.region_last_update = np.full((G, N), np.nan)
+                self.region_elapsed = np.zeros((G, N))
+            else:
+                self.region_first_on_time = np.full((G, N), np.nan)
+                self.region_mem_scale = np.ones((G, N), dtype=f)
+            self._launch(np.ones(G, dtype=bool))
+
+    def _per_game(self, value, dtype=np.float64):
+        arr = np.asarray(value, dtype=float)
+        if arr.ndim == 0:
+            return np.full(self.n_games, float(arr), dtype=dtype)
+        if arr.shape != (self.n_games,):
+            raise ValueError(f"per-game parameter needs shape ({self.n_games},), got {arr.shape}")
+        return arr.astype(dtype)
+
+    def _init_model1(self):
+        G, N, f = self.n_games, self.arena.n_regions, self.dtype
+        self.gel_current = np.zeros((G, N), dtype=f)
+        self.threshold = np.repeat(self.p["base_threshold"][:, None], N, axis=1)
+        self.stimulation_count = np.zeros((G, N), dtype=np.int64)
+        self.successful_responses = np.zeros((G, N), dtype=np.int64)
+        self.response_probability = np.zeros((G, N), dtype=f)
+        self.is_responding = np.zeros((G, N), dtype=bool)
+        self.response_duration = np.zeros((G, N))
+        self.last_count_time = np.full((G, N), np.nan)
+        self.refractory_period = np.zeros((G, N))
+        self.total_stimulations = np.zeros(G, dtype=np.int64)
+        self.paddle_is_active = np.zeros(G, dtype=bool)
+        self.active_region = np.full(G, -1, dtype=np.int64)
+        bounds = self.arena.boundaries()
+        self._region_min = np.array([bounds[n]["min"] for n in self.arena.names], dtype=f)
+        self._region_max = np.array([bounds[n]["max"] for n in self.arena.names], dtype=f)
+
+    def _scramble_sensors(self):
+        """Draw a fresh sensor-to-region permutation for every game."""
+        G, N = self.n_games, self.arena.n_regions
+        epoch = int(self.t // self.rescramble_every) if self.rescramble_every else 0
+        u = self.rng.random("sensor", self.first_game, G, epoch * N, N)
+        self.sensor_perm = u.T.argsort(axis=1)
+        self._sensor_inv = self.sensor_perm.argsort(axis=1)
+        self._sensor_epoch = epoch
+
+    def _sensed(self, region):
+        """Region each game's controller attributes an event in ``region`` to."""
+        if self.sensor_perm is None:
+            return region
+        return self._sensor_inv[self._rows, region]
+
+    def _frame_uniforms(self, source, width):
+        """This frame's ``width`` uniforms per game from ``source``, shape (n_games, width).
+
+        Frame ``f`` (1-based) uses draws ``(f-1)*width ...`` of every game,
+        whatever ``frames_per_step`` is; they are generated for FRAME_BLOCK
+        frames at a time.
+        """
+        block, slot = divmod(self.frames - 1, FRAME_BLOCK)
+        cached = self._frame_blocks.get(source)
+        if cached is None or cached[0] != block:
+            u = self.rng.random(source, self.first_game, self.n_games,
+                                block * FRAME_BLOCK * width, FRAME_BLOCK * width)
+            u = u.astype(self.dtype, copy=False).reshape(FRAME_BLOCK, width, self.n_games)
+            cached = self._frame_blocks[source] = (block, u)
+        return cached[1][slot].T
+
+    # ---------------- BALL ----------------
+    def _launch_uniforms(self, games):
+        """Uniforms for the next launch of each game in ``games``, shape (n, 3).
+
+        Launch k of game g always uses draws 3k .. 3k+2 of its launch
+        stream.  They are generated in blocks of LAUNCH_BLOCK launches for
+        every game at once, and do not depend on when other games miss.
+        """
+        block, slot = np.divmod(self.launches[games], LAUNCH_BLOCK)
+        while len(self._launch_blocks) <= block.max():
+            self._launch_blocks.append(
+                self.rng.random("launch", self.first_game, self.n_games,
+                                len(self._launch_blocks) * LAUNCH_BLOCK * 3, LAUNCH_BLOCK * 3)
+                .reshape(LAUNCH_BLOCK, 3, self.n_games))
+        u = np.empty((games.size, 3))
+        for b in np.unique(block):
+            sel = block == b
+            u[sel] = self._launch_blocks[b][slot[sel], :, games[sel]]
+        self.launches[games] += 1
+        # blocks every game has moved past are no longer needed
+        for b in range(int(self.launches.min()) // LAUNCH_BLOCK):
+            self._launch_blocks[b] = None
+        return u
+
+    def _launch(self, mask):
+        """initialize_ball_speed() for the games in ``mask``."""
+        games = np.flatnonzero(mask)
+        if games.size == 0:
+            return
+        u = self._launch_uniforms(games)
+        sf = self.p["SLOW_FACTOR"][games]
+        self.dx[games] = (4 + 4 * u[:, 0]) / sf
+        self.dy[games] = (1 + 7 * u[:, 1]) * np.where(u[:, 2] < 0.5, -1.0, 1.0) / sf
+        self._unnormalized = np.concatenate((self._unnormalized, games))
+        if self.flight_cache is not None:
+            self._board(games)
+
+    def _board(self, games):
+        """Put the balls just served in ``games`` on their cached flights."""
+        cache = self.flight_cache
+        self._land(games[self._flight_slot[games] >= 0])
+        if cache.quantum is not None:
+            self.dx[games], self.dy[games] = cache.quantize(self.dx[games], self.dy[games])
+        slot = cache.lookup(self.dx[games], self.dy[games], pin=True)
+        self._flight_slot[games] = slot
+        self._flight_start[games] = self.frames
+        # a timeline starts at flight frame 1
+        self._flight_run[games] = 0
+        self._flight_region[games] = cache.region[slot, 0]
+        self._flight_next[games] = cache.frame[slot, 1]
+        self._flight_arrival[games] = cache.arrival[slot]
+
+    def _land(self, games):
+        """Take the balls in ``games`` off their flights; they are stepped from here on."""
+        if games.size:
+            self.flight_cache.release(self._flight_slot[games])
+            self._flight_slot[games] = -1
+
+    def _flight_regions(self):
+        """This frame's region of every ball: from its flight's timeline while
+        it is on one, looked up for the others."""
+        cache = self.flight_cache
+        flying = self._flight_slot >= 0
+        frame = self.frames - self._flight_start
+        # at the paddle plane the engine takes over again
+        landed = flying & (frame >= self._flight_arrival)
+        if landed.any():
+            self._land(np.flatnonzero(landed))
+            flying &= ~landed
+        # the tables are only read when a ball moves on to its next entry
+        advance = np.flatnonzero(flying & (frame >= self._flight_next))
+        if advance.size:
+            slot, run = self._flight_slot[advance], self._flight_run[advance] + 1
+            self._flight_run[advance] = run
+            self._flight_region[advance] = cache.region[slot, run]
+            self._flight_next[advance] = cache.frame[slot, run + 1]
+        if not flying.any():
+            return self.arena.region_index(self.x, self.y)
+        region = self._flight_region.copy()
+        stepped = ~flying
+        region[stepped] = self.arena.region_index(self.x[stepped], self.y[stepped])
+        return region
+
+    def _normalize_velocity(self):
+        if self._steady_speed:
+            # only balls launched since the last call can be out of range
+            games, self._unnormalized = self._unnormalized, self._unnormalized[:0]
+            if games.size:
+                speed = np.hypot(self.dx[games], self.dy[games])
+                sf = self.p["SLOW_FACTOR"][games]
+                out = (speed < np.maximum(0.01, 2.0 / sf)) | (speed > 12.0 / sf)
+                scale = np.where(out, (6.0 / sf) / np.where(speed > 0, speed, 1), 1.0)
+                self.dx[games] *= scale
+                self.dy[games] *= scale
+                if self.flight_cache is not None:
+                    # a rescaled ball is no longer on the flight of its serve
+                    self._land(games[out & (self._flight_slot[games] >= 0)])
+            return
+        speed = np.hypot(self.dx, self.dy)
+        if self.model == 1:
+            scale = np.where(speed > 0, self.p["ball_speed"] / np.where(speed > 0, speed, 1), 1.0)
+        else:
+            sf = self.p["SLOW_FACTOR"]
+            min_speed = np.maximum(0.01, 2.0 / sf)
+            out = (speed < min_speed) | (speed > 12.0 / sf)
+            scale = np.where(out, (6.0 / sf) / np.where(speed > 0, speed, 1), 1.0)
+        self.dx *= scale
+        self.dy *= scale
+
+    # ---------------- CURRENTS (Models 2 and 3) ----------------
+    def _noise(self, baseline):
+        t = self.t
+        idx = self._sensor_idx
+        sine = (0.12 * np.sin(0.1 * t + idx * 1.5)
+                + 0.15 * np.sin(0.8 * t + idx * 0.5)
+                + 0.08 * np.sin(2.5 * t + idx * 0.9)) / MAX_SINE_AMPLITUDE
+        sine = sine.astype(self.dtype, copy=False)
+        rand = (0.1 * self._frame_uniforms("noise", idx.size) - 0.05) / MAX_SINE_AMPLITUDE
+        return (sine + rand) * self.p["NOISE_FACTOR"][:, None] + baseline[:, None]
+
+    def _compute_currents(self):
+        rows, k = self._rows, self.active
+        currents = self._noise(self.p["NOISE_BASELINE"])
+        was_on = self.region_was_on[rows, k]
+        self.region_was_on[:] = False
+        self.region_was_on[rows, k] = True
+
+        if self.model == 2:
+            last = self.region_last_update[rows, k]
+            last = np.where(np.isnan(last) | ~was_on, self.t, last)
+            elapsed = self.region_elapsed[rows, k] + (self.t - last)
+            self.region_elapsed[rows, k] = elapsed
+            self.region_last_update[rows, k] = self.t
+            on_value = self.p["ON_CURRENT"]
+        else:
+            first = self.region_first_on_time[rows, k]
+            first = np.where(np.isnan(first), self.t, first)
+            self.region_first_on_time[rows, k] = first
+            scale = self.region_mem_scale[rows, k] * np.where(was_on, 1.0, self.p["RETENTION_FACTOR"])
+            self.region_mem_scale[rows, k] = scale
+            amp = self.p["AMPLITUDE"] * np.exp(-(self.t - first) / self.p["TAU"])
+            on_value = self.p["BASELINE"] + scale * amp
+        currents[rows, k] = on_value
+        self.currents = currents
+        return currents
+
+    # ---------------- PADDLE ----------------
+    def _paddle_due(self):
+        due = self.t - self.last_paddle_update >= self.p["paddle_update_dt"]
+        self.last_paddle_update = np.where(due, self.t, self.last_paddle_update)
+        return due
+
+    def _scrambled_targets(self, due):
+        # draws are addressed by frame, so every game's stream stays aligned across modes
+        pick = (3 * self._frame_uniforms("paddle", 1)[:, 0]).astype(np.int64)
+        return SCRAMBLED_TARGETS[pick][due]
+
+    def _move_paddle_model2(self):
+        currents = self.currents
+        if self.sensor_perm is not None:
+            currents = np.take_along_axis(currents, self.sensor_perm, axis=1)
+        norm = np.clip((currents - LOW_RANGE_C) / (UP_RANGE_C - LOW_RANGE_C), 0, 1)
+        target = self.arena.decide(norm)
+        due = self._paddle_due()
+        if self.mode == "scrambled_paddle":
+            target[due] = self._scrambled_targets(due)
+        np.copyto(self.paddle_y, np.clip(target, -PADDLE_LIMIT, PADDLE_LIMIT), where=due)
+
+    def _move_paddle_model3(self):
+        due = self._paddle_due()
+        target = self.y.copy()
+        if self.sensor_perm is not None:
+            # the ball's offset within its row, moved to the row of the reporting sensor
+            centers = self.arena.row_centers
+            target += (centers[self.arena.region_row(self._sensed(self.active))]
+                       - centers[self.arena.region_row(self.active)])
+        if self.mode == "scrambled_paddle":
+            target[due] = self._scrambled_targets(due)
+        frac = np.clip(self.p["RETENTION_FACTOR"], 0.0, 1.0)
+        new_y = np.clip(self.paddle_y + frac * (target - self.paddle_y), -PADDLE_LIMIT, PADDLE_LIMIT)
+        np.copyto(self.paddle_y, new_y, where=due)
+
+    # ---------------- MODEL 1 GEL SYSTEM ----------------
+    def _update_gel_system(self):
+        p, rows, k = self.p, self._rows, self.active
+        gel_dt = p["gel_dt"][:, None]
+        self.refractory_period = np.maximum(self.refractory_period - gel_dt, 0.0)
+        self.gel_current *= p["current_decay"][:, None]
+        self.response_duration = np.where(self.is_responding, self.response_duration + gel_dt,
+                                          self.response_duration)
+        ended = self.is_responding & (self.response_duration >= p["max_response_duration"][:, None])
+        self.is_responding &= ~ended
+        self.response_duration[ended] = 0.0
+
+        ready = self.refractory_period[rows, k] <= 0
+        self.gel_current[rows, k] += np.where(ready, p["stimulus_current"], 0.0)
+
+        last = self.last_count_time[rows, k]
+        first = np.isnan(last)
+        due = ~first & (self.t - last > p["count_interval"])
+        self.last_count_time[rows, k] = np.where(first | due, self.t, last)
+        if due.any():
+            g, r = rows[due], k[due]
+            self.stimulation_count[g, r] += 1
+            self.total_stimulations[due] += 1
+            threshold, prob = calculate_learning_curve(
+                self.stimulation_count[g, r], p["learning_rate"][due],
+                p["base_threshold"][due], p["min_threshold"][due])
+            self.threshold[g, r] = threshold
+            self.response_probability[g, r] = prob
+
+        draw = self._frame_uniforms("response", 1)[:, 0]
+        respond = (ready & (self.gel_current[rows, k] >= self.threshold[rows, k])
+                   & (draw < self.response_probability[rows, k])
+                   & ~self.is_responding[rows, k])
+        if respond.any():
+            g, r = rows[respond], k[respond]
+            self.is_responding[g, r] = True
+            self.response_duration[g, r] = 0.0
+            self.successful_responses[g, r] += 1
+            self.gel_current[g, r] = 0.0
+            self.refractory_period[g, r] = p["max_refractory"][respond]
+            self.paddle_is_active[respond] = True
+            self.active_region[respond] = r
+        self.currents = self.gel_current
+
+    def _move_paddle_model1(self):
+        r = self._sensed(np.maximum(self.active_region, 0))
+        target = np.maximum(self._region_min[r] + PADDLE_HALF,
+                            np.minimum(self._region_max[r] - PADDLE_HALF, self.y))
+        target = np.where(self.paddle_is_active & (self.active_region >= 0), target, 0.0)
+        diff = target - self.paddle_y
+        speed = np.minimum(self.p["paddle_speed"], np.abs(diff) * 0.1 + 1.0)
+        moved = np.clip(self.paddle_y + np.sign(diff) * speed, -PADDLE_LIMIT, PADDLE_LIMIT)
+        self.paddle_y = np.where(np.abs(diff) > 0.5, moved, self.paddle_y)
+
+    # ---------------- MAIN LOOP ----------------
+    def step(self):
+        """Advance every game by one step (``frames_per_step`` frames)."""
+        self.steps += 1
+        for _ in range(self.frames_per_step):
+            self._frame()
+
+    def _frame(self):
+        """One pass of the script's main loop for every game."""
+        self.frames += 1
+        self.t = self.frames * self.dt
+        if self.sensor_perm is not None and self.rescramble_every:
+            if int(self.t // self.rescramble_every) != self._sensor_epoch:
+                self._scramble_sensors()
+
+        if self.swept:
+            # Where the ball would be without the paddle, as the sensors see it
+            x, y = self._sweep()[:2]
+            self.active = self.arena.region_index(x, y)
+        else:
+            self.x += self.dx
+            self.y += self.dy
+            if self.flight_cache is None:
+                self.active = self.arena.region_index(self.x, self.y)
+            else:
+                self.active = self._flight_regions()
+
+        if self.model == 1:
+            self._update_gel_system()
+            self._move_paddle_model1()
+        elif self.model == 2:
+            self._compute_currents()
+            self._move_paddle_model2()
+        else:
+            self._compute_currents()
+            self._move_paddle_model3()
+
+        if self.swept:
+            self._collide_swept()
+        else:
+            self._collide()
+        self._normalize_velocity()
+
+    def _collide(self):
+        """The scripts' frame-end tests: clamp to walls, paddle window, back plane."""
+        top = self.y > WALL_Y
+        bottom = self.y < -WALL_Y
+        right = self.x > RIGHT_WALL_X
+        self.y = np.where(top, WALL_Y, np.where(bottom, -WALL_Y, self.y))
+        self.dy = np.where(top | bottom, -self.dy, self.dy)
+        self.x = np.where(right, RIGHT_WALL_X, self.x)
+        self.dx = np.where(right, -self.dx, self.dx)
+
+        region = self.arena.region_index(self.x, self.y)
+        hit = ((PADDLE_X_MIN < self.x) & (self.x < PADDLE_X_MAX)
+               & (self.paddle_y - PADDLE_HALF < self.y) & (self.y < self.paddle_y + PADDLE_HALF))
+        if hit.any():
+            self.x[hit] = PADDLE_X_MAX
+            self.dx[hit] *= -1
+            self.score[hit] += 1
+            self.region_hits[hit, region[hit]] += 1
+            self.region_trials[hit, region[hit]] += 1
+            if self.record_rallies:
+                self._record_rally(hit, True)
+
+        miss = self.x < PADDLE_X_MIN
+        if miss.any():
+            self._miss(miss, region)
+
+    def _sweep(self, paddle=False):
+        """Move every ball one frame along its exact path.
+
+        Walls reflect the ball at the crossing point.  With ``paddle`` the
+        first moment the ball is inside the box of the paddle at
+        ``paddle_y`` is a hit, which puts it on the face moving right.
+        Crossing the back plane stops it there.  Returns the new x, y, dx,
+        dy, the hit and miss masks and the y at which each hit met the
+        paddle.
+        """
+        x, y, dx, dy = self.x.copy(), self.y.copy(), self.dx.copy(), self.dy.copy()
+        G = self.n_games
+        left = np.ones(G)
+        hit = np.zeros(G, dtype=bool)
+        miss = np.zeros(G, dtype=bool)
+        hit_y = np.zeros(G)
+        idx = np.arange(G)
+        while idx.size:
+            xi, yi, dxi, dyi, li = x[idx], y[idx], dx[idx], dy[idx], left[idx]
+            # Frames until each boundary is crossed (inf when moving away)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                t_y = np.where(dyi > 0, (WALL_Y - yi) / dyi,
+                               np.where(dyi < 0, (-WALL_Y - yi) / dyi, np.inf))
+                t_right = np.where(dxi > 0, (RIGHT_WALL_X - xi) / dxi, np.inf)
+                t_back = np.where(dxi < 0, (PADDLE_X_MIN - xi) / dxi, np.inf)
+            if paddle:
+                # First moment the ball is inside the paddle's box (the
+                # continuous form of the scripts' window test)
+                py = self.paddle_y[idx]
+                x_in, x_out = _slab(xi, dxi, PADDLE_X_MIN, PADDLE_X_MAX)
+                y_in, y_out = _slab(yi, dyi, py - PADDLE_HALF, py + PADDLE_HALF)
+                enter = np.maximum(np.maximum(x_in, y_in), 0.0)
+                inside = enter < np.minimum(x_out, y_out)
+                t_pad = np.where(inside, enter, np.inf)
+            else:
+                t_pad = np.full(idx.size, np.inf)
+            t_ev = np.minimum(np.minimum(t_y, t_right), np.minimum(t_back, t_pad))
+            event = t_ev < li
+            move = np.where(event, t_ev, li)
+            yi = yi + dyi * move
+            x[idx], y[idx], left[idx] = xi + dxi * move, yi, li - move
+
+            wall = event & (t_y == t_ev)
+            g = idx[wall]
+            y[g] = np.where(dy[g] > 0, WALL_Y, -WALL_Y)
+            dy[g] *= -1
+            g = idx[event & (t_right == t_ev)]
+            x[g] = RIGHT_WALL_X
+            dx[g] *= -1
+            face = event & (t_pad == t_ev)
+            g = idx[face]
+            # As in the scripts, a hit puts the ball on the paddle face
+            x[g] = PADDLE_X_MAX
+            dx[g] = np.abs(dx[g])
+            hit[g] = True
+            hit_y[g] = yi[face]
+            back = event & (t_back == t_ev) & ~face
+            g = idx[back]
+            x[g] = PADDLE_X_MIN
+            left[g] = 0.0
+            miss[g] = True
+            idx = idx[event & ~back]
+        return x, y, dx, dy, hit, miss, hit_y
+
+    def _collide_swept(self):
+        self.x, self.y, self.dx, self.dy, hit, miss, hit_y = self._sweep(paddle=True)
+        # Outcomes are credited to the region of the crossing point
+        region = self.arena.region_index(self.x, self.y)
+        if hit.any():
+            region[hit] = self.arena.region_index(PADDLE_X_MAX, hit_y[hit])
+            self.score[hit] += 1
+            self.region_hits[hit, region[hit]] += 1
+            self.region_trials[hit, region[hit]] += 1
+            if self.record_rallies:
+                self._record_rally(hit, True)
+        if miss.any():
+            # _miss relaunches (or, for Model 1, bounces) the ball from the
+            # back plane; it moves again from the next frame
+            self._miss(miss, region)
+
+    def _record_rally(self, mask, is_hit):
+        g = np.flatnonzero(mask)
+        k = self.misses[g]
+        if k.max() >= self.rally_hits.shape[1]:
+            grow = self.rally_hits.shape[1]
+            self.rally_first_hit = np.pad(self.rally_first_hit, ((0, 0), (0, grow)), constant_values=-1)
+            self.rally_hits = np.pad(self.rally_hits, ((0, 0), (0, grow)))
+        first = self._rally_events[g] == 0
+        self.rally_first_hit[g[first], k[first]] = int(is_hit)
+        if is_hit:
+            self.rally_hits[g, k] += 1
+            self._rally_events[g] += 1
+        else:
+            self._rally_events[g] = 0
+
+    def _miss(self, miss, region):
+        if self.record_rallies:
+            self._record_rally(miss, False)
+        self.misses[miss] += 1
+        self.region_trials[miss, region[miss]] += 1
+        if self.record_history:
+            rates = self.hit_rates()
+            for g in np.flatnonzero(miss):
+                self.history[g].append((self.t, rates[g]))
+        if self.model == 1:
+            # Model 1 bounces off the back wall and drops the active region
+            self.x[miss] = PADDLE_X_MIN
+            self.dx[miss] *= -1
+            self.paddle_is_active[miss] = False
+            self.active_region[miss] = -1
+        else:
+            self.score[miss] = 0
+            self.x[miss] = 0.0
+            self.y[miss] = 0.0
+            self._launch(miss)
+
+    def run(self, steps, callback=None):
+        """Run up to ``steps`` steps; ``callback(self)`` is called after each one.
+
+        A truthy return value from the callback (e.g. ``stopping.EarlyStopping``)
+        ends the run early.  Use ``chain`` to combine several callbacks.
+        """
+        for _ in range(int(steps)):
+            self.step()
+            if callback is not None and callback(self):
+                break
+        return self
+
+    # ---------------- RESULTS ----------------
+    def hit_rates(self):
+        """Per-game, per-region hit rate (NaN where a region had no trials)."""
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(self.region_trials > 0, self.region_hits / self.region_trials, np.nan)
+
+    def summary(self):
+        """Totals per game as a dict of arrays."""
+        hits = self.region_hits.sum(axis=1)
+        trials = self.region_trials.sum(axis=1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            hit_rate = np.where(trials > 0, hits / trials, np.nan)
+        return {
+            "steps": self.steps,
+            "t": self.t,
+            "hits": hits,
+            "trials": trials,
+            "hit_rate": hit_rate,
+            "region_hit_rate": self.hit_rates(),
+        }
+
+
+def _layout(arena):
+    """What region lookup depends on in ``arena``."""
+    return (arena.n_rows, arena.n_cols, arena.cell_sensors, arena.x_min, arena.y_max,
+            arena.row_height, arena.col_width)
+
+
+def _slab(p, v, lo, hi):
+    """Times ``(enter, leave)`` while ``p + v t`` is strictly inside ``(lo, hi)``."""
+    inside = (lo < p) & (p < hi)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t1, t2 = (lo - p) / v, (hi - p) / v
+    moving = v != 0
+    enter = np.where(moving, np.minimum(t1, t2), np.where(inside, -np.inf, np.inf))
+    leave = np.where(moving, np.maximum(t1, t2), np.where(inside, np.inf, -np.inf))
+    return enter, leave
+
+
+def calculate_learning_curve(stimulation_count, learning_rate, base_threshold, min_threshold):
+    """Model 1's sigmoid learning curve, vectorized: (threshold, response probability)."""
+    progress = np.asarray(stimulation_count) * learning_rate
+    sigmoid = 1 / (1 + np.exp(-progress + 6))
+    threshold = base_threshold - (base_threshold - min_threshold) * sigmoid
+    return threshold, sigmoid * 0.85
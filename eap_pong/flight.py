@@ -0,0 +1,340 @@
+"""Launch flights: the ball's path from the serve to the back plane.
+
+After a miss, Models 2 and 3 put the ball back at (0, 0) with a new launch
+velocity.  Until the ball is hit, its path -- the wall bounces, the region
+it is in at every frame, the frame and y at which it reaches the paddle
+plane -- depends on nothing but that velocity.  ``FlightCache`` traces
+these flights for whole batches of launches at once and keeps them, keyed
+by launch velocity, in an LRU cache::
+
+    cache = FlightCache(quantum=0.05)
+    f = cache.flight(5.0, -3.0)         # region timeline, arrival frame and y, end
+    frame, y = cache.arrivals(ens.dx, ens.dy)
+
+``Ensemble(..., flight_cache=cache)`` puts every serve on its cached
+flight: until the ball reaches the paddle plane, its region comes from the
+flight's timeline instead of a lookup.  The cache can be shared by many
+ensembles and runs.
+
+Flights are traced with the same floating-point additions, in the same
+order, as the frame-by-frame engine (``swept=False``), so they match its
+balls bit for bit.  Launches repeat exactly between runs that share a seed
+and ``SLOW_FACTOR``.  With ``quantum``, velocities are rounded to multiples
+of it first, so a few thousand flights cover every launch of any run; an
+ensemble then serves the rounded velocities.
+
+Running the module checks an ensemble on cached flights against one
+stepped frame by frame, and reports the speed of both::
+
+    python -m eap_pong.flight --model 2 --games 1000 --steps 3600
+    python -m eap_pong.flight --model 3 --quantum 0.05
+"""
+
+import argparse
+import collections
+import time
+
+import numpy as np
+
+from .arena import Arena
+from .engine import PADDLE_X_MAX, PADDLE_X_MIN, PRECISIONS, RIGHT_WALL_X, WALL_Y, Ensemble
+
+# Bits of a flight's per-frame wall events (the scripts' frame-end tests)
+RIGHT_WALL, TOP_WALL, BOTTOM_WALL = 1, 2, 4
+# Frame of the timeline entries past a flight's last one
+NEVER = np.iinfo(np.int32).max
+
+
+def trace(dx, dy, arena=None, dtype=np.float64):
+    """Flights of balls launched from (0, 0) with velocities ``dx > 0``, ``dy``.
+
+    Returns a dict with one row per launch: ``x``, ``y`` (position after
+    each frame's move, before the walls clamp it; frame 1 in column 0),
+    ``region`` and ``events`` (wall bits) per frame, and ``arrival`` (first
+    frame at the paddle plane), ``arrival_y`` and ``end`` (frame at which
+    the ball crosses the back plane).  Rows run to the longest flight.
+    """
+    arena = arena or Arena()
+    dx = np.atleast_1d(np.asarray(dx, dtype=dtype))
+    dy = np.atleast_1d(np.asarray(dy, dtype=dtype))
+    if (dx <= 0).any():
+        raise ValueError("launch flights need dx > 0")
+    # Out to the right wall and back past the paddle plane
+    n = int(np.ceil((2 * RIGHT_WALL_X - PADDLE_X_MIN) / float(dx.min()))) + 3
+    frames = np.arange(n + 1)
+
+    # Positions are running sums of the velocity, as the engine adds it frame
+    # by frame; a bounce restarts the sum at the wall with the velocity flipped
+    def run(start, v):
+        steps = np.empty((v.size, n + 1), dtype=dtype)
+        steps[:, 0] = start
+        steps[:, 1:] = v[:, None]
+        return np.cumsum(steps, axis=1)
+
+    def first(mask):
+        return np.where(mask.any(axis=1), mask.argmax(axis=1), n + 1)
+
+    out = run(0.0, dx)
+    right = first(out > RIGHT_WALL_X)
+    back = run(RIGHT_WALL_X, -dx)
+    x = np.where(frames <= right[:, None], out,
+                 np.take_along_axis(back, np.clip(frames - right[:, None], 0, n), axis=1))
+
+    launch = run(0.0, dy)
+    bounce = first((launch > WALL_Y) | (launch < -WALL_Y))
+    down = run(WALL_Y, -np.abs(dy))        # from the top wall; from the bottom it is -down
+    period = first(down < -WALL_Y)
+    after = np.maximum(frames - bounce[:, None] - 1, 0)
+    leg = after // period[:, None]
+    offset = np.clip(after - leg * period[:, None] + 1, 0, n)
+    top_first = np.take_along_axis(launch, np.minimum(bounce, n)[:, None], axis=1)[:, 0] > 0
+    side = np.where(top_first[:, None] == (leg % 2 == 0), 1, -1).astype(dtype)
+    y = np.where(frames <= bounce[:, None], launch, side * np.take_along_axis(down, offset, axis=1))
+
+    events = ((frames == right[:, None]) * RIGHT_WALL + (y > WALL_Y) * TOP_WALL
+              + (y < -WALL_Y) * BOTTOM_WALL).astype(np.int8)
+    x_end = np.where(frames == right[:, None], RIGHT_WALL_X, x)
+    y_end = np.clip(y, -WALL_Y, WALL_Y)
+    arrival = first(x_end < PADDLE_X_MAX)
+    end = first(x_end < PADDLE_X_MIN)
+    rows = np.arange(dx.size)
+    return {"x": x[:, 1:], "y": y[:, 1:], "region": arena.region_index(x, y)[:, 1:],
+            "events": events[:, 1:], "arrival": arrival, "arrival_y": y_end[rows, arrival], "end": end}
+
+
+def timeline(flights):
+    """Per-frame ``region``/``events`` of ``trace`` as runs: the frames at
+    which the region changes or a wall is hit, up to each flight's end.
+
+    Returns ``frame``, ``region`` and ``events`` of shape (launches, runs);
+    unused entries have frame ``NEVER``.
+    """
+    region, events, end = flights["region"], flights["events"], flights["end"]
+    frames = np.arange(1, region.shape[1] + 1)
+    starts = np.ones(region.shape, dtype=bool)
+    starts[:, 1:] = region[:, 1:] != region[:, :-1]
+    starts |= events != 0
+    starts &= frames <= end[:, None]
+    rows, cols = np.nonzero(starts)
+    run = np.cumsum(starts, axis=1)[rows, cols] - 1
+    shape = (region.shape[0], int(starts.sum(axis=1).max()))
+    out = {"frame": np.full(shape, NEVER, dtype=np.int32),
+           "region": np.zeros(shape, dtype=region.dtype),
+           "events": np.zeros(shape, dtype=np.int8)}
+    out["frame"][rows, run] = frames[cols]
+    out["region"][rows, run] = region[rows, cols]
+    out["events"][rows, run] = events[rows, cols]
+    return out
+
+
+class FlightCache:
+    """LRU cache of launch flights keyed by (quantized) launch velocity.
+
+    A flight is stored as its timeline (see ``timeline``): row ``slot`` of
+    the ``frame``, ``region`` and ``events`` tables, always followed by a
+    ``NEVER`` entry, plus ``arrival``, ``arrival_y`` and ``end``.  For
+    launches to repeat exactly between runs, ``max_flights`` must hold
+    every launch of a run: LRU evicts a run's early flights before a replay
+    reaches them.
+
+    A slot looked up with ``pin=True`` is never evicted until it is
+    ``release``d; ensembles pin the flights their balls are on.
+    """
+
+    def __init__(self, arena=None, max_flights=65536, quantum=None, precision="float64"):
+        if precision not in PRECISIONS:
+            raise ValueError(f"precision must be one of {sorted(PRECISIONS)}, not {precision!r}")
+        if quantum is not None and quantum <= 0:
+            raise ValueError(f"quantum must be positive, got {quantum}")
+        self.arena = arena or Arena()
+        self.dtype = PRECISIONS[precision]
+        self.max_flights = int(max_flights)
+        self.quantum = quantum
+        self.width = 0
+        region_type = np.int8 if self.arena.n_regions <= 127 else np.int16
+        self.frame = np.zeros((self.max_flights, 0), dtype=np.int32)
+        self.region = np.zeros((self.max_flights, 0), dtype=region_type)
+        self.events = np.zeros((self.max_flights, 0), dtype=np.int8)
+        self.arrival = np.zeros(self.max_flights, dtype=np.int64)
+        self.arrival_y = np.zeros(self.max_flights, dtype=self.dtype)
+        self.end = np.zeros(self.max_flights, dtype=np.int64)
+        self.pins = np.zeros(self.max_flights, dtype=np.int64)
+        self._slots = collections.OrderedDict()   # key -> slot, least recently used first
+        self.hits = self.misses = self.evictions = 0
+
+    def __len__(self):
+        return len(self._slots)
+
+    def quantize(self, dx, dy):
+        """Launch velocities as the cache keys them (rounded to ``quantum``)."""
+        dx = np.asarray(dx, dtype=self.dtype)
+        dy = np.asarray(dy, dtype=self.dtype)
+        if self.quantum is None:
+            return dx, dy
+        q = self.quantum
+        return (np.maximum(np.rint(dx / q), 1) * q).astype(self.dtype), (np.rint(dy / q) * q).astype(self.dtype)
+
+    def lookup(self, dx, dy, pin=False):
+        """Slots of the flights of a batch of launches, tracing the new ones.
+
+        The slots stay valid until the next lookup, or with ``pin`` until
+        they are released.
+        """
+        dx, dy = self.quantize(np.atleast_1d(dx), np.atleast_1d(dy))
+        keys = list(zip(dx.tolist(), dy.tolist()))
+        if len(set(keys)) > self.max_flights:
+            raise ValueError(f"{len(set(keys))} distinct launches do not fit in {self.max_flights} flights")
+        slots = np.empty(len(keys), dtype=np.int64)
+        taken = set()
+        new = {}
+        for i, key in enumerate(keys):
+            slot = self._slots.get(key)
+            if slot is not None:
+                self._slots.move_to_end(key)
+                self.hits += 1
+            else:
+                if len(self._slots) < self.max_flights:
+                    slot = len(self._slots)
+                else:
+                    slot = self._evict(taken)
+                self._slots[key] = slot
+                new[slot] = key
+                self.misses += 1
+            slots[i] = slot
+            taken.add(slot)
+        if new:
+            self._store(np.array(list(new)), list(new.values()))
+        if pin:
+            np.add.at(self.pins, slots, 1)
+        return slots
+
+    def release(self, slots):
+        """Unpin slots returned by ``lookup(..., pin=True)``."""
+        np.add.at(self.pins, slots, -1)
+
+    def _evict(self, taken):
+        # least recently used flight that no ball is on and this batch does not use
+        for key, slot in self._slots.items():
+            if self.pins[slot] == 0 and slot not in taken:
+                break
+        else:
+            raise ValueError(f"all {self.max_flights} flights are in use; raise max_flights")
+        del self._slots[key]
+        self.evictions += 1
+        return slot
+
+    def _store(self, slots, keys):
+        dx, dy = np.array(keys, dtype=self.dtype).T
+        flights = trace(dx, dy, self.arena, self.dtype)
+        runs = timeline(flights)
+        width = runs["frame"].shape[1] + 1
+        if width > self.width:
+            for name in ("frame", "region", "events"):
+                table = getattr(self, name)
+                wider = np.zeros((self.max_flights, width), dtype=table.dtype)
+                wider[:, :self.width] = table
+                setattr(self, name, wider)
+            self.width = width
+        for name in ("frame", "region", "events"):
+            getattr(self, name)[slots, :width - 1] = runs[name]
+        self.frame[slots, width - 1:] = NEVER
+        self.arrival[slots] = flights["arrival"]
+        self.arrival_y[slots] = flights["arrival_y"]
+        self.end[slots] = flights["end"]
+
+    def arrivals(self, dx, dy):
+        """Frame and y at which each launch first reaches the paddle plane."""
+        slots = self.lookup(dx, dy)
+        return self.arrival[slots], self.arrival_y[slots]
+
+    def flight(self, dx, dy):
+        """One launch's flight: its timeline (``frame``, ``region``,
+        ``events``), ``arrival``, ``arrival_y`` and ``end``."""
+        slot = self.lookup(dx, dy)[0]
+        used = self.frame[slot] != NEVER
+        return {"frame": self.frame[slot, used].copy(), "region": self.region[slot, used].copy(),
+                "events": self.events[slot, used].copy(), "arrival": int(self.arrival[slot]),
+                "arrival_y": float(self.arrival_y[slot]), "end": int(self.end[slot])}
+
+    def occupancy(self, dx, dy):
+        """Frames each launch spends in each region before it reaches the
+        paddle plane, shape (launches, n_regions)."""
+        slots = self.lookup(dx, dy)
+        frame, region = self.frame[slots].astype(np.int64), self.region[slots]
+        stop = self.arrival[slots][:, None]
+        # each run lasts until the next entry (or the arrival)
+        nxt = np.minimum(np.concatenate((frame[:, 1:], np.full_like(frame[:, :1], NEVER)), axis=1), stop)
+        frames = np.clip(nxt - frame, 0, None)
+        out = np.zeros((slots.size, self.arena.n_regions), dtype=np.int64)
+        np.add.at(out, (np.repeat(np.arange(slots.size), frame.shape[1]), region.ravel()), frames.ravel())
+        return out
+
+    def stats(self):
+        looked_up = self.hits + self.misses
+        return {"flights": len(self), "hits": self.hits, "misses": self.misses,
+                "evictions": self.evictions, "hit_rate": self.hits / looked_up if looked_up else float("nan"),
+                "table_bytes": self.frame.nbytes + self.region.nbytes + self.events.nbytes}
+
+
+# ---------------- CHECK ----------------
+STATE = ("x", "y", "dx", "dy", "paddle_y", "score", "misses", "region_hits", "region_trials", "currents")
+
+
+class _Quantized(Ensemble):
+    """Frame-by-frame engine serving the velocities ``cache`` rounds launches to."""
+
+    def __init__(self, *args, cache, **kwargs):
+        self._rounding = cache
+        super().__init__(*args, **kwargs)
+
+    def _launch(self, mask):
+        super()._launch(mask)
+        games = np.flatnonzero(mask)
+        self.dx[games], self.dy[games] = self._rounding.quantize(self.dx[games], self.dy[games])
+
+
+def check(model=2, n_games=1000, steps=3600, seed=0, quantum=None, precision="float64", mode="correct"):
+    """Run ``model`` on cached flights and frame by frame with the same seed.
+
+    Returns the names of the state arrays that differ (none, when the
+    flights match the engine), the time of each run and the cache stats.
+    Both runs serve the same (quantized) velocities.
+    """
+    cache = FlightCache(quantum=quantum, precision=precision)
+    config = dict(n_games=n_games, mode=mode, seed=seed, precision=precision)
+    runs = {"stepped": _Quantized(model, cache=cache, **config) if quantum else Ensemble(model, **config),
+            "cached": Ensemble(model, flight_cache=cache, **config)}
+    wall = {}
+    for name, ens in runs.items():
+        start = time.perf_counter()
+        ens.run(steps)
+        wall[name] = time.perf_counter() - start
+    differ = [k for k in STATE if not np.array_equal(getattr(runs["stepped"], k), getattr(runs["cached"], k))]
+    return {"differ": differ, "wall": wall, "cache": cache.stats()}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check cached launch flights against frame-by-frame stepping.")
+    parser.add_argument("--model", type=int, default=2, choices=(2, 3))
+    parser.add_argument("--mode", default="correct")
+    parser.add_argument("--games", type=int, default=1000)
+    parser.add_argument("--steps", type=int, default=3600)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--quantum", type=float, default=None, help="round launch velocities to this")
+    parser.add_argument("--precision", default="float64", choices=sorted(PRECISIONS))
+    args = parser.parse_args(argv)
+
+    r = check(args.model, args.games, args.steps, args.seed, args.quantum, args.precision, args.mode)
+    c = r["cache"]
+    print(f"Model {args.model} ({args.mode}), {args.games} games x {args.steps} steps, seed {args.seed}")
+    print(f"  state           {'identical' if not r['differ'] else 'differs: ' + ', '.join(r['differ'])}")
+    print(f"  stepped         {args.steps / r['wall']['stepped']:.0f} steps/s")
+    print(f"  cached flights  {args.steps / r['wall']['cached']:.0f} steps/s")
+    print(f"  cache           {c['flights']} flights, hit rate {c['hit_rate']:.3f}, "
+          f"{c['evictions']} evictions, {c['table_bytes'] / 1e6:.1f} MB")
+    if r["differ"]:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
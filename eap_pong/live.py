@@ -0,0 +1,262 @@
+"""Interactive run with simulation and display in separate processes.
+
+The simulation process steps a one-game ``Ensemble`` on the real-time
+``Scheduler`` and, every tick, publishes a snapshot of the game into a ring
+buffer in shared memory (a memory-mapped file next to the telemetry
+snapshots).  The ring has a single writer and never blocks it.  Each slot
+carries its own sequence number (odd while being written), and a reader
+takes the newest complete slot, retrying or falling back to an older one
+if the writer laps it.  The turtle viewer runs in the main process at its
+own frame rate, so a slow repaint only lowers the frame rate and never
+delays paddle decisions::
+
+    python -m eap_pong.live --model 2 --mode correct
+    python -m eap_pong.live --model 3 --no-view --name demo    # simulation only
+    python -m eap_pong.live --attach demo                      # viewer only
+
+Press ``q`` in the viewer to stop both processes.
+"""
+
+import argparse
+import os
+import time
+from multiprocessing import Process
+
+import numpy as np
+
+from .arena import Arena
+from .engine import FRAME_DT, MODES, Ensemble
+from .realtime import Scheduler
+from .telemetry import _pid_alive, telemetry_dir
+
+RING_HEADER = ("head", "stop", "n_slots", "slot_size", "n_regions", "model", "pid", "physics_hz", "n_cols")
+SNAPSHOT = ("seq", "tick", "t", "x", "y", "paddle_y", "score", "misses", "active")
+REGION_FIELDS = ("currents", "region_hits", "region_trials")
+_R = {name: i for i, name in enumerate(RING_HEADER)}
+_S = {name: i for i, name in enumerate(SNAPSHOT)}
+
+
+def ring_path(name, directory=None):
+    return os.path.join(directory or telemetry_dir(), f"{name}.ring")
+
+
+class SnapshotRing:
+    """Single-writer ring of fixed-size snapshots in a memory-mapped file."""
+
+    def __init__(self, path, create=False, n_slots=64, n_regions=3, model=0, physics_hz=0.0, n_cols=2):
+        self.path = path
+        if create:
+            slot_size = len(SNAPSHOT) + len(REGION_FIELDS) * n_regions
+            self.buf = np.memmap(path, dtype=np.float64, mode="w+",
+                                 shape=(len(RING_HEADER) + n_slots * slot_size,))
+            self.buf[:] = 0.0
+            header = self.buf[:len(RING_HEADER)]
+            header[_R["n_slots"]], header[_R["slot_size"]] = n_slots, slot_size
+            header[_R["n_regions"]], header[_R["model"]] = n_regions, model
+            header[_R["pid"]], header[_R["physics_hz"]] = os.getpid(), physics_hz
+            header[_R["n_cols"]] = n_cols
+        else:
+            self.buf = np.memmap(path, dtype=np.float64, mode="r+")
+        header = self.buf[:len(RING_HEADER)]
+        self.header = header
+        self.n_slots = int(header[_R["n_slots"]])
+        self.slot_size = int(header[_R["slot_size"]])
+        self.n_regions = int(header[_R["n_regions"]])
+        self.slots = self.buf[len(RING_HEADER):].reshape(self.n_slots, self.slot_size)
+        self.last_read = 0
+
+    # ---------------- Writer ----------------
+    def publish(self, ens, game=0):
+        """Write the game's current state into the next slot (never waits)."""
+        head = int(self.header[_R["head"]])
+        slot = self.slots[head % self.n_slots]
+        n = self.n_regions
+        slot[0] = 2 * head + 1  # odd: write in progress
+        slot[1:len(SNAPSHOT)] = (ens.steps, ens.t, ens.x[game], ens.y[game], ens.paddle_y[game],
+                                 ens.score[game], ens.misses[game], ens.active[game])
+        regions = slot[len(SNAPSHOT):].reshape(len(REGION_FIELDS), n)
+        regions[0] = ens.currents[game]
+        regions[1] = ens.region_hits[game]
+        regions[2] = ens.region_trials[game]
+        slot[0] = 2 * head + 2
+        self.header[_R["head"]] = head + 1
+
+    # ---------------- Readers ----------------
+    def latest(self, retries=8):
+        """Newest complete snapshot as a dict (``lag`` = snapshots skipped), or None."""
+        for _ in range(retries):
+            head = int(self.header[_R["head"]])
+            for k in range(head - 1, max(head - self.n_slots, 0) - 1, -1):
+                slot = self.slots[k % self.n_slots]
+                data = np.array(slot)
+                if data[0] == 2 * k + 2 and slot[0] == data[0]:
+                    snap = {name: data[i] for i, name in enumerate(SNAPSHOT)}
+                    regions = data[len(SNAPSHOT):].reshape(len(REGION_FIELDS), self.n_regions)
+                    snap.update(zip(REGION_FIELDS, regions))
+                    snap["index"], snap["lag"] = k, k - self.last_read - 1
+                    self.last_read = k
+                    return snap
+            if head == 0:
+                return None
+        return None
+
+    def arena(self):
+        """The layout the simulation runs on, as recorded in the header."""
+        return Arena(self.n_regions, int(self.header[_R["n_cols"]]))
+
+    @property
+    def writer_alive(self):
+        """False once the simulation process that writes the ring has exited."""
+        return _pid_alive(int(self.header[_R["pid"]]))
+
+    @property
+    def stopped(self):
+        return bool(self.header[_R["stop"]])
+
+    def stop(self):
+        self.header[_R["stop"]] = 1.0
+
+    def close(self, remove=False):
+        del self.slots, self.header, self.buf
+        if remove and os.path.exists(self.path):
+            os.remove(self.path)
+
+
+# ---------------- Processes ----------------
+def simulate(path, model=2, mode="correct", params=None, seed=None, physics_hz=60.0, arena=None):
+    """Simulation process: step in real time and publish every tick until stopped."""
+    ens = Ensemble(model, n_games=1, params=params, mode=mode, arena=arena, seed=seed,
+                   dt=1.0 / physics_hz)
+    ring = SnapshotRing(path)
+    ring.header[_R["pid"]] = os.getpid()
+    sched = Scheduler(physics_hz, render_hz=physics_hz)
+    ring.publish(ens)
+    while not ring.stopped:
+        sched.wait()
+        ens.step()
+        ring.publish(ens)
+    print(sched.report())
+    ring.close()
+
+
+def view(path, view_hz=30.0):
+    """Turtle viewer: draw the newest snapshot at ``view_hz`` until ``q`` is
+    pressed or the simulation process exits.  The layout comes from the ring."""
+    import turtle
+
+    ring = SnapshotRing(path)
+    arena = ring.arena()
+    win = turtle.Screen()
+    win.title(f"EAP Pong (Model {int(ring.header[_R['model']])}, live)")
+    win.bgcolor("#87CEFA")
+    win.setup(width=900, height=900)
+    win.tracer(0)
+
+    pen = turtle.Turtle(visible=False)
+    pen.speed(0)
+    pen.penup()
+    for x in arena.x_edges[:-1]:
+        pen.goto(x, arena.y_max)
+        pen.pendown()
+        pen.goto(x, arena.y_min)
+        pen.penup()
+    for y in arena.y_edges:
+        pen.goto(arena.x_min, y)
+        pen.pendown()
+        pen.goto(arena.x_max, y)
+        pen.penup()
+
+    paddle = turtle.Turtle("square")
+    paddle.color("white")
+    paddle.shapesize(stretch_wid=15, stretch_len=1)
+    paddle.penup()
+    ball = turtle.Turtle("square")
+    ball.color("white")
+    ball.penup()
+    text = turtle.Turtle(visible=False)
+    text.penup()
+    text.goto(350, 280)
+
+    running = [True]
+
+    def quit_view():
+        running[0] = False
+
+    win.listen()
+    win.onkeypress(quit_view, "q")
+    period, frames, skipped = 1.0 / view_hz, 0, 0
+    checked = time.perf_counter()
+    while running[0]:
+        start = time.perf_counter()
+        if start - checked >= 1.0:
+            checked = start
+            if not ring.writer_alive:
+                print(f"viewer: simulation process {int(ring.header[_R['pid']])} has exited")
+                break
+        snap = ring.latest()
+        if snap is not None:
+            skipped += max(int(snap["lag"]), 0)
+            frames += 1
+            ball.goto(snap["x"], snap["y"])
+            paddle.goto(-290, snap["paddle_y"])
+            text.clear()
+            rate = snap["region_hits"].sum() / max(snap["region_trials"].sum(), 1)
+            peak = int(np.argmax(snap["currents"]))
+            text.write(f"t: {snap['t']:7.1f} s\nScore: {int(snap['score'])}\n"
+                       f"Misses: {int(snap['misses'])}\nHit rate: {rate:.3f}\n"
+                       f"Peak {arena.names[peak]}: {snap['currents'][peak]:.3f}",
+                       align="center", font=("Courier", 12, "bold"))
+        win.update()
+        time.sleep(max(0.0, period - (time.perf_counter() - start)))
+    win.bye()
+    ring.stop()
+    print(f"viewer: {frames} frames, {skipped} snapshots skipped")
+    ring.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Interactive run with separate simulation and viewer processes.")
+    parser.add_argument("--model", type=int, default=2, choices=(1, 2, 3))
+    parser.add_argument("--mode", default="correct", choices=MODES)
+    parser.add_argument("--rows", type=int, default=3)
+    parser.add_argument("--cols", type=int, default=2)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--physics-hz", type=float, default=1.0 / FRAME_DT)
+    parser.add_argument("--view-hz", type=float, default=30.0)
+    parser.add_argument("--slots", type=int, default=64)
+    parser.add_argument("--name", default=None, help="ring name (default: live-<pid>)")
+    parser.add_argument("--no-view", action="store_true", help="run the simulation only")
+    parser.add_argument("--attach", default=None, metavar="NAME",
+                        help="view an already running simulation (its layout and model come from the ring)")
+    args = parser.parse_args(argv)
+
+    if args.attach:
+        view(ring_path(args.attach), args.view_hz)
+        return
+
+    arena = Arena(args.rows, args.cols)
+    path = ring_path(args.name or f"live-{os.getpid()}")
+    SnapshotRing(path, create=True, n_slots=args.slots, n_regions=arena.n_regions,
+                 model=args.model, physics_hz=args.physics_hz, n_cols=args.cols).close()
+    sim_args = (path, args.model, args.mode, None, args.seed, args.physics_hz, arena)
+    try:
+        if args.no_view:
+            print(f"Publishing to '{path}' (view with --attach {os.path.basename(path)[:-5]})")
+            try:
+                simulate(*sim_args)
+            except KeyboardInterrupt:
+                pass
+            return
+        sim = Process(target=simulate, args=sim_args)
+        sim.start()
+        try:
+            view(path, args.view_hz)
+        finally:
+            SnapshotRing(path).stop()
+            sim.join()
+    finally:
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
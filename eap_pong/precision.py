@@ -0,0 +1,168 @@
+"""Validation of float32 ensemble state against float64.
+
+Runs one configuration at both precisions with common random numbers,
+stepping the two ensembles in lock-step, and reports:
+
+- the paired hit-rate difference (float32 - float64) with its standard error
+- how many games stay in lock-step, and when the others first leave it,
+  separately for outcomes (same hit/miss outcomes, ball within ``BALL_TOL``
+  px and paddle within ``PADDLE_TOL`` px) and for state (currents within
+  ``CURRENT_TOL`` mA, same Model 1 gel/response state and the same regions
+  on)
+- the largest ball, paddle and current error while a game is in lock-step
+- state memory per game and the speed of each precision
+
+::
+
+    python -m eap_pong.precision --model 2 --games 2000 --steps 36000
+    python -m eap_pong.precision --model 1 --mode correct --json precision.json
+"""
+
+import argparse
+import json
+import time
+
+import numpy as np
+
+from .compare import paired_difference
+from .engine import PRECISIONS, Ensemble
+
+# A game has left lock-step once its two runs differ by more than this
+BALL_TOL = 1.0
+PADDLE_TOL = 10.0
+CURRENT_TOL = 1e-3
+# Discrete state that must match exactly, per model
+DISCRETE_STATE = {
+    1: ("is_responding", "stimulation_count", "successful_responses", "paddle_is_active", "active_region"),
+    2: ("region_was_on",),
+    3: ("region_was_on",),
+}
+
+
+def state_bytes(ens):
+    """Bytes of per-game floating-point state, per game."""
+    total = sum(v.nbytes for v in vars(ens).values()
+                if isinstance(v, np.ndarray) and v.dtype.kind == "f"
+                and v.ndim and v.shape[0] == ens.n_games)
+    total += sum(v.nbytes for v in ens.p.values())
+    return total / ens.n_games
+
+
+def current_error(ref, low):
+    """Per-game largest current difference between two ensembles of the same
+    model, inf where their discrete state (``DISCRETE_STATE``) differs."""
+    err = np.abs(ref.currents.astype(np.float64) - low.currents).max(axis=1)
+    for name in DISCRETE_STATE[ref.model]:
+        a, b = getattr(ref, name), getattr(low, name)
+        differ = a != b
+        err[differ.any(axis=1) if differ.ndim > 1 else differ] = np.inf
+    return err
+
+
+def _median_s(at, frame):
+    split = at >= 0
+    return float(np.median(at[split]) * frame) if split.any() else None
+
+
+def validate(model, mode="correct", n_games=1000, steps=36000, seed=0, params=None, swept=False):
+    """Run ``model`` at float64 and float32 side by side; returns the report as a dict."""
+    runs = {p: Ensemble(model, n_games=n_games, params=params, mode=mode, seed=seed,
+                        record_rallies=True, swept=swept, precision=p)
+            for p in PRECISIONS}
+    ref, low = runs["float64"], runs["float32"]
+    # Step at which each game's outcomes / state first left lock-step
+    outcome_at = np.full(n_games, -1, dtype=np.int64)
+    state_at = np.full(n_games, -1, dtype=np.int64)
+    err = {"position": 0.0, "paddle": 0.0, "current": 0.0}
+    wall = dict.fromkeys(runs, 0.0)
+    for _ in range(int(steps)):
+        for p, ens in runs.items():
+            start = time.perf_counter()
+            ens.step()
+            wall[p] += time.perf_counter() - start
+        ball = np.hypot(ref.x - low.x, ref.y - low.y)
+        paddle = np.abs(ref.paddle_y - low.paddle_y)
+        current = current_error(ref, low)
+        outcome = ((ref.score == low.score) & (ref.misses == low.misses)
+                   & (ball <= BALL_TOL) & (paddle <= PADDLE_TOL))
+        outcome_at[~outcome & (outcome_at < 0)] = ref.steps
+        state_at[(current > CURRENT_TOL) & (state_at < 0)] = ref.steps
+        same = (outcome_at < 0) & (state_at < 0)
+        if same.any():
+            err["position"] = max(err["position"], float(ball[same].max()))
+            err["paddle"] = max(err["paddle"], float(paddle[same].max()))
+            err["current"] = max(err["current"], float(current[same].max()))
+
+    d = paired_difference(ref, low)
+    frame = ref.dt * ref.frames_per_step
+    return {
+        "model": model, "mode": mode, "games": n_games, "steps": int(steps), "seed": seed,
+        "hit_rate_float64": float(np.nanmean(ref.summary()["hit_rate"])),
+        "hit_rate_float32": float(np.nanmean(low.summary()["hit_rate"])),
+        "first_hit_diff": float(d["diff"]), "first_hit_diff_se": float(d["se_paired"]),
+        "trials": d["trials"],
+        "games_identical": int(((outcome_at < 0) & (state_at < 0)).sum()),
+        "games_outcome_diverged": int((outcome_at >= 0).sum()),
+        "median_outcome_divergence_s": _median_s(outcome_at, frame),
+        "games_state_diverged": int((state_at >= 0).sum()),
+        "median_state_divergence_s": _median_s(state_at, frame),
+        "max_position_error": err["position"],
+        "max_paddle_error": err["paddle"],
+        "max_current_error": err["current"],
+        "bytes_per_game_float64": state_bytes(ref),
+        "bytes_per_game_float32": state_bytes(low),
+        "steps_per_s_float64": steps / wall["float64"],
+        "steps_per_s_float32": steps / wall["float32"],
+    }
+
+
+def format_report(r):
+    z = (f"z = {r['first_hit_diff'] / r['first_hit_diff_se']:.2f}" if r["first_hit_diff_se"] > 0
+         else "no rally differs")
+
+    def divergence(kind):
+        n, median = r[f"games_{kind}_diverged"], r[f"median_{kind}_divergence_s"]
+        return f"{n} games" + ("" if median is None else f", median {median:.1f} s of simulated time")
+
+    return "\n".join([
+        f"Model {r['model']} ({r['mode']}), {r['games']} games x {r['steps']} steps, seed {r['seed']}",
+        f"  hit rate           float64 {r['hit_rate_float64']:.4f}   float32 {r['hit_rate_float32']:.4f}",
+        f"  first-return diff  {r['first_hit_diff']:+.4f} +/- {r['first_hit_diff_se']:.4f} "
+        f"({z}, {r['trials']} paired rallies)",
+        f"  in lock-step       {r['games_identical']} of {r['games']} games",
+        f"  outcomes diverge   {divergence('outcome')}",
+        f"  state diverges     {divergence('state')} (currents beyond {CURRENT_TOL:g} mA or gel state)",
+        f"  max error in lock-step: ball {r['max_position_error']:.2e} px, "
+        f"paddle {r['max_paddle_error']:.2e} px, current {r['max_current_error']:.2e} mA",
+        f"  state per game     float64 {r['bytes_per_game_float64']:.0f} B   "
+        f"float32 {r['bytes_per_game_float32']:.0f} B",
+        f"  speed              float64 {r['steps_per_s_float64']:.0f} steps/s   "
+        f"float32 {r['steps_per_s_float32']:.0f} steps/s",
+    ])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Validate float32 ensemble state against float64.")
+    parser.add_argument("--model", type=int, default=None, choices=(1, 2, 3),
+                        help="model to validate (default: all three)")
+    parser.add_argument("--mode", default="correct")
+    parser.add_argument("--games", type=int, default=1000)
+    parser.add_argument("--steps", type=int, default=36000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--swept", action="store_true", help="use swept collision detection")
+    parser.add_argument("--json", default=None, help="also write the reports to this JSON file")
+    args = parser.parse_args(argv)
+
+    reports = []
+    for model in ([args.model] if args.model else (1, 2, 3)):
+        r = validate(model, args.mode, args.games, args.steps, args.seed, swept=args.swept)
+        print(format_report(r))
+        reports.append(r)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(reports, f, indent=2)
+        print(f"Reports saved to '{args.json}'")
+
+
+if __name__ == "__main__":
+    main()
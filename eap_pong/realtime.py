@@ -0,0 +1,140 @@
+"""Fixed-rate real-time scheduling for the interactive scripts.
+
+The scripts' main loops used to spin as fast as Tk allows, so the ball's
+speed in wall-clock terms depended on the host, and the paddle-update
+interval was enforced by polling ``time.time()``.  ``Scheduler`` runs
+physics at a fixed tick rate and sleeps until each tick's deadline (coarse
+``time.sleep`` followed by a short spin on ``perf_counter``).  Time inside
+the model is the simulated clock ``tick / physics_hz``, as in the headless
+engine.  Slower activities, such as paddle decisions and redraws, are
+named rates checked with ``due(name)``::
+
+    sched = Scheduler(physics_hz=60, render_hz=30)
+    sched.add_rate("paddle", 0.1)
+    while True:
+        sched.wait()
+        ...physics...
+        if sched.due("paddle"): ...decide...
+        if sched.due("render"): ...draw...; win.update()
+
+Redraws are skipped while the loop is running behind.  If it falls more
+than ``max_catchup`` ticks behind, the schedule is re-anchored instead of
+bursting, and the ticks given up are counted as dropped.  ``stats()`` and
+``report()`` give tick jitter (lateness of tick starts) and missed
+deadlines (ticks whose work ran past the end of their slot).
+"""
+
+import time
+
+import numpy as np
+
+
+class Scheduler:
+    """Paces a main loop at ``physics_hz`` ticks per wall-clock second.
+
+    ``wait()`` ends a tick and sleeps until the next deadline, ``now()`` is
+    the simulated clock, and ``due(name)`` fires the named rates (``render``
+    at ``render_hz``, plus those from ``add_rate``).  Jitter, missed
+    deadlines and dropped ticks are collected for ``stats()``/``report()``.
+    """
+
+    def __init__(self, physics_hz=60.0, render_hz=30.0, max_catchup=5, spin=0.0005, history=4096):
+        self.period = 1.0 / physics_hz
+        self.max_catchup = max_catchup
+        self.spin = spin
+        self.tick = -1
+        self.t0 = self.t_start = None
+        self.rates = {}
+        self.add_rate("render", 1.0 / render_hz, phase=0.0)
+
+        # Statistics
+        self.lateness = np.zeros(history)
+        self.missed = 0
+        self.dropped = 0
+        self.busy = 0.0
+        self.max_late = 0.0
+        self.sum_late = 0.0
+        self._tick_start = None
+        self._behind = False
+
+    def add_rate(self, name, period, phase=None):
+        """Register a named rate firing every ``period`` simulated seconds.
+
+        The first firing is one period after start, unless ``phase`` says otherwise.
+        """
+        self.rates[name] = [float(period), float(period if phase is None else phase)]
+
+    def now(self):
+        """Simulated seconds since the first tick."""
+        return max(self.tick, 0) * self.period
+
+    def due(self, name):
+        """True once per period of the named rate; renders are skipped while behind."""
+        rate = self.rates[name]
+        t = self.now()
+        if t + 1e-9 < rate[1]:
+            return False
+        rate[1] += rate[0]
+        if rate[1] <= t:
+            # Never fire several times in one tick to make up for a gap
+            rate[1] = t + rate[0]
+        return not (name == "render" and self._behind)
+
+    def wait(self):
+        """Finish the current tick and sleep until the next one starts."""
+        clock = time.perf_counter
+        now = clock()
+        if self.t0 is None:
+            self.t0 = self.t_start = now
+        if self._tick_start is not None:
+            self.busy += now - self._tick_start
+            if now > self.t0 + (self.tick + 1) * self.period:
+                self.missed += 1
+        self.tick += 1
+
+        deadline = self.t0 + self.tick * self.period
+        if now - deadline > self.max_catchup * self.period:
+            # Too far behind: give up the backlog instead of running it in a burst
+            behind = int((now - deadline) / self.period)
+            self.dropped += behind
+            self.t0 += behind * self.period
+            deadline += behind * self.period
+        remaining = deadline - now
+        if remaining > self.spin:
+            time.sleep(remaining - self.spin)
+        while clock() < deadline:
+            pass
+
+        start = clock()
+        late = start - deadline
+        self._behind = late > self.period
+        self.lateness[self.tick % self.lateness.size] = late
+        self.max_late = max(self.max_late, late)
+        self.sum_late += late
+        self._tick_start = start
+        return self.tick
+
+    def stats(self):
+        """Tick counts, jitter (ms) and the share of wall time spent working."""
+        ticks = self.tick + 1
+        recent = self.lateness[:min(ticks, self.lateness.size)] * 1e3
+        elapsed = (time.perf_counter() - self.t_start) if self.t0 is not None else 0.0
+        return {
+            "ticks": ticks,
+            "sim_time": self.now(),
+            "wall_time": elapsed,
+            "missed": self.missed,
+            "dropped": self.dropped,
+            "jitter_mean_ms": self.sum_late / max(ticks, 1) * 1e3,
+            "jitter_p99_ms": float(np.percentile(recent, 99)) if recent.size else 0.0,
+            "jitter_max_ms": self.max_late * 1e3,
+            "load": self.busy / elapsed if elapsed > 0 else 0.0,
+        }
+
+    def report(self):
+        s = self.stats()
+        return (f"{s['ticks']} ticks at {1 / self.period:.0f} Hz "
+                f"({s['sim_time']:.1f} s simulated, {s['wall_time']:.1f} s wall), "
+                f"load {s['load']:.0%}\n"
+                f"jitter mean {s['jitter_mean_ms']:.3f} ms, p99 {s['jitter_p99_ms']:.3f} ms, "
+                f"max {s['jitter_max_ms']:.3f} ms; missed deadlines {s['missed']}, dropped ticks {s['dropped']}")
@@ -0,0 +1,248 @@
+"""Offscreen NumPy rasterizer for headless runs.
+
+Draws the same scene as the turtle window (grid, highlighted cell, ball,
+paddle and a current readout) straight into ``uint8`` RGB arrays, so long
+or batched runs can be turned into image sequences or videos on machines
+without a display, faster than real time.
+
+    python -m eap_pong.render --model 2 --steps 6000 --every 4 --out frames/
+    python -m eap_pong.render --model 3 --games 4 --out run.mp4   # needs ffmpeg
+"""
+
+import argparse
+import os
+import shutil
+import struct
+import subprocess
+import zlib
+
+import numpy as np
+
+from .engine import Ensemble, PADDLE_HALF
+
+BG_COLOR = (0x87, 0xCE, 0xFA)
+HIGHLIGHT_COLOR = (0x1E, 0x90, 0xFF)
+GRID_COLOR = (0, 0, 0)
+WHITE = (255, 255, 255)
+BAR_COLOR = (0xFF, 0x8C, 0x00)
+
+# World window of the Model 2/3 scripts: 900 x 900 centred on the origin
+VIEW_HALF_WIDTH = 450
+VIEW_HALF_HEIGHT = 450
+BALL_HALF = 10
+PADDLE_X = -290
+PADDLE_HALF_WIDTH = 10
+READOUT_X = (310, 440)
+READOUT_MAX_CURRENT = 8.0
+MODEL1_READOUT_MAX = 60.0  # Model 1 gel currents build up towards the 60 threshold
+
+# 3x5 bitmap font for the numeric readout
+_GLYPHS = {
+    "0": "111101101101111", "1": "010110010010111", "2": "111001111100111",
+    "3": "111001111001111", "4": "101101111001001", "5": "111100111001111",
+    "6": "111100111101111", "7": "111001001001001", "8": "111101111101111",
+    "9": "111101111001111", ".": "000000000000010", "-": "000000111000000",
+    " ": "000000000000000", "s": "000011110011110", ":": "000010000010000",
+}
+
+
+class FrameRenderer:
+    """Rasterizes one game of an ``Ensemble`` at ``scale`` pixels per world unit."""
+
+    def __init__(self, arena, scale=0.5, max_current=READOUT_MAX_CURRENT):
+        self.arena = arena
+        self.scale = scale
+        self.max_current = max_current
+        self.width = int(round(2 * VIEW_HALF_WIDTH * scale))
+        self.height = int(round(2 * VIEW_HALF_HEIGHT * scale))
+        self._background = self._draw_background()
+        self._grid_mask = self._draw_grid_mask()
+
+    # ---------------- COORDINATES ----------------
+    def _px(self, x):
+        return int(round((x + VIEW_HALF_WIDTH) * self.scale))
+
+    def _py(self, y):
+        return int(round((VIEW_HALF_HEIGHT - y) * self.scale))
+
+    def _rect(self, img, x0, y0, x1, y1, color):
+        """Fill the world-space rectangle with corners (x0, y0) and (x1, y1)."""
+        c0, c1 = sorted((self._px(x0), self._px(x1)))
+        r0, r1 = sorted((self._py(y0), self._py(y1)))
+        img[max(r0, 0):max(r1, 0), max(c0, 0):max(c1, 0)] = color
+
+    # ---------------- STATIC LAYERS ----------------
+    def _draw_background(self):
+        img = np.empty((self.height, self.width, 3), dtype=np.uint8)
+        img[:] = BG_COLOR
+        return img
+
+    def _draw_grid_mask(self):
+        mask = np.zeros((self.height, self.width), dtype=bool)
+        a = self.arena
+        line = max(1, int(round(3 * self.scale)))
+        for x in a.x_edges[:-1]:
+            c = self._px(x)
+            mask[self._py(a.y_max):self._py(a.y_min), max(c - line // 2, 0):c + line - line // 2] = True
+        for y in a.y_edges:
+            r = min(self._py(y), self.height - 1)
+            mask[max(r - line // 2, 0):r + line - line // 2, self._px(a.x_min):self._px(a.x_max)] = True
+        return mask
+
+    def _text(self, img, col, row, text, color=WHITE, size=2):
+        for ch in text:
+            glyph = _GLYPHS.get(ch, _GLYPHS[" "])
+            bits = np.array([int(b) for b in glyph], dtype=bool).reshape(5, 3)
+            block = np.kron(bits, np.ones((size, size), dtype=bool))
+            h, w = block.shape
+            target = img[row:row + h, col:col + w]
+            target[block[:target.shape[0], :target.shape[1]]] = color
+            col += (3 + 1) * size
+
+    # ---------------- FRAME ----------------
+    def render(self, ens, game=0):
+        """RGB ``(height, width, 3)`` frame of ``game`` in its current state."""
+        a = self.arena
+        img = self._background.copy()
+        x, y = float(ens.x[game]), float(ens.y[game])
+
+        cx, cy = a.cell_origin(x, y)
+        self._rect(img, cx, cy, cx + a.col_width, cy - a.row_height, HIGHLIGHT_COLOR)
+        img[self._grid_mask] = GRID_COLOR
+
+        # Current readout: one bar per sensor row beside the arena
+        currents = ens.currents[game]
+        if a.cell_sensors:
+            currents = currents.reshape(a.n_rows, a.n_cols).mean(axis=1)
+        frac = np.clip(currents / self.max_current, 0, 1)
+        x0, x1 = READOUT_X
+        for row, f in enumerate(frac):
+            top = a.y_edges[row]
+            bottom = a.y_edges[row + 1]
+            pad = 0.2 * (top - bottom)
+            self._rect(img, x0, top - pad, x0 + f * (x1 - x0), bottom + pad, BAR_COLOR)
+
+        py = float(ens.paddle_y[game])
+        self._rect(img, PADDLE_X - PADDLE_HALF_WIDTH, py + PADDLE_HALF,
+                   PADDLE_X + PADDLE_HALF_WIDTH, py - PADDLE_HALF, WHITE)
+        self._rect(img, x - BALL_HALF, y + BALL_HALF, x + BALL_HALF, y - BALL_HALF, WHITE)
+
+        self._text(img, 4, 4, f"{ens.t:7.1f}s")
+        self._text(img, 4, 18, f"{int(ens.score[game])}")
+        return img
+
+    def render_tiled(self, ens, games, cols=None):
+        """Frames of several games laid out on a grid."""
+        cols = cols or int(np.ceil(np.sqrt(len(games))))
+        rows = int(np.ceil(len(games) / cols))
+        out = np.zeros((rows * self.height, cols * self.width, 3), dtype=np.uint8)
+        for i, g in enumerate(games):
+            r, c = divmod(i, cols)
+            out[r * self.height:(r + 1) * self.height, c * self.width:(c + 1) * self.width] = self.render(ens, g)
+        return out
+
+
+# ---------------- OUTPUT SINKS ----------------
+def write_png(path, img):
+    """Minimal PNG encoder (8-bit RGB), so no imaging library is needed."""
+    h, w, _ = img.shape
+    raw = np.concatenate([np.zeros((h, 1), dtype=np.uint8), img.reshape(h, w * 3)], axis=1)
+
+    def chunk(tag, data):
+        return (struct.pack(">I", len(data)) + tag + data
+                + struct.pack(">I", zlib.crc32(tag + data) & 0xFFFFFFFF))
+
+    with open(path, "wb") as f:
+        f.write(b"\x89PNG\r\n\x1a\n")
+        f.write(chunk(b"IHDR", struct.pack(">IIBBBBB", w, h, 8, 2, 0, 0, 0)))
+        f.write(chunk(b"IDAT", zlib.compress(raw.tobytes(), 6)))
+        f.write(chunk(b"IEND", b""))
+
+
+class ImageSequenceSink:
+    """Writes ``frame_000000.png``, ``frame_000001.png``, ... into a directory."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.count = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def write(self, img):
+        write_png(os.path.join(self.directory, f"frame_{self.count:06d}.png"), img)
+        self.count += 1
+
+    def close(self):
+        pass
+
+
+class VideoSink:
+    """Pipes raw RGB frames into ``ffmpeg``, which must be on the PATH."""
+
+    def __init__(self, path, fps=30):
+        self.path = path
+        self.fps = fps
+        self.proc = None
+        if shutil.which("ffmpeg") is None:
+            raise RuntimeError("video output needs ffmpeg on the PATH; use an output directory instead")
+
+    def write(self, img):
+        if self.proc is None:
+            h, w, _ = img.shape
+            self.proc = subprocess.Popen(
+                ["ffmpeg", "-y", "-loglevel", "error", "-f", "rawvideo", "-pix_fmt", "rgb24",
+                 "-s", f"{w}x{h}", "-r", str(self.fps), "-i", "-",
+                 "-pix_fmt", "yuv420p", "-vf", "pad=ceil(iw/2)*2:ceil(ih/2)*2", self.path],
+                stdin=subprocess.PIPE)
+        self.proc.stdin.write(np.ascontiguousarray(img).tobytes())
+
+    def close(self):
+        if self.proc is not None:
+            self.proc.stdin.close()
+            self.proc.wait()
+
+
+def open_sink(out, fps=30):
+    if os.path.splitext(out)[1].lower() in (".mp4", ".avi", ".mkv", ".webm", ".mov"):
+        return VideoSink(out, fps)
+    return ImageSequenceSink(out)
+
+
+def render_run(ens, steps, sink, every=1, games=(0,), scale=0.5):
+    """Run ``ens`` for ``steps`` frames, writing every ``every``-th frame to ``sink``."""
+    renderer = FrameRenderer(ens.arena, scale,
+                             MODEL1_READOUT_MAX if ens.model == 1 else READOUT_MAX_CURRENT)
+    games = list(games)
+    try:
+        for _ in range(int(steps)):
+            ens.step()
+            if ens.steps % every == 0:
+                if len(games) == 1:
+                    sink.write(renderer.render(ens, games[0]))
+                else:
+                    sink.write(renderer.render_tiled(ens, games))
+    finally:
+        sink.close()
+    return ens
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render a headless run to images or video.")
+    parser.add_argument("--model", type=int, default=2, choices=(1, 2, 3))
+    parser.add_argument("--mode", default="correct")
+    parser.add_argument("--steps", type=int, default=3600)
+    parser.add_argument("--every", type=int, default=1, help="keep every k-th frame")
+    parser.add_argument("--games", type=int, default=1, help="number of games to tile")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--scale", type=float, default=0.5, help="pixels per world unit")
+    parser.add_argument("--fps", type=int, default=30)
+    parser.add_argument("--out", required=True, help="directory for PNGs or a video file")
+    args = parser.parse_args(argv)
+
+    ens = Ensemble(args.model, n_games=args.games, mode=args.mode, seed=args.seed)
+    sink = open_sink(args.out, args.fps)
+    render_run(ens, args.steps, sink, every=args.every, games=range(args.games), scale=args.scale)
+    print(f"Rendered {args.steps // args.every} frames to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
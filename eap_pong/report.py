@@ -0,0 +1,121 @@
+"""Post-processing of saved runs: CSV export and plots.
+
+matplotlib and pandas are imported inside the functions that need them, so
+neither the simulation scripts nor batch workers pay for them.  One
+invocation can process any number of run files::
+
+    python -m eap_pong.report runs/*.npz --out-dir reports --summary summary.csv
+    python -m eap_pong.report currents_log.npz --show
+"""
+
+import argparse
+import os
+
+import numpy as np
+
+from .runfile import load_run
+
+
+def _pyplot(show):
+    import matplotlib
+    if not show:
+        matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    return plt
+
+
+def currents_frame(run):
+    """DataFrame with ``time`` and ``current1..N`` columns (the currents_log.csv layout)."""
+    import pandas as pd
+    currents = run["currents"]
+    return pd.DataFrame({"time": run["time"],
+                         **{f"current{i + 1}": currents[:, i] for i in range(currents.shape[1])}})
+
+
+def write_csv(run, path):
+    currents_frame(run).to_csv(path, index=False)
+    return path
+
+
+def plot_currents(run, plt):
+    fig = plt.figure(figsize=(10, 6))
+    for i, r in enumerate(run["region_names"]):
+        plt.plot(run["time"], run["currents"][:, i], label=f"Region {r}")
+    plt.xlabel("Time (s)")
+    plt.ylabel("Current (mA)")
+    plt.title("Independent Region Currents")
+    plt.legend()
+    plt.grid(True)
+    return fig
+
+
+def plot_hit_rate(run, plt):
+    names = run["region_names"]
+    fig, axs = plt.subplots(len(names), 1, figsize=(8, 10), squeeze=False)
+    for ax, r in zip(axs[:, 0], names):
+        hist, times = run["region_history"][r], run["region_time"][r]
+        if len(hist):
+            ax.plot(times, hist, marker="o", linewidth=2)
+        ax.set_title(f"Region {r} Hit Rate vs Time")
+        ax.set_xlabel("Time (s)")
+        ax.set_ylabel("Hit Rate")
+        ax.set_ylim(0, 1.05)
+        ax.grid(True)
+    plt.tight_layout()
+    return fig
+
+
+def report_run(path, out_dir=None, csv=True, plots=True, show=False, csv_name=None):
+    """CSV and plots for one run file; returns the loaded run."""
+    run = load_run(path)
+    stem = os.path.splitext(os.path.basename(path))[0]
+    out_dir = out_dir or os.path.dirname(os.path.abspath(path))
+    os.makedirs(out_dir, exist_ok=True)
+    if csv:
+        csv_path = write_csv(run, os.path.join(out_dir, csv_name or f"{stem}.csv"))
+        print(f"✅ Current data saved to '{csv_path}'")
+    if plots:
+        plt = _pyplot(show)
+        fig_c = plot_currents(run, plt)
+        fig_h = plot_hit_rate(run, plt)
+        if show:
+            plt.show()
+        else:
+            fig_c.savefig(os.path.join(out_dir, f"{stem}_currents.png"))
+            fig_h.savefig(os.path.join(out_dir, f"{stem}_hit_rate.png"))
+        plt.close("all")
+    return run
+
+
+def summary_row(run):
+    """Final hit rate per region plus the run's metadata."""
+    row = {"run": os.path.basename(run["path"]), **run["meta"]}
+    for r in run["region_names"]:
+        hist = run["region_history"][r]
+        row[f"hit_rate_{r}"] = float(hist[-1]) if len(hist) else np.nan
+    row["duration"] = float(run["time"][-1]) if len(run["time"]) else 0.0
+    return row
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="CSV export and plots for saved runs.")
+    parser.add_argument("runs", nargs="+", help="run files written by the scripts (.npz)")
+    parser.add_argument("--out-dir", default=None, help="default: next to each run file")
+    parser.add_argument("--no-csv", action="store_true")
+    parser.add_argument("--no-plots", action="store_true")
+    parser.add_argument("--show", action="store_true", help="open plot windows instead of saving PNGs")
+    parser.add_argument("--summary", default=None, help="write one summary row per run to this CSV")
+    args = parser.parse_args(argv)
+
+    rows = []
+    for path in args.runs:
+        run = report_run(path, args.out_dir, csv=not args.no_csv, plots=not args.no_plots, show=args.show)
+        rows.append(summary_row(run))
+    if args.summary:
+        import pandas as pd
+        pd.DataFrame(rows).to_csv(args.summary, index=False)
+        print(f"Summary of {len(rows)} runs saved to '{args.summary}'")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""Counter-based random streams, one per game and stochastic source.
+
+A value is addressed by ``(source, game, draw number)`` and computed with
+the Philox4x64-10 block cipher (NumPy's ``Philox`` bit generator): the key
+comes from the seed and the source, the counter holds the game ID and draw
+number.  Nothing is consumed in order, so game ``g`` sees the same
+launches, noise and responses whether it runs alone, in an ensemble of
+10,000, or as game ``g - first_game`` of a shard::
+
+    streams = CounterStreams(seed=0)
+    u = streams.random("noise", first_game=0, n_games=10000, start=0, count=64)  # (64, 10000)
+
+Each counter gives four 64-bit words: draw ``n`` of game ``g`` is word
+``g % 4`` of counter ``(g // 4, n, 0, 0)``.  The counters of one draw
+number for a range of games are consecutive, so NumPy produces the whole
+row in one call.
+"""
+
+import numpy as np
+
+SOURCES = ("launch", "noise", "paddle", "response", "sensor")
+
+_WORD = (1 << 64) - 1
+
+
+def _counter(value):
+    """256-bit integer -> the four little-endian counter words."""
+    value &= (1 << 256) - 1
+    return np.array([(value >> (64 * i)) & _WORD for i in range(4)], dtype=np.uint64)
+
+
+class CounterStreams:
+    """Random uniforms addressed by source, game ID and draw number."""
+
+    def __init__(self, seed=None, sources=SOURCES):
+        seed_seq = np.random.SeedSequence(seed)
+        self.entropy = seed_seq.entropy
+        # Source keys depend only on the seed and the source's position
+        self.keys = {name: child.generate_state(2, np.uint64)
+                     for name, child in zip(sources, seed_seq.spawn(len(sources)))}
+
+    def raw(self, source, first_game, n_games, draw):
+        """Draw number ``draw`` of each game as a 64-bit word: shape (n_games,) uint64."""
+        skip = first_game % 4
+        # Philox increments its counter before each block, hence the -1
+        bitgen = np.random.Philox(key=self.keys[source],
+                                  counter=_counter((draw << 64) + first_game // 4 - 1))
+        return bitgen.random_raw(skip + n_games)[skip:]
+
+    def random(self, source, first_game, n_games, start, count):
+        """Uniforms in [0, 1) for draws ``start .. start + count - 1`` of games
+        ``first_game .. first_game + n_games - 1``.
+
+        The result is draw-major, shape (count, n_games): one row per draw
+        number, which is how the counters are laid out.
+        """
+        bits = np.empty((count, n_games), dtype=np.uint64)
+        for i in range(count):
+            bits[i] = self.raw(source, first_game, n_games, start + i)
+        bits >>= np.uint64(11)
+        return bits.view(np.int64) * 2.0 ** -53
@@ -0,0 +1,48 @@
+"""Raw output of one run, stored with NumPy only.
+
+The scripts save a run file when they quit instead of building DataFrames
+and figures in the simulation process; ``python -m eap_pong.report`` turns
+any number of run files into CSV logs and plots.
+"""
+
+import json
+
+import numpy as np
+
+
+def save_run(path, time_data, current_data, region_names, region_history=None,
+             region_time=None, **meta):
+    """Write logged currents and per-region hit-rate history to ``path`` (.npz).
+
+    ``region_history``/``region_time`` are the scripts' ``{name: [...]}``
+    dictionaries; ``meta`` (model, mode, parameters, ...) must be JSON-serializable.
+    """
+    n = len(region_names)
+    arrays = {
+        "time": np.asarray(time_data, dtype=float),
+        "currents": np.asarray(current_data, dtype=float).reshape(-1, n),
+        "region_names": np.asarray(region_names),
+        "meta": np.asarray(json.dumps(meta)),
+    }
+    for i, name in enumerate(region_names):
+        arrays[f"history_{i}"] = np.asarray((region_history or {}).get(name, []), dtype=float)
+        arrays[f"history_time_{i}"] = np.asarray((region_time or {}).get(name, []), dtype=float)
+    with open(path, "wb") as f:
+        np.savez_compressed(f, **arrays)
+    return path
+
+
+def load_run(path):
+    """Inverse of ``save_run``: a dict with time, currents, region_names,
+    region_history, region_time and meta."""
+    with np.load(path) as data:
+        names = [str(n) for n in data["region_names"]]
+        return {
+            "path": path,
+            "time": data["time"],
+            "currents": data["currents"],
+            "region_names": names,
+            "region_history": {n: data[f"history_{i}"] for i, n in enumerate(names)},
+            "region_time": {n: data[f"history_time_{i}"] for i, n in enumerate(names)},
+            "meta": json.loads(str(data["meta"])),
+        }
@@ -0,0 +1,263 @@
+"""Catalog of runs in an SQLite database.
+
+Every run gets an ID and a row with its model, mode, seed, summary metrics
+(final per-region hit rate, total trials, runtime) and the path of its log
+file.  Parameters live in a separate ``(name, value)`` table with an index,
+so queries like "RETENTION_FACTOR > 0.8 in scrambled_paddle mode" are
+answered from the index without opening any run file.  The scripts save
+their runs as ``runs/<id>.npz`` and register them here; sweep results can
+be imported as well::
+
+    python -m eap_pong.runindex add runs/*.npz
+    python -m eap_pong.runindex add-sweep sweep.jsonl
+    python -m eap_pong.runindex query --model 3 --mode scrambled_paddle --where "RETENTION_FACTOR>0.8"
+    python -m eap_pong.runindex show 20261019-142501-9b2e4f0c6d1a4e7f8c3b5a6d2e1f0a9b
+
+The store directory is ``runs`` under the working directory, or
+``EAP_PONG_RUNS_DIR``; the catalog is ``index.db`` inside it.
+"""
+
+import argparse
+import json
+import math
+import os
+import re
+import sqlite3
+import time
+import uuid
+
+from .engine import FRAME_DT
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id TEXT PRIMARY KEY,
+    created REAL,
+    model INTEGER,
+    mode TEXT,
+    seed INTEGER,
+    source TEXT,
+    log_path TEXT,
+    duration REAL,
+    runtime REAL,
+    total_trials INTEGER,
+    hit_rate REAL,
+    meta TEXT
+);
+CREATE TABLE IF NOT EXISTS params (
+    run_id TEXT NOT NULL REFERENCES runs (id) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    value REAL,
+    PRIMARY KEY (run_id, name)
+);
+CREATE TABLE IF NOT EXISTS region_metrics (
+    run_id TEXT NOT NULL REFERENCES runs (id) ON DELETE CASCADE,
+    region TEXT NOT NULL,
+    hit_rate REAL,
+    PRIMARY KEY (run_id, region)
+);
+CREATE INDEX IF NOT EXISTS runs_model_mode ON runs (model, mode);
+CREATE INDEX IF NOT EXISTS runs_created ON runs (created);
+CREATE INDEX IF NOT EXISTS params_name_value ON params (name, value, run_id);
+"""
+
+RUN_COLUMNS = ("model", "mode", "seed", "source", "log_path", "duration", "runtime", "total_trials", "hit_rate")
+_WHERE = re.compile(r"^\s*(\w+)\s*(<=|>=|!=|=|<|>)\s*([-+0-9.eE]+)\s*$")
+
+
+def runs_dir():
+    """Store directory (``EAP_PONG_RUNS_DIR`` overrides ``./runs``)."""
+    path = os.environ.get("EAP_PONG_RUNS_DIR", "runs")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def connect(path=None):
+    db = sqlite3.connect(path or os.path.join(runs_dir(), "index.db"), timeout=30.0)
+    db.execute("PRAGMA foreign_keys = ON")
+    db.executescript(SCHEMA)
+    return db
+
+
+def new_run_id():
+    """Creation time (for sorting by eye) and a random UUID (for uniqueness)."""
+    return f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex}"
+
+
+def new_run_path(suffix=".npz", directory=None):
+    """``(run_id, path)`` for a new run file in the store."""
+    run_id = new_run_id()
+    return run_id, os.path.join(directory or runs_dir(), run_id + suffix)
+
+
+def _number(value):
+    return None if value is None or (isinstance(value, float) and math.isnan(value)) else value
+
+
+def register(db, run_id=None, params=None, region_hit_rate=None, meta=None, replace=False, **columns):
+    """Insert one run; ``columns`` are any of ``RUN_COLUMNS``.
+
+    An ID that is already in the catalog raises ``ValueError`` unless
+    ``replace`` is set.
+    """
+    unknown = set(columns) - set(RUN_COLUMNS)
+    if unknown:
+        raise ValueError(f"unknown run columns: {sorted(unknown)}")
+    run_id = run_id or new_run_id()
+    row = {name: _number(columns.get(name)) for name in RUN_COLUMNS}
+    with db:
+        if replace:
+            db.execute("DELETE FROM runs WHERE id = ?", (run_id,))
+        elif db.execute("SELECT 1 FROM runs WHERE id = ?", (run_id,)).fetchone():
+            raise ValueError(f"run {run_id!r} is already in the catalog")
+        db.execute(f"INSERT INTO runs (id, created, {', '.join(RUN_COLUMNS)}, meta) "
+                   f"VALUES (?, ?, {', '.join('?' * len(RUN_COLUMNS))}, ?)",
+                   (run_id, time.time(), *row.values(), json.dumps(meta or {})))
+        db.executemany("INSERT INTO params (run_id, name, value) VALUES (?, ?, ?)",
+                       [(run_id, k, float(v)) for k, v in (params or {}).items()
+                        if isinstance(v, (int, float)) and not isinstance(v, bool)])
+        db.executemany("INSERT INTO region_metrics (run_id, region, hit_rate) VALUES (?, ?, ?)",
+                       [(run_id, r, _number(v)) for r, v in (region_hit_rate or {}).items()])
+    return run_id
+
+
+# ---------------- Importers ----------------
+META_COLUMNS = ("model", "mode", "seed", "runtime", "total_trials")
+
+
+def register_runfile(db, path, run_id=None, log_path=None, replace=False):
+    """Index a run file written by ``runfile.save_run``; its meta supplies the parameters.
+
+    ``log_path`` points at the run's per-tick log (``.eaplog``) when it has one.
+    """
+    from .runfile import load_run
+    run = load_run(path)
+    meta = dict(run["meta"])
+    region_rate = {r: (float(h[-1]) if len(h) else None) for r, h in run["region_history"].items()}
+    rates = [v for v in region_rate.values() if v is not None]
+    columns = {k: meta.pop(k) for k in META_COLUMNS if k in meta}
+    return register(db, run_id or os.path.splitext(os.path.basename(path))[0], replace=replace,
+                    params=meta, region_hit_rate=region_rate, meta=run["meta"], source="script",
+                    log_path=os.path.abspath(log_path or path),
+                    duration=float(run["time"][-1]) if len(run["time"]) else 0.0,
+                    hit_rate=sum(rates) / len(rates) if rates else None, **columns)
+
+
+def _sweep_duration(result):
+    """Simulated seconds a sweep job actually ran (early stopping, multi-frame steps)."""
+    steps = result.get("steps_run", result["steps"])
+    return steps * result.get("frames_per_step", 1) * result.get("dt", FRAME_DT)
+
+
+def register_sweep(db, path):
+    """Index every result line of a sweep (``eap_pong.sweep`` / ``workqueue results``)."""
+    ids = []
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                r = json.loads(line)
+                ids.append(register(db, params=r["params"], region_hit_rate=r["region_hit_rate"], meta=r,
+                                    model=r["model"], mode=r["mode"], seed=r["seed"], source="sweep",
+                                    log_path=os.path.abspath(path), duration=_sweep_duration(r),
+                                    runtime=r["runtime"], total_trials=r["total_trials"],
+                                    hit_rate=r["hit_rate"]))
+    return ids
+
+
+# ---------------- Queries ----------------
+def parse_where(spec):
+    """``"NAME>0.8"`` -> ``("NAME", ">", 0.8)``."""
+    m = _WHERE.match(spec)
+    if m is None:
+        raise ValueError(f"bad condition {spec!r}; expected NAME<op>NUMBER")
+    return m.group(1), m.group(2), float(m.group(3))
+
+
+def query(db, model=None, mode=None, where=(), limit=None, run_id=None):
+    """Runs matching all conditions, newest first, as dicts with their params.
+
+    ``where`` conditions apply to run columns (hit_rate, total_trials, ...)
+    or, for any other name, to parameters via the ``params`` index.
+    """
+    clauses, args = [], []
+    if run_id is not None:
+        clauses.append("id = ?")
+        args.append(run_id)
+    if model is not None:
+        clauses.append("model = ?")
+        args.append(model)
+    if mode is not None:
+        clauses.append("mode = ?")
+        args.append(mode)
+    for name, op, value in where:
+        if name in RUN_COLUMNS:
+            clauses.append(f"{name} {op} ?")
+        else:
+            clauses.append(f"id IN (SELECT run_id FROM params WHERE name = ? AND value {op} ?)")
+            args.append(name)
+        args.append(value)
+    sql = "SELECT * FROM runs" + (" WHERE " + " AND ".join(clauses) if clauses else "") + " ORDER BY created DESC"
+    if limit:
+        sql += f" LIMIT {int(limit)}"
+    cur = db.execute(sql, args)
+    names = [d[0] for d in cur.description]
+    rows = [dict(zip(names, r)) for r in cur.fetchall()]
+    for row in rows:
+        row["params"] = dict(db.execute("SELECT name, value FROM params WHERE run_id = ?", (row["id"],)))
+        row["region_hit_rate"] = dict(db.execute(
+            "SELECT region, hit_rate FROM region_metrics WHERE run_id = ? ORDER BY region", (row["id"],)))
+    return rows
+
+
+def _fmt(v):
+    return "-" if v is None else (f"{v:.3f}" if isinstance(v, float) else str(v))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Catalog of runs in SQLite.")
+    parser.add_argument("--db", default=None, help="catalog file (default: <runs dir>/index.db)")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("add", help="index run files (.npz)")
+    p.add_argument("paths", nargs="+")
+    p.add_argument("--replace", action="store_true", help="re-index runs that are already in the catalog")
+    p = sub.add_parser("add-sweep", help="index sweep results (.jsonl)")
+    p.add_argument("paths", nargs="+")
+    p = sub.add_parser("query", help="list matching runs")
+    p.add_argument("--model", type=int, default=None)
+    p.add_argument("--mode", default=None)
+    p.add_argument("--where", action="append", default=[], metavar="NAME<op>VALUE")
+    p.add_argument("--limit", type=int, default=None)
+    p.add_argument("--json", action="store_true")
+    p = sub.add_parser("show", help="everything recorded for one run")
+    p.add_argument("run_id")
+    args = parser.parse_args(argv)
+
+    db = connect(args.db)
+    if args.command == "add":
+        for path in args.paths:
+            print(register_runfile(db, path, replace=args.replace))
+    elif args.command == "add-sweep":
+        for path in args.paths:
+            print(f"{len(register_sweep(db, path))} runs from '{path}'")
+    elif args.command == "query":
+        rows = query(db, args.model, args.mode, [parse_where(w) for w in args.where], args.limit)
+        if args.json:
+            print(json.dumps(rows, indent=1))
+        else:
+            print(f"{'id':<49}{'model':>6} {'mode':<18}{'hit rate':>9}{'trials':>8}  params")
+            for r in rows:
+                params = " ".join(f"{k}={v:g}" for k, v in r["params"].items())
+                print(f"{r['id']:<49}{_fmt(r['model']):>6} {_fmt(r['mode']):<18}{_fmt(r['hit_rate']):>9}"
+                      f"{_fmt(r['total_trials']):>8}  {params}")
+            print(f"{len(rows)} runs")
+    elif args.command == "show":
+        rows = query(db, run_id=args.run_id)
+        if not rows:
+            parser.error(f"no run {args.run_id!r}")
+        row = rows[0]
+        row["meta"] = json.loads(row["meta"])
+        print(json.dumps(row, indent=1))
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
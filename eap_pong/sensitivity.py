@@ -0,0 +1,292 @@
+"""Global sensitivity analysis of hit rate over model parameters.
+
+Two methods are provided:
+
+* ``sobol`` - Saltelli design on an (unscrambled) Sobol sequence, first-order
+  (Saltelli 2010) and total-effect (Jansen) indices;
+* ``morris`` - elementary effects on a Morris trajectory design (mu*, sigma).
+
+Both report bootstrap confidence intervals.  Parameter points are evaluated
+as one batched ``Ensemble`` per chunk (every game has its own parameters),
+optionally spread over worker processes, so designs with tens of thousands
+of points are practical::
+
+    python -m eap_pong.sensitivity --model 3 --n 1024 --steps 20000 --workers 4
+"""
+
+import argparse
+import json
+from multiprocessing import Pool
+
+import numpy as np
+
+from .engine import Ensemble
+
+# Ranges explored by default; override with --param NAME=LOW:HIGH
+PARAMETER_RANGES = {
+    1: {"learning_rate": (0.01, 0.3), "current_decay": (0.8, 0.99), "max_refractory": (0.1, 3.0)},
+    2: {"NOISE_FACTOR": (0.0, 3.0), "SLOW_FACTOR": (1.0, 4.0), "paddle_update_dt": (0.02, 0.5)},
+    3: {"RETENTION_FACTOR": (0.0, 1.0), "NOISE_FACTOR": (0.0, 2.0), "SLOW_FACTOR": (1.0, 4.0),
+        "TAU": (20.0, 400.0), "paddle_update_dt": (0.02, 0.5)},
+}
+
+# ---------------- SOBOL SEQUENCE ----------------
+# (degree s, polynomial a, initial m_1..m_s) for dimensions 2, 3, ...
+# from Joe & Kuo's new-joe-kuo-6.21201 table; dimension 1 is van der Corput.
+_SOBOL_DIRECTIONS = [
+    (1, 0, (1,)), (2, 1, (1, 3)), (3, 1, (1, 3, 1)), (3, 2, (1, 1, 1)),
+    (4, 1, (1, 1, 3, 3)), (4, 4, (1, 3, 5, 13)), (5, 2, (1, 1, 5, 5, 17)),
+    (5, 4, (1, 1, 5, 5, 5)), (5, 7, (1, 1, 7, 11, 19)), (5, 11, (1, 1, 5, 1, 1)),
+    (5, 13, (1, 1, 1, 3, 11)), (5, 14, (1, 3, 5, 5, 31)), (6, 1, (1, 3, 3, 9, 7, 49)),
+    (6, 13, (1, 1, 1, 15, 21, 21)), (6, 16, (1, 3, 1, 13, 27, 49)),
+    (6, 19, (1, 1, 1, 15, 7, 5)), (6, 22, (1, 3, 1, 15, 13, 25)),
+    (6, 25, (1, 1, 5, 5, 19, 61)), (7, 1, (1, 3, 7, 11, 23, 15, 103)),
+    (7, 4, (1, 3, 7, 13, 13, 15, 69)),
+]
+_BITS = 32
+
+
+def _direction_numbers(dim):
+    v = np.zeros((dim, _BITS), dtype=np.uint64)
+    v[0] = [1 << (_BITS - 1 - k) for k in range(_BITS)]
+    for j in range(1, dim):
+        s, a, m = _SOBOL_DIRECTIONS[j - 1]
+        vj = [0] * _BITS
+        for k in range(s):
+            vj[k] = m[k] << (_BITS - 1 - k)
+        for k in range(s, _BITS):
+            x = vj[k - s] ^ (vj[k - s] >> s)
+            for l in range(1, s):
+                if (a >> (s - 1 - l)) & 1:
+                    x ^= vj[k - l]
+            vj[k] = x
+        v[j] = vj
+    return v
+
+
+def sobol_sequence(n, dim, skip=1):
+    """First ``n`` points of the ``dim``-dimensional Sobol sequence after ``skip``."""
+    if dim > len(_SOBOL_DIRECTIONS) + 1:
+        raise ValueError(f"at most {len(_SOBOL_DIRECTIONS) + 1} dimensions are supported")
+    v = _direction_numbers(dim)
+    idx = np.arange(skip, skip + n, dtype=np.uint64)
+    gray = idx ^ (idx >> np.uint64(1))
+    x = np.zeros((n, dim), dtype=np.uint64)
+    for k in range(_BITS):
+        bit = ((gray >> np.uint64(k)) & np.uint64(1)).astype(bool)
+        x[bit] ^= v[:, k]
+    return x.astype(float) / 2.0 ** _BITS
+
+
+# ---------------- DESIGNS ----------------
+def saltelli_design(n, dim):
+    """Unit-cube matrices A, B and AB (``AB[i]`` is A with column i from B)."""
+    base = sobol_sequence(n, 2 * dim)
+    a, b = base[:, :dim], base[:, dim:]
+    ab = np.repeat(a[None], dim, axis=0)
+    for i in range(dim):
+        ab[i, :, i] = b[:, i]
+    return a, b, ab
+
+
+def morris_design(r, dim, levels=4, seed=None):
+    """``r`` Morris trajectories of ``dim + 1`` points each, plus the moved factor per step."""
+    rng = np.random.default_rng(seed)
+    delta = levels / (2 * (levels - 1))
+    grid = np.arange(levels // 2) / (levels - 1)
+    points = np.empty((r, dim + 1, dim))
+    moved = np.empty((r, dim), dtype=int)
+    for t in range(r):
+        x = rng.choice(grid, dim)
+        order = rng.permutation(dim)
+        sign = rng.choice([-1.0, 1.0], dim)
+        # start from the side that keeps every step inside [0, 1]
+        x = np.where(sign < 0, x + delta, x)
+        points[t, 0] = x
+        for step, i in enumerate(order):
+            x = x.copy()
+            x[i] += sign[i] * delta
+            points[t, step + 1] = x
+        moved[t] = order
+    return points, moved, delta
+
+
+def scale_points(unit, ranges):
+    lows = np.array([lo for lo, _ in ranges.values()])
+    highs = np.array([hi for _, hi in ranges.values()])
+    return lows + unit * (highs - lows)
+
+
+# ---------------- EVALUATION ----------------
+def _evaluate_chunk(args):
+    model, names, values, steps, mode, seed, first_game = args
+    params = {name: values[:, i] for i, name in enumerate(names)}
+    ens = Ensemble(model, n_games=len(values), params=params, mode=mode, seed=seed, first_game=first_game)
+    ens.run(steps)
+    return ens.summary()["hit_rate"]
+
+
+def evaluate(model, names, values, steps=20000, mode="correct", seed=0, batch_size=2048, workers=1):
+    """Hit rate for every row of ``values`` (one column per parameter in ``names``).
+
+    Row ``i`` is game ``i`` of the seed's streams, so the result does not
+    depend on ``batch_size`` or ``workers``.
+    """
+    chunks = [(model, list(names), values[i:i + batch_size], steps, mode, seed, i)
+              for i in range(0, len(values), batch_size)]
+    if workers > 1:
+        with Pool(workers) as pool:
+            results = pool.map(_evaluate_chunk, chunks)
+    else:
+        results = [_evaluate_chunk(c) for c in chunks]
+    return np.concatenate(results)
+
+
+def _require_trials(y, steps):
+    """Points without a single trial have no hit rate; counting them as 0
+    would credit their effect to whichever parameters slow the ball."""
+    missing = np.isnan(y)
+    if missing.any():
+        raise ValueError(f"{int(missing.sum())} of {y.size} parameter points had no trials in {steps} steps; "
+                         f"raise --steps or narrow the parameter ranges")
+    return y
+
+
+# ---------------- ESTIMATORS ----------------
+def sobol_indices(fa, fb, fab):
+    """First-order and total-effect indices from Saltelli-design outputs."""
+    var = np.var(np.concatenate([fa, fb]))
+    first = np.mean(fb * (fab - fa), axis=-1) / var
+    total = 0.5 * np.mean((fa - fab) ** 2, axis=-1) / var
+    return first, total
+
+
+def bootstrap_sobol(fa, fb, fab, n_boot=500, level=0.95, seed=None):
+    rng = np.random.default_rng(seed)
+    n = fa.size
+    first, total = sobol_indices(fa, fb, fab)
+    boot_first, boot_total = [], []
+    for _ in range(n_boot):
+        i = rng.integers(0, n, n)
+        s1, st = sobol_indices(fa[i], fb[i], fab[:, i])
+        boot_first.append(s1)
+        boot_total.append(st)
+    q = [(1 - level) / 2 * 100, (1 + level) / 2 * 100]
+    return {
+        "S1": first, "S1_ci": np.percentile(boot_first, q, axis=0).T,
+        "ST": total, "ST_ci": np.percentile(boot_total, q, axis=0).T,
+    }
+
+
+def morris_effects(f, moved, points):
+    """Elementary effects (unit-cube slopes) per trajectory, by factor: shape (r, dim)."""
+    r, dim = moved.shape
+    effects = np.empty((r, dim))
+    for t in range(r):
+        for step, i in enumerate(moved[t]):
+            dx = points[t, step + 1, i] - points[t, step, i]
+            effects[t, i] = (f[t, step + 1] - f[t, step]) / dx
+    return effects
+
+
+def bootstrap_morris(effects, n_boot=500, level=0.95, seed=None):
+    rng = np.random.default_rng(seed)
+    r = effects.shape[0]
+    mu_star = np.abs(effects).mean(axis=0)
+    boots = [np.abs(effects[rng.integers(0, r, r)]).mean(axis=0) for _ in range(n_boot)]
+    q = [(1 - level) / 2 * 100, (1 + level) / 2 * 100]
+    return {
+        "mu": effects.mean(axis=0), "mu_star": mu_star,
+        "mu_star_ci": np.percentile(boots, q, axis=0).T, "sigma": effects.std(axis=0, ddof=1),
+    }
+
+
+# ---------------- DRIVERS ----------------
+def run_sobol(model, ranges, n=1024, steps=20000, mode="correct", seed=0,
+              n_boot=500, batch_size=2048, workers=1):
+    names = list(ranges)
+    dim = len(names)
+    a, b, ab = saltelli_design(n, dim)
+    unit = np.concatenate([a, b, ab.reshape(-1, dim)])
+    y = evaluate(model, names, scale_points(unit, ranges), steps, mode, seed, batch_size, workers)
+    _require_trials(y, steps)
+    fa, fb, fab = y[:n], y[n:2 * n], y[2 * n:].reshape(dim, n)
+    result = bootstrap_sobol(fa, fb, fab, n_boot, seed=seed)
+    result["names"] = names
+    result["evaluations"] = int(y.size)
+    return result
+
+
+def run_morris(model, ranges, r=64, levels=4, steps=20000, mode="correct", seed=0,
+               n_boot=500, batch_size=2048, workers=1):
+    names = list(ranges)
+    dim = len(names)
+    points, moved, _ = morris_design(r, dim, levels, seed)
+    y = evaluate(model, names, scale_points(points.reshape(-1, dim), ranges),
+                 steps, mode, seed, batch_size, workers)
+    f = _require_trials(y, steps).reshape(r, dim + 1)
+    result = bootstrap_morris(morris_effects(f, moved, points), n_boot, seed=seed)
+    result["names"] = names
+    result["evaluations"] = int(y.size)
+    return result
+
+
+def _format(result):
+    if "S1" in result:
+        lines = [f"{'parameter':<20}{'S1':>8}{'95% CI':>18}{'ST':>8}{'95% CI':>18}"]
+        for i, name in enumerate(result["names"]):
+            lo1, hi1 = result["S1_ci"][i]
+            lot, hit = result["ST_ci"][i]
+            lines.append(f"{name:<20}{result['S1'][i]:>8.3f}  [{lo1:6.3f}, {hi1:6.3f}]"
+                         f"{result['ST'][i]:>8.3f}  [{lot:6.3f}, {hit:6.3f}]")
+    else:
+        lines = [f"{'parameter':<20}{'mu*':>8}{'95% CI':>18}{'mu':>8}{'sigma':>8}"]
+        for i, name in enumerate(result["names"]):
+            lo, hi = result["mu_star_ci"][i]
+            lines.append(f"{name:<20}{result['mu_star'][i]:>8.3f}  [{lo:6.3f}, {hi:6.3f}]"
+                         f"{result['mu'][i]:>8.3f}{result['sigma'][i]:>8.3f}")
+    lines.append(f"({result['evaluations']} simulated parameter points)")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sobol / Morris sensitivity of hit rate.")
+    parser.add_argument("--model", type=int, default=3, choices=(1, 2, 3))
+    parser.add_argument("--method", default="sobol", choices=("sobol", "morris"))
+    parser.add_argument("--n", type=int, default=1024, help="base samples (sobol) or trajectories (morris)")
+    parser.add_argument("--levels", type=int, default=4, help="Morris grid levels")
+    parser.add_argument("--steps", type=int, default=20000, help="frames simulated per point")
+    parser.add_argument("--mode", default="correct")
+    parser.add_argument("--param", action="append", default=[], metavar="NAME=LOW:HIGH",
+                        help="override or add a parameter range")
+    parser.add_argument("--only", default=None, help="comma-separated subset of parameters")
+    parser.add_argument("--bootstrap", type=int, default=500)
+    parser.add_argument("--batch-size", type=int, default=2048)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default=None, help="write the indices as JSON")
+    args = parser.parse_args(argv)
+
+    ranges = dict(PARAMETER_RANGES[args.model])
+    for spec in args.param:
+        name, bounds = spec.split("=")
+        low, high = bounds.split(":")
+        ranges[name] = (float(low), float(high))
+    if args.only:
+        ranges = {k: ranges[k] for k in args.only.split(",")}
+
+    common = dict(steps=args.steps, mode=args.mode, seed=args.seed, n_boot=args.bootstrap,
+                  batch_size=args.batch_size, workers=args.workers)
+    if args.method == "sobol":
+        result = run_sobol(args.model, ranges, n=args.n, **common)
+    else:
+        result = run_morris(args.model, ranges, r=args.n, levels=args.levels, **common)
+    print(_format(result))
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump({k: np.asarray(v).tolist() if not isinstance(v, (str, int)) else v
+                       for k, v in result.items()}, f, indent=1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,337 @@
+"""Long-lived simulation server on a Unix socket.
+
+The server imports the engine once and keeps a pool of warmed-up worker
+processes, so a short run submitted from a notebook or a script starts in
+milliseconds instead of paying interpreter start-up and imports each time.
+Requests and replies are JSON lines.  Results stream back as they are
+produced: progress snapshots while a run is going, and one result line per
+job of a sweep as soon as it finishes::
+
+    python -m eap_pong.server serve --procs 8 &
+    python -m eap_pong.server run --model 2 --games 64 --steps 36000 --progress-every 3600
+    python -m eap_pong.server sweep --model 3 --grid RETENTION_FACTOR=0.1,0.5,0.9 --out sweep.jsonl
+    python -m eap_pong.server shutdown
+
+From Python::
+
+    with Client() as c:
+        for msg in c.run({"model": 2, "mode": "correct", "params": {}, "steps": 3600,
+                          "n_games": 64, "seed": 0}, progress_every=600):
+            print(msg)
+
+Requests are ``{"op": ...}`` with op ``run`` (``job``), ``sweep``
+(``jobs``), ``ping``, ``status`` or ``shutdown``; jobs are the dicts of
+``eap_pong.sweep``.  Replies have a ``type``: ``progress``, ``result``,
+``error``, ``done``, ``pong``, ``status`` or ``bye``.  The socket is
+``EAP_PONG_SOCKET``, or ``eap_pong-<uid>.sock`` in the temp directory.
+When a client disconnects, the jobs of its request that have not started
+are skipped and the running ones stop at their next progress check.
+"""
+
+import argparse
+import itertools
+import json
+import multiprocessing
+import os
+import queue
+import socket
+import socketserver
+import tempfile
+import threading
+import time
+import traceback
+
+import numpy as np
+
+from . import sweep
+from .engine import Ensemble
+
+
+def default_socket():
+    return os.environ.get("EAP_PONG_SOCKET",
+                          os.path.join(tempfile.gettempdir(), f"eap_pong-{os.getuid()}.sock"))
+
+
+# ---------------- Workers ----------------
+_EVENTS = None
+# Shared with the workers: slot ``request % CANCEL_SLOTS`` holds ``request + 1``
+# once that request's client has gone
+CANCEL_SLOTS = 4096
+_CANCELLED = None
+
+
+def _init_worker(events, cancelled):
+    """Pool initializer: keep the event queue and cancel flags, and run every model once."""
+    global _EVENTS, _CANCELLED
+    _EVENTS, _CANCELLED = events, cancelled
+    for model in (1, 2, 3):
+        Ensemble(model, n_games=2, seed=0).run(10)
+
+
+def _snapshot(ens):
+    s = ens.summary()
+    finite = np.isfinite(s["hit_rate"])
+    return {"type": "progress", "steps": ens.steps, "t": ens.t,
+            "hit_rate": float(np.nanmean(s["hit_rate"])) if finite.any() else None,
+            "total_trials": int(s["trials"].sum())}
+
+
+def _cancelled(request):
+    return _CANCELLED[request % CANCEL_SLOTS] == request + 1
+
+
+def _run_task(request, index, job):
+    """Run one job in a worker; everything it reports goes through the event
+    queue, so a request's progress always arrives before its result."""
+    if _cancelled(request):
+        return
+
+    def progress(ens):
+        if _cancelled(request):
+            return True
+        if job.get("progress_every"):
+            _EVENTS.put((request, {**_snapshot(ens), "job": index}))
+    try:
+        result = sweep.run_job(job, progress)
+        if _cancelled(request):
+            return
+        _EVENTS.put((request, {"type": "result", "job": index, **result}))
+    except Exception as exc:
+        _EVENTS.put((request, {"type": "error", "job": index, "message": f"{type(exc).__name__}: {exc}",
+                               "traceback": traceback.format_exc()}))
+
+
+# ---------------- Server ----------------
+class _Handler(socketserver.StreamRequestHandler):
+    def send(self, msg):
+        self.wfile.write((json.dumps(msg) + "\n").encode())
+        self.wfile.flush()
+
+    def handle(self):
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            try:
+                msg = json.loads(line)
+                op = msg.get("op")
+                if op == "run":
+                    self.server.submit(self, [msg["job"]], msg.get("progress_every"))
+                elif op == "sweep":
+                    self.server.submit(self, msg["jobs"], msg.get("progress_every"))
+                elif op == "ping":
+                    self.send({"type": "pong", "pid": os.getpid(), "procs": self.server.procs})
+                elif op == "status":
+                    self.send({"type": "status", **self.server.status()})
+                elif op == "shutdown":
+                    self.send({"type": "bye"})
+                    threading.Thread(target=self.server.shutdown, daemon=True).start()
+                    return
+                else:
+                    raise ValueError(f"unknown op {op!r}")
+            except (BrokenPipeError, ConnectionResetError):
+                return
+            except Exception as exc:
+                self.send({"type": "error", "message": f"{type(exc).__name__}: {exc}"})
+
+
+class SimulationServer(socketserver.ThreadingUnixStreamServer):
+    """Unix-socket server running jobs on a warm process pool."""
+    daemon_threads = True
+
+    def __init__(self, path=None, procs=None):
+        self.path = path or default_socket()
+        if os.path.exists(self.path):
+            if _alive(self.path):
+                raise ValueError(f"a server is already listening on {self.path}")
+            os.unlink(self.path)
+        self.procs = procs or os.cpu_count()
+        self.events = multiprocessing.Queue()
+        self.cancelled = multiprocessing.Array("q", CANCEL_SLOTS, lock=False)
+        self.pool = multiprocessing.Pool(self.procs, initializer=_init_worker,
+                                         initargs=(self.events, self.cancelled))
+        self.listeners = {}
+        self.lock = threading.Lock()
+        self.counter = itertools.count()
+        self.started = time.time()
+        self.jobs_done = 0
+        threading.Thread(target=self._route, daemon=True).start()
+        super().__init__(self.path, _Handler)
+
+    def _route(self):
+        """Hand events from the workers to the thread serving their request."""
+        while True:
+            request, msg = self.events.get()
+            with self.lock:
+                inbox = self.listeners.get(request)
+            if inbox is not None:
+                inbox.put(msg)
+
+    def submit(self, handler, jobs, progress_every=None):
+        """Run ``jobs`` on the pool and stream their events to ``handler``."""
+        start = time.perf_counter()
+        request, inbox = next(self.counter), queue.Queue()
+        with self.lock:
+            self.listeners[request] = inbox
+        try:
+            for index, job in enumerate(jobs):
+                if progress_every:
+                    job = {**job, "progress_every": progress_every}
+                self.pool.apply_async(_run_task, (request, index, job))
+            remaining = len(jobs)
+            while remaining:
+                msg = inbox.get()
+                if msg["type"] != "progress":
+                    remaining -= 1
+                    with self.lock:
+                        self.jobs_done += 1
+                handler.send(msg)
+            handler.send({"type": "done", "jobs": len(jobs), "elapsed": time.perf_counter() - start})
+        except (BrokenPipeError, ConnectionResetError):
+            # The client has gone: free the pool from the rest of its request
+            self.cancelled[request % CANCEL_SLOTS] = request + 1
+            raise
+        finally:
+            with self.lock:
+                del self.listeners[request]
+
+    def status(self):
+        with self.lock:
+            active = len(self.listeners)
+            jobs_done = self.jobs_done
+        return {"pid": os.getpid(), "procs": self.procs, "uptime": time.time() - self.started,
+                "active_requests": active, "jobs_done": jobs_done}
+
+    def server_close(self):
+        super().server_close()
+        self.pool.terminate()
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+
+def _alive(path):
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+            s.connect(path)
+        return True
+    except OSError:
+        return False
+
+
+def serve(path=None, procs=None):
+    server = SimulationServer(path, procs)
+    print(f"Serving on {server.path} with {server.procs} warm workers")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+# ---------------- Client ----------------
+class Client:
+    """Connection to a running server; replies are yielded as they arrive."""
+
+    def __init__(self, path=None, timeout=None):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(timeout)
+        self.sock.connect(path or default_socket())
+        self.rfile = self.sock.makefile("r")
+
+    def request(self, msg, final=("done", "pong", "status", "bye")):
+        self.sock.sendall((json.dumps(msg) + "\n").encode())
+        for line in self.rfile:
+            reply = json.loads(line)
+            yield reply
+            if reply["type"] in final or (reply["type"] == "error" and "job" not in reply):
+                return
+
+    def run(self, job, progress_every=None):
+        yield from self.request({"op": "run", "job": job, "progress_every": progress_every})
+
+    def sweep(self, jobs, progress_every=None):
+        yield from self.request({"op": "sweep", "jobs": jobs, "progress_every": progress_every})
+
+    def ping(self):
+        return next(self.request({"op": "ping"}))
+
+    def status(self):
+        return next(self.request({"op": "status"}))
+
+    def shutdown(self):
+        return next(self.request({"op": "shutdown"}))
+
+    def close(self):
+        self.rfile.close()
+        self.sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# ---------------- Command line ----------------
+def _print_reply(msg):
+    if msg["type"] == "progress":
+        print(f"  job {msg['job']}: step {msg['steps']}, hit rate {msg['hit_rate']}, "
+              f"{msg['total_trials']} trials")
+    elif msg["type"] == "result":
+        print(f"[{msg['job']}] {msg['mode']} {msg['params']} hit rate {msg['hit_rate']} "
+              f"({msg['steps_run']} steps, {msg['runtime']:.2f} s)")
+    elif msg["type"] == "error":
+        print(f"error: {msg['message']}")
+    elif msg["type"] == "done":
+        print(f"{msg['jobs']} job(s) in {msg['elapsed'] * 1000:.0f} ms")
+    else:
+        print(json.dumps(msg))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Persistent simulation server on a Unix socket.")
+    parser.add_argument("--socket", default=None, help="socket path (default: EAP_PONG_SOCKET or a temp file)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("serve", help="start the server and its warm worker pool")
+    p.add_argument("--procs", type=int, default=None, help="worker processes (default: all CPUs)")
+
+    for name, text in (("run", "run one job, streaming progress"), ("sweep", "run a full-factorial sweep")):
+        p = sub.add_parser(name, help=text)
+        sweep.add_sweep_arguments(p)
+        p.add_argument("--progress-every", type=int, default=None, help="steps between progress lines")
+        p.add_argument("--out", default=None, help="also write results as JSON lines")
+
+    for name in ("ping", "status", "shutdown"):
+        sub.add_parser(name)
+    args = parser.parse_args(argv)
+
+    if args.command == "serve":
+        serve(args.socket, args.procs)
+        return
+
+    with Client(args.socket) as client:
+        if args.command in ("ping", "status", "shutdown"):
+            print(json.dumps(getattr(client, args.command)()))
+            return
+        jobs = sweep.jobs_from_args(args)
+        if args.command == "run" and len(jobs) != 1:
+            parser.error(f"run takes exactly one job; the grid gives {len(jobs)} (use sweep)")
+        replies = (client.run(jobs[0], args.progress_every) if args.command == "run"
+                   else client.sweep(jobs, args.progress_every))
+        out = open(args.out, "w") if args.out else None
+        try:
+            for msg in replies:
+                _print_reply(msg)
+                if out and msg["type"] == "result":
+                    out.write(json.dumps({k: v for k, v in msg.items() if k not in ("type", "job")}) + "\n")
+                    out.flush()
+        finally:
+            if out:
+                out.close()
+            if args.out:
+                print(f"Results saved to '{args.out}'")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+"""Convergence-based early stopping for headless runs.
+
+``EarlyStopping`` is an ``Ensemble.run`` callback.  Every ``check_every``
+steps it evaluates its rules; a game is converged once any per-game rule
+holds, and the run stops when a ``quorum`` fraction of games has converged
+or a run-wide budget is spent.  The step at which each game converged, the
+rule that fired, and the hit rates at that moment are kept, so games that
+keep running in the batch after converging do not change the result::
+
+    stop = EarlyStopping([HitRateStable(0.01, window=10), TrialBudget(500),
+                          WallTimeBudget(600)], check_every=600)
+    ens.run(10**7, callback=stop)
+    stop.summary()
+
+Per-game rules: ``HitRateStable`` (every region's hit rate moved less than
+``epsilon`` over the last ``window`` checks), ``Plateau`` (the least-squares
+trend of the overall hit rate over the window predicts less than ``epsilon``
+change), ``ThresholdConverged`` (Model 1 thresholds within ``tol`` of
+``min_threshold``) and ``TrialBudget``.  Run-wide rules: ``StepBudget``
+and ``WallTimeBudget``.
+"""
+
+import time
+
+import numpy as np
+
+
+class HitRateStable:
+    """Per-region hit rates changed less than ``epsilon`` over ``window`` checks."""
+    name = "stable"
+
+    def __init__(self, epsilon=0.01, window=10, min_trials=20):
+        self.epsilon, self.window, self.min_trials = epsilon, window, min_trials
+        self.history = None
+        self.n = 0
+
+    def __call__(self, ens):
+        rates = ens.hit_rates()
+        if self.history is None:
+            self.history = np.full((self.window,) + rates.shape, np.nan)
+        self.history[self.n % self.window] = rates
+        self.n += 1
+        if self.n < self.window:
+            return np.zeros(ens.n_games, dtype=bool)
+        spread = np.fmax.reduce(self.history, axis=0) - np.fmin.reduce(self.history, axis=0)
+        seen = ~np.isnan(rates)
+        stable = np.where(seen, spread < self.epsilon, True).all(axis=1)
+        return stable & seen.any(axis=1) & (ens.region_trials.sum(axis=1) >= self.min_trials)
+
+
+class Plateau:
+    """The fitted trend of the overall hit rate predicts < ``epsilon`` change over the window."""
+    name = "plateau"
+
+    def __init__(self, epsilon=0.01, window=20, min_trials=20):
+        self.epsilon, self.window, self.min_trials = epsilon, window, min_trials
+        self.rates = self.times = None
+        self.n = 0
+
+    def __call__(self, ens):
+        trials = ens.region_trials.sum(axis=1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rate = ens.region_hits.sum(axis=1) / trials
+        if self.rates is None:
+            self.rates = np.full((self.window, ens.n_games), np.nan)
+            self.times = np.zeros(self.window)
+        self.rates[self.n % self.window] = rate
+        self.times[self.n % self.window] = ens.t
+        self.n += 1
+        if self.n < self.window:
+            return np.zeros(ens.n_games, dtype=bool)
+        t = self.times - self.times.mean()
+        y = self.rates - self.rates.mean(axis=0)
+        slope = (t[:, None] * y).sum(axis=0) / (t ** 2).sum()
+        change = np.abs(slope) * (self.times.max() - self.times.min())
+        return np.isfinite(change) & (change < self.epsilon) & (trials >= self.min_trials)
+
+
+class ThresholdConverged:
+    """Model 1: every region's threshold is within ``tol`` (fraction of its range) of ``min_threshold``."""
+    name = "threshold"
+
+    def __init__(self, tol=0.01):
+        self.tol = tol
+
+    def __call__(self, ens):
+        if ens.model != 1:
+            return np.zeros(ens.n_games, dtype=bool)
+        base, low = ens.p["base_threshold"][:, None], ens.p["min_threshold"][:, None]
+        return ((ens.threshold - low) <= self.tol * (base - low)).all(axis=1)
+
+
+class TrialBudget:
+    name = "trials"
+
+    def __init__(self, max_trials):
+        self.max_trials = max_trials
+
+    def __call__(self, ens):
+        return ens.region_trials.sum(axis=1) >= self.max_trials
+
+
+class StepBudget:
+    name = "steps"
+    run_wide = True
+
+    def __init__(self, max_steps):
+        self.max_steps = max_steps
+
+    def __call__(self, ens):
+        return ens.steps >= self.max_steps
+
+
+class WallTimeBudget:
+    name = "wall_time"
+    run_wide = True
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.start = None
+
+    def __call__(self, ens):
+        now = time.perf_counter()
+        if self.start is None:
+            self.start = now
+        return now - self.start >= self.seconds
+
+
+class EarlyStopping:
+    """``Ensemble.run`` callback applying stopping rules every ``check_every`` steps."""
+
+    def __init__(self, rules, check_every=600, quorum=1.0):
+        self.rules = list(rules)
+        self.check_every = check_every
+        self.quorum = quorum
+        self.stopped_at = None
+        self.reason = None
+        self.converged_step = None
+        self.converged_rule = None
+        self.converged_rates = None
+        self.converged_hits = None
+        self.converged_trials = None
+
+    def __call__(self, ens):
+        if self.converged_step is None:
+            G = ens.n_games
+            self.converged_step = np.full(G, -1, dtype=np.int64)
+            self.converged_rule = np.full(G, "", dtype=object)
+            self.converged_rates = np.full(ens.region_trials.shape, np.nan)
+            self.converged_hits = np.zeros_like(ens.region_hits)
+            self.converged_trials = np.zeros_like(ens.region_trials)
+            self._start = ens.steps
+            for rule in self.rules:
+                if getattr(rule, "run_wide", False):
+                    rule(ens)  # start clocks
+        if (ens.steps - self._start) % self.check_every:
+            return False
+
+        new = np.zeros(ens.n_games, dtype=bool)
+        for rule in self.rules:
+            if getattr(rule, "run_wide", False):
+                if rule(ens):
+                    self.stopped_at, self.reason = ens.steps, rule.name
+            else:
+                hit = np.asarray(rule(ens)) & (self.converged_step < 0) & ~new
+                self.converged_rule[hit] = rule.name
+                new |= hit
+        if new.any():
+            self.converged_step[new] = ens.steps
+            self.converged_rates[new] = ens.hit_rates()[new]
+            self.converged_hits[new] = ens.region_hits[new]
+            self.converged_trials[new] = ens.region_trials[new]
+        done = (self.converged_step >= 0).mean()
+        if self.stopped_at is None and self.rules and done >= self.quorum:
+            self.stopped_at, self.reason = ens.steps, "converged"
+        return self.stopped_at is not None
+
+    def counts(self, ens):
+        """Per-game, per-region hits and trials, frozen at convergence for
+        the games that converged."""
+        if self.converged_step is None:
+            return ens.region_hits, ens.region_trials
+        frozen = (self.converged_step >= 0)[:, None]
+        return (np.where(frozen, self.converged_hits, ens.region_hits),
+                np.where(frozen, self.converged_trials, ens.region_trials))
+
+    def summary(self):
+        """When and why the run stopped, and per-game convergence."""
+        return {
+            "stopped_at": self.stopped_at,
+            "reason": self.reason,
+            "converged": int((self.converged_step >= 0).sum()) if self.converged_step is not None else 0,
+            "converged_step": self.converged_step,
+            "converged_rule": self.converged_rule,
+            "converged_rates": self.converged_rates,
+        }
+
+
+def from_spec(spec):
+    """Build an ``EarlyStopping`` from a JSON-friendly dict (sweep jobs, command lines).
+
+    Keys: epsilon, window, plateau (bool), min_trials, max_trials,
+    max_steps, max_wall, threshold_tol, check_every, quorum.
+    """
+    rules = []
+    if spec.get("epsilon") is not None:
+        rule = Plateau if spec.get("plateau") else HitRateStable
+        rules.append(rule(spec["epsilon"], spec.get("window", 10), spec.get("min_trials", 20)))
+    if spec.get("threshold_tol") is not None:
+        rules.append(ThresholdConverged(spec["threshold_tol"]))
+    if spec.get("max_trials") is not None:
+        rules.append(TrialBudget(spec["max_trials"]))
+    if spec.get("max_steps") is not None:
+        rules.append(StepBudget(spec["max_steps"]))
+    if spec.get("max_wall") is not None:
+        rules.append(WallTimeBudget(spec["max_wall"]))
+    return EarlyStopping(rules, spec.get("check_every", 600), spec.get("quorum", 1.0))
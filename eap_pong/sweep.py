@@ -0,0 +1,173 @@
+"""Full-factorial parameter sweeps of the headless engine.
+
+A sweep is a list of jobs (plain, JSON-serializable dicts); each job runs
+one ``Ensemble`` of ``n_games`` replicate games and returns summary metrics.
+Jobs can run in a local process pool, or be put on a work queue shared by
+many nodes (see ``eap_pong.workqueue``)::
+
+    python -m eap_pong.sweep --model 3 --grid RETENTION_FACTOR=0.1,0.5,0.9 \\
+        --grid NOISE_FACTOR=0,0.5,1 --modes correct,scrambled_paddle --workers 8 --out sweep.jsonl
+"""
+
+import argparse
+import itertools
+import json
+import os
+import time
+from multiprocessing import Pool
+
+import numpy as np
+
+from . import stopping, telemetry
+from .engine import Ensemble, chain
+
+# Optional job keys passed straight to Ensemble
+ENGINE_OPTIONS = ("swept", "frames_per_step", "precision", "first_game", "rescramble_every")
+
+
+def parse_grid(specs):
+    """``["NAME=v1,v2,...", ...]`` -> ``{NAME: [v1, v2, ...]}``."""
+    grid = {}
+    for spec in specs:
+        name, values = spec.split("=")
+        grid[name] = [float(v) for v in values.split(",")]
+    return grid
+
+
+def expand_grid(model, grid, modes=("correct",), steps=36000, n_games=16, seed=0, stop=None,
+                telemetry=False):
+    """One job per combination of mode and grid values (full factorial).
+
+    ``stop`` is an optional ``stopping.from_spec`` dict; ``steps`` is then an
+    upper bound.  With ``telemetry``, each job publishes live telemetry
+    (``python -m eap_pong.telemetry watch``) while it runs.
+    """
+    names = list(grid)
+    jobs = []
+    for mode in modes:
+        for values in itertools.product(*(grid[n] for n in names)):
+            jobs.append({
+                "model": model, "mode": mode, "params": dict(zip(names, values)),
+                "steps": steps, "n_games": n_games, "seed": seed + len(jobs),
+                **({"stop": stop} if stop else {}),
+                **({"telemetry": True} if telemetry else {}),
+            })
+    return jobs
+
+
+def _mean_over_games(rates):
+    """Mean over games (axis 0) of the finite entries; NaN where there are none."""
+    finite = np.isfinite(rates)
+    n = finite.sum(axis=0)
+    total = np.where(finite, rates, 0.0).sum(axis=0)
+    return np.where(n > 0, total / np.maximum(n, 1), np.nan)
+
+
+def run_job(job, progress=None):
+    """Run one sweep job; returns the job with its summary metrics added.
+
+    With early stopping, games that converged before the run stopped are
+    reported as they were when they converged.
+
+    With ``progress``, ``progress(ens)`` is called every ``job["progress_every"]``
+    steps (default 600); a truthy return value abandons the run.
+    """
+    start = time.perf_counter()
+    ens = Ensemble(job["model"], n_games=job["n_games"], params=job["params"],
+                   mode=job["mode"], seed=job["seed"],
+                   **{k: job[k] for k in ENGINE_OPTIONS if k in job})
+    stop = stopping.from_spec(job["stop"]) if job.get("stop") else None
+    report = None
+    if progress is not None:
+        every = job.get("progress_every", 600)
+
+        def report(ens):
+            if ens.steps % every == 0:
+                return progress(ens)
+    publisher = (telemetry.TelemetryPublisher(f"sweep-{os.getpid()}-{job['seed']}", ens)
+                 if job.get("telemetry") else None)
+    ens.run(job["steps"], callback=chain(stop, report, publisher))
+    if publisher is not None:
+        publisher.close(ens)
+    # Games that converged count with their rates at that moment
+    hits, trials = stop.counts(ens) if stop is not None else (ens.region_hits, ens.region_trials)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        region_rates = np.where(trials > 0, hits / trials, np.nan)
+        game_rates = hits.sum(axis=1) / trials.sum(axis=1)
+    region_rate = _mean_over_games(region_rates)
+    played = np.isfinite(game_rates)
+    return {
+        **job,
+        "hit_rate": float(game_rates[played].mean()) if played.any() else None,
+        "hit_rate_sd": float(game_rates[played].std()) if played.any() else None,
+        "region_hit_rate": {r: (None if np.isnan(v) else float(v))
+                            for r, v in zip(ens.arena.names, region_rate)},
+        "total_trials": int(trials.sum()),
+        "steps_run": ens.steps,
+        "stop_reason": stop.reason if stop is not None else None,
+        "runtime": time.perf_counter() - start,
+    }
+
+
+def run_local(jobs, workers=1):
+    """Run jobs in a local process pool, yielding results as they finish."""
+    if workers <= 1:
+        for job in jobs:
+            yield run_job(job)
+        return
+    with Pool(workers) as pool:
+        yield from pool.imap_unordered(run_job, jobs)
+
+
+def add_sweep_arguments(parser):
+    parser.add_argument("--model", type=int, default=3, choices=(1, 2, 3))
+    parser.add_argument("--grid", action="append", default=[], metavar="NAME=v1,v2,...")
+    parser.add_argument("--modes", default="correct", help="comma-separated modes")
+    parser.add_argument("--steps", type=int, default=36000)
+    parser.add_argument("--games", type=int, default=16, help="replicate games per job")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--telemetry", action="store_true",
+                        help="publish live telemetry of each job (python -m eap_pong.telemetry watch)")
+    stop = parser.add_argument_group("early stopping (--steps becomes an upper bound)")
+    stop.add_argument("--stop-epsilon", type=float, default=None,
+                      help="stop once hit rates move less than this over --stop-window checks")
+    stop.add_argument("--stop-window", type=int, default=10)
+    stop.add_argument("--stop-plateau", action="store_true", help="use the fitted trend instead of the spread")
+    stop.add_argument("--threshold-tol", type=float, default=None, help="Model 1: thresholds near min_threshold")
+    stop.add_argument("--max-trials", type=int, default=None, help="per game")
+    stop.add_argument("--max-wall", type=float, default=None, help="seconds per job")
+    stop.add_argument("--check-every", type=int, default=600, help="steps between checks")
+
+
+def stop_spec(args):
+    spec = {"epsilon": args.stop_epsilon, "window": args.stop_window, "plateau": args.stop_plateau,
+            "threshold_tol": args.threshold_tol, "max_trials": args.max_trials,
+            "max_wall": args.max_wall, "check_every": args.check_every}
+    if all(spec[k] is None for k in ("epsilon", "threshold_tol", "max_trials", "max_wall")):
+        return None
+    return spec
+
+
+def jobs_from_args(args):
+    return expand_grid(args.model, parse_grid(args.grid), args.modes.split(","),
+                       args.steps, args.games, args.seed, stop_spec(args), args.telemetry)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run a full-factorial sweep on this machine.")
+    add_sweep_arguments(parser)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--out", default="sweep.jsonl", help="one JSON result per line")
+    args = parser.parse_args(argv)
+
+    jobs = jobs_from_args(args)
+    with open(args.out, "w") as f:
+        for i, result in enumerate(run_local(jobs, args.workers), 1):
+            f.write(json.dumps(result) + "\n")
+            f.flush()
+            print(f"[{i}/{len(jobs)}] {result['mode']} {result['params']} hit rate {result['hit_rate']}"
+                  f" ({result['steps_run']} steps{', ' + result['stop_reason'] if result['stop_reason'] else ''})")
+
+
+if __name__ == "__main__":
+    main()
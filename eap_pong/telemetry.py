@@ -0,0 +1,240 @@
+"""Live telemetry for running simulations.
+
+Each run owns a small memory-mapped snapshot file (on ``/dev/shm`` when it
+exists) holding counters and gauges: steps/sec, loop latency, per-region
+currents, ``region_hits``/``region_trials`` and, for Model 1, thresholds
+and response probabilities.  The step loop writes it without locks using a
+sequence counter (odd while a write is in progress), and only every
+``interval`` seconds, so the per-step cost is one clock read.
+
+Publishing from a headless run::
+
+    pub = TelemetryPublisher("sweep-17", ens)
+    ens.run(steps, callback=engine.chain(pub, EarlyStopping(...)))
+    pub.close(ens)
+
+Sweeps, the work queue and the simulation server publish one snapshot per
+job when it has ``"telemetry": True`` (``--telemetry`` on their command
+lines).
+
+Watching every run on the node, or serving them to a dashboard::
+
+    python -m eap_pong.telemetry watch
+    python -m eap_pong.telemetry serve --port 9100
+"""
+
+import argparse
+import glob
+import json
+import os
+import tempfile
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+HEADER = ("seq", "pid", "model", "n_games", "n_regions", "finished", "steps", "sim_time",
+          "wall_time", "steps_per_sec", "loop_latency_ms", "hits", "trials", "misses")
+REGION_FIELDS = ("current", "region_hits", "region_trials", "threshold", "response_probability")
+_H = {name: i for i, name in enumerate(HEADER)}
+
+
+def telemetry_dir():
+    """Directory holding the snapshot files (``EAP_PONG_TELEMETRY_DIR`` overrides)."""
+    path = os.environ.get("EAP_PONG_TELEMETRY_DIR")
+    if path is None:
+        base = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+        path = os.path.join(base, "eap_pong_telemetry")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+class TelemetryPublisher:
+    """Publishes an ``Ensemble``'s state; pass it as the ``run()`` callback."""
+
+    def __init__(self, name, ens, interval=0.5, directory=None):
+        self.name = name
+        self.interval = interval
+        self.n_regions = ens.arena.n_regions
+        self.path = os.path.join(directory or telemetry_dir(), f"{name}.tel")
+        size = len(HEADER) + len(REGION_FIELDS) * self.n_regions
+        self.buf = np.memmap(self.path, dtype=np.float64, mode="w+", shape=(size,))
+        self.buf[:] = 0.0
+        self.buf[_H["pid"]] = os.getpid()
+        self.buf[_H["model"]] = ens.model
+        self.buf[_H["n_games"]] = ens.n_games
+        self.buf[_H["n_regions"]] = self.n_regions
+        self._last_publish = time.perf_counter()
+        self._last_steps = ens.steps
+        self.publish(ens)
+
+    def __call__(self, ens):
+        now = time.perf_counter()
+        if now - self._last_publish >= self.interval:
+            self.publish(ens, now)
+
+    def publish(self, ens, now=None):
+        now = time.perf_counter() if now is None else now
+        elapsed = now - self._last_publish
+        steps = ens.steps - self._last_steps
+        self._last_publish, self._last_steps = now, ens.steps
+
+        buf, n = self.buf, self.n_regions
+        seq = buf[_H["seq"]]
+        buf[_H["seq"]] = seq + 1  # odd: write in progress
+        buf[_H["steps"]] = ens.steps
+        buf[_H["sim_time"]] = ens.t
+        buf[_H["wall_time"]] = time.time()
+        if steps > 0 and elapsed > 0:
+            buf[_H["steps_per_sec"]] = steps / elapsed
+            buf[_H["loop_latency_ms"]] = 1000.0 * elapsed / steps
+        buf[_H["hits"]] = ens.region_hits.sum()
+        buf[_H["trials"]] = ens.region_trials.sum()
+        buf[_H["misses"]] = ens.misses.sum()
+        regions = buf[len(HEADER):].reshape(len(REGION_FIELDS), n)
+        regions[0] = ens.currents.mean(axis=0)
+        regions[1] = ens.region_hits.sum(axis=0)
+        regions[2] = ens.region_trials.sum(axis=0)
+        if ens.model == 1:
+            regions[3] = ens.threshold.mean(axis=0)
+            regions[4] = ens.response_probability.mean(axis=0)
+        else:
+            regions[3:] = np.nan
+        buf[_H["seq"]] = seq + 2
+
+    def close(self, ens=None, remove=False):
+        if ens is not None:
+            self.publish(ens)
+        self.buf[_H["finished"]] = 1.0
+        self.buf.flush()
+        del self.buf
+        if remove:
+            os.remove(self.path)
+
+
+# ---------------- READERS ----------------
+def read_snapshot(path, retries=100):
+    """Consistent copy of one snapshot as a dict, or None if it stays mid-write."""
+    buf = np.memmap(path, dtype=np.float64, mode="r")
+    for _ in range(retries):
+        seq = buf[0]
+        data = np.array(buf)
+        if seq % 2 == 0 and buf[0] == seq:
+            break
+        time.sleep(0.0005)
+    else:
+        return None
+    snap = {name: float(data[i]) for i, name in enumerate(HEADER)}
+    n = int(snap["n_regions"])
+    regions = data[len(HEADER):len(HEADER) + len(REGION_FIELDS) * n].reshape(len(REGION_FIELDS), n)
+    for name, row in zip(REGION_FIELDS, regions):
+        snap[name] = row.tolist()
+    snap["name"] = os.path.splitext(os.path.basename(path))[0]
+    snap["alive"] = _pid_alive(int(snap["pid"])) and not snap["finished"]
+    return snap
+
+
+def read_all(directory=None):
+    snaps = []
+    for path in sorted(glob.glob(os.path.join(directory or telemetry_dir(), "*.tel"))):
+        try:
+            snap = read_snapshot(path)
+        except (OSError, ValueError):
+            continue
+        if snap is not None:
+            snaps.append(snap)
+    return snaps
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def json_text(snaps, indent=None):
+    """Snapshots as strict JSON: NaN and infinite values (Models 2 and 3 have
+    no thresholds) become null."""
+    def finite(v):
+        if isinstance(v, list):
+            return [finite(x) for x in v]
+        return v if not isinstance(v, float) or np.isfinite(v) else None
+    return json.dumps([{k: finite(v) for k, v in s.items()} for s in snaps], indent=indent, allow_nan=False)
+
+
+def prometheus_text(snaps):
+    """Snapshots in the Prometheus text exposition format."""
+    lines = []
+    for s in snaps:
+        label = f'run="{s["name"]}",model="{int(s["model"])}"'
+        for key in ("steps", "sim_time", "steps_per_sec", "loop_latency_ms", "hits", "trials", "misses"):
+            lines.append(f"eap_pong_{key}{{{label}}} {s[key]:.6g}")
+        lines.append(f"eap_pong_alive{{{label}}} {int(s['alive'])}")
+        for field in REGION_FIELDS:
+            for i, v in enumerate(s[field]):
+                if not np.isnan(v):
+                    lines.append(f'eap_pong_{field}{{{label},region="{i}"}} {v:.6g}')
+    return "\n".join(lines) + "\n"
+
+
+def _format_table(snaps):
+    rows = [f"{'run':<24}{'model':>6}{'games':>7}{'steps':>11}{'steps/s':>11}"
+            f"{'lat ms':>9}{'hit rate':>10}  state"]
+    for s in snaps:
+        rate = s["hits"] / s["trials"] if s["trials"] else float("nan")
+        state = "running" if s["alive"] else ("done" if s["finished"] else "dead")
+        rows.append(f"{s['name'][:23]:<24}{int(s['model']):>6}{int(s['n_games']):>7}{int(s['steps']):>11}"
+                    f"{s['steps_per_sec']:>11.0f}{s['loop_latency_ms']:>9.3f}{rate:>10.3f}  {state}")
+    return "\n".join(rows)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Watch live telemetry of running simulations.")
+    parser.add_argument("command", choices=("watch", "json", "serve", "prune"))
+    parser.add_argument("--dir", default=None, help="snapshot directory")
+    parser.add_argument("--interval", type=float, default=1.0)
+    parser.add_argument("--port", type=int, default=9100)
+    args = parser.parse_args(argv)
+
+    if args.command == "json":
+        print(json_text(read_all(args.dir), indent=1))
+    elif args.command == "prune":
+        for s in read_all(args.dir):
+            if not s["alive"]:
+                os.remove(os.path.join(args.dir or telemetry_dir(), f"{s['name']}.tel"))
+    elif args.command == "watch":
+        try:
+            while True:
+                print("\033[2J\033[H" + _format_table(read_all(args.dir)), flush=True)
+                time.sleep(args.interval)
+        except KeyboardInterrupt:
+            pass
+    else:
+        directory = args.dir
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                snaps = read_all(directory)
+                if self.path.startswith("/json"):
+                    body, ctype = json_text(snaps).encode(), "application/json"
+                else:
+                    body, ctype = prometheus_text(snaps).encode(), "text/plain; version=0.0.4"
+                self.send_response(200)
+                self.send_header("Content-Type", ctype)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        print(f"Serving telemetry on http://127.0.0.1:{args.port}/metrics")
+        ThreadingHTTPServer(("127.0.0.1", args.port), Handler).serve_forever()
+
+
+if __name__ == "__main__":
+    main()
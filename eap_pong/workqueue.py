@@ -0,0 +1,265 @@
+"""Sweep work queue in an SQLite file, for workers on any number of nodes.
+
+The queue is a single database file; put it on a filesystem every node can
+reach (a local directory is enough on one machine).  Workers claim jobs
+with a lease that they renew while the job runs; a job whose lease runs
+out (its worker died or lost the filesystem) goes back to pending and is
+picked up by the next worker.  Results are written back into the same file.
+No server process is involved::
+
+    python -m eap_pong.workqueue enqueue sweep.db --model 3 --grid RETENTION_FACTOR=0.1,0.5,0.9 \\
+        --modes correct,scrambled_paddle
+    python -m eap_pong.workqueue work sweep.db --procs 8        # on every node
+    python -m eap_pong.workqueue status sweep.db
+    python -m eap_pong.workqueue results sweep.db --out sweep.jsonl
+
+The database uses rollback journalling rather than WAL, which needs shared
+memory and so does not work across hosts.  Network filesystems with broken
+byte-range locking are not safe for SQLite; use one with working locks.
+"""
+
+import argparse
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import traceback
+from multiprocessing import Process
+
+from . import sweep
+
+LEASE = 300.0
+MAX_ATTEMPTS = 3
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY,
+    spec TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    worker TEXT,
+    lease_until REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    result TEXT,
+    error TEXT,
+    created REAL,
+    finished REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, lease_until);
+"""
+
+
+def connect(path):
+    """Open (and create if needed) the queue database."""
+    db = sqlite3.connect(path, timeout=60.0, isolation_level=None)
+    db.execute("PRAGMA journal_mode=DELETE")
+    db.executescript(SCHEMA)
+    return db
+
+
+def worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def enqueue(db, jobs):
+    """Add sweep jobs (dicts) as pending; returns their ids."""
+    now = time.time()
+    db.execute("BEGIN IMMEDIATE")
+    ids = [db.execute("INSERT INTO jobs (spec, created) VALUES (?, ?)",
+                      (json.dumps(job), now)).lastrowid for job in jobs]
+    db.execute("COMMIT")
+    return ids
+
+
+def claim(db, worker, lease=LEASE, max_attempts=MAX_ATTEMPTS):
+    """Lease the next pending (or expired) job to ``worker``; ``None`` if there is none.
+
+    A running job whose lease has run out is taken over directly.  Jobs that
+    have already been attempted ``max_attempts`` times are marked failed.
+    """
+    now = time.time()
+    db.execute("BEGIN IMMEDIATE")
+    try:
+        db.execute("UPDATE jobs SET status = 'failed', error = COALESCE(error, 'lease expired') "
+                   "WHERE status = 'running' AND lease_until < ? AND attempts >= ?", (now, max_attempts))
+        row = db.execute("SELECT id, spec FROM jobs WHERE status = 'pending' "
+                         "OR (status = 'running' AND lease_until < ?) ORDER BY id LIMIT 1", (now,)).fetchone()
+        if row is not None:
+            db.execute("UPDATE jobs SET status = 'running', worker = ?, lease_until = ?, "
+                       "attempts = attempts + 1 WHERE id = ?", (worker, now + lease, row[0]))
+        db.execute("COMMIT")
+    except BaseException:
+        db.execute("ROLLBACK")
+        raise
+    return None if row is None else (row[0], json.loads(row[1]))
+
+
+def renew(db, job_id, worker, lease=LEASE):
+    """Extend the lease; False if the job has been taken over by another worker."""
+    cur = db.execute("UPDATE jobs SET lease_until = ? WHERE id = ? AND worker = ? AND status = 'running'",
+                     (time.time() + lease, job_id, worker))
+    return cur.rowcount == 1
+
+
+def complete(db, job_id, worker, result):
+    """Store the result; ignored if the lease was lost and the job re-queued meanwhile."""
+    cur = db.execute("UPDATE jobs SET status = 'done', result = ?, error = NULL, finished = ? "
+                     "WHERE id = ? AND worker = ? AND status = 'running'",
+                     (json.dumps(result), time.time(), job_id, worker))
+    return cur.rowcount == 1
+
+
+def fail(db, job_id, worker, error, max_attempts=MAX_ATTEMPTS):
+    """Record an error and put the job back as pending, or mark it failed after ``max_attempts``."""
+    db.execute("UPDATE jobs SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+               "error = ?, worker = NULL, lease_until = NULL WHERE id = ? AND worker = ? AND status = 'running'",
+               (max_attempts, error, job_id, worker))
+
+
+def requeue_expired(db):
+    """Put running jobs whose lease has expired back to pending; returns how many."""
+    cur = db.execute("UPDATE jobs SET status = 'pending', worker = NULL, lease_until = NULL "
+                     "WHERE status = 'running' AND lease_until < ?", (time.time(),))
+    return cur.rowcount
+
+
+def reset_failed(db):
+    cur = db.execute("UPDATE jobs SET status = 'pending', attempts = 0, error = NULL WHERE status = 'failed'")
+    return cur.rowcount
+
+
+def status(db):
+    """Job counts per status, plus the number of running jobs with an expired lease."""
+    counts = dict(db.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+    counts["expired"] = db.execute("SELECT COUNT(*) FROM jobs WHERE status = 'running' AND lease_until < ?",
+                                   (time.time(),)).fetchone()[0]
+    return counts
+
+
+def results(db):
+    """Results of finished jobs, in job order."""
+    return [json.loads(r) for (r,) in db.execute("SELECT result FROM jobs WHERE status = 'done' ORDER BY id")]
+
+
+# ---------------- Workers ----------------
+class _Heartbeat(threading.Thread):
+    """Renews a job's lease from a separate connection while the job runs;
+    ``lost`` is set once another worker has taken the job over."""
+
+    def __init__(self, path, job_id, worker, lease):
+        super().__init__(daemon=True)
+        self.path, self.job_id, self.worker, self.lease = path, job_id, worker, lease
+        self.stop = threading.Event()
+        self.lost = False
+
+    def run(self):
+        db = sqlite3.connect(self.path, timeout=60.0, isolation_level=None)
+        try:
+            while not self.stop.wait(self.lease / 3):
+                if not renew(db, self.job_id, self.worker, self.lease):
+                    self.lost = True
+                    return
+        finally:
+            db.close()
+
+
+def work(path, lease=LEASE, max_attempts=MAX_ATTEMPTS, max_jobs=None, idle_exit=True, poll=10.0):
+    """Claim and run jobs until the queue is empty (or ``max_jobs`` have run)."""
+    db = connect(path)
+    worker = worker_id()
+    done = 0
+    while max_jobs is None or done < max_jobs:
+        job = claim(db, worker, lease, max_attempts)
+        if job is None:
+            if idle_exit and not status(db).get("running"):
+                break
+            time.sleep(poll)
+            continue
+        job_id, spec = job
+        beat = _Heartbeat(path, job_id, worker, lease)
+        beat.start()
+        try:
+            # a lost lease abandons the run at its next progress check
+            result = sweep.run_job(spec, progress=lambda ens: beat.lost)
+        except Exception:
+            fail(db, job_id, worker, traceback.format_exc(), max_attempts)
+            continue
+        finally:
+            beat.stop.set()
+            beat.join()
+        if beat.lost:
+            continue
+        if complete(db, job_id, worker, result):
+            done += 1
+    db.close()
+    return done
+
+
+def work_pool(path, procs=1, **kwargs):
+    """Run ``procs`` worker processes against the queue and wait for them."""
+    if procs <= 1:
+        return work(path, **kwargs)
+    workers = [Process(target=work, args=(path,), kwargs=kwargs) for _ in range(procs)]
+    for p in workers:
+        p.start()
+    for p in workers:
+        p.join()
+
+
+# ---------------- Command line ----------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sweep work queue in an SQLite file.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("enqueue", help="add a full-factorial sweep to the queue")
+    p.add_argument("db")
+    sweep.add_sweep_arguments(p)
+
+    p = sub.add_parser("work", help="claim and run jobs until the queue is drained")
+    p.add_argument("db")
+    p.add_argument("--procs", type=int, default=1, help="worker processes on this node")
+    p.add_argument("--lease", type=float, default=LEASE, help="lease length in seconds")
+    p.add_argument("--max-attempts", type=int, default=MAX_ATTEMPTS)
+    p.add_argument("--max-jobs", type=int, default=None, help="per worker process")
+    p.add_argument("--wait", action="store_true", help="keep polling for new jobs instead of exiting")
+
+    p = sub.add_parser("status", help="job counts per status")
+    p.add_argument("db")
+
+    p = sub.add_parser("requeue", help="re-queue expired leases (and, with --failed, failed jobs)")
+    p.add_argument("db")
+    p.add_argument("--failed", action="store_true")
+
+    p = sub.add_parser("results", help="export finished results as JSON lines")
+    p.add_argument("db")
+    p.add_argument("--out", default="sweep.jsonl")
+    args = parser.parse_args(argv)
+
+    if args.command == "work":
+        work_pool(args.db, args.procs, lease=args.lease, max_attempts=args.max_attempts,
+                  max_jobs=args.max_jobs, idle_exit=not args.wait)
+        return
+    db = connect(args.db)
+    if args.command == "enqueue":
+        ids = enqueue(db, sweep.jobs_from_args(args))
+        print(f"Enqueued {len(ids)} jobs in '{args.db}'")
+    elif args.command == "status":
+        for name, count in sorted(status(db).items()):
+            print(f"{name:<10}{count:>8}")
+    elif args.command == "requeue":
+        n = requeue_expired(db)
+        if args.failed:
+            n += reset_failed(db)
+        print(f"Re-queued {n} jobs")
+    elif args.command == "results":
+        rows = results(db)
+        with open(args.out, "w") as f:
+            for row in rows:
+                f.write(json.dumps(row) + "\n")
+        print(f"{len(rows)} results saved to '{args.out}'")
+    db.close()
+
+
+if __name__ == "__main__":
+    main()